@@ -0,0 +1,127 @@
+"""
+Environment-driven database profiles.
+
+``DB_PROFILE`` picks one of:
+
+``sqlite`` (default)
+    The project's SQLite file, tuned for concurrent requests: write-ahead
+    logging so readers never block the writer, ``synchronous=NORMAL``, a busy
+    timeout instead of an immediate "database is locked", memory-mapped reads,
+    and write transactions that take the write lock up front (``IMMEDIATE``) so
+    two requests never deadlock upgrading their read locks. The pragmas are
+    applied to every new connection by ``apply_sqlite_pragmas``.
+``sqlite-default``
+    SQLite with its stock settings, kept as the benchmark baseline.
+``postgres``
+    PostgreSQL with persistent connections (``DB_CONN_MAX_AGE`` seconds,
+    default 60) that are health-checked before each request reuses them.
+``postgres-pooled``
+    PostgreSQL through psycopg's connection pool (``pip install
+    "psycopg[pool]"``), sized by ``DB_POOL_MIN_SIZE`` and ``DB_POOL_MAX_SIZE``.
+    The pool replaces persistent connections, so ``CONN_MAX_AGE`` is 0.
+
+Every setting is read from the environment:
+
+    DB_PROFILE=postgres DB_NAME=quiz_portal DB_USER=quiz DB_PASSWORD=... \\
+        DB_HOST=localhost DB_PORT=5432 python manage.py runserver
+
+SQLite profiles read ``DB_NAME`` (a path, default ``db.sqlite3`` in the project)
+and ``SQLITE_BUSY_TIMEOUT`` (milliseconds) / ``SQLITE_MMAP_SIZE`` (bytes).
+"""
+import os
+
+PROFILES = ('sqlite', 'sqlite-default', 'postgres', 'postgres-pooled')
+
+SQLITE_BUSY_TIMEOUT = 5000  # milliseconds a connection waits for the write lock
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+
+def database_profile(environ=os.environ):
+    """
+    Return the profile named by ``DB_PROFILE``.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    profile = environ.get('DB_PROFILE', 'sqlite')
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}.")
+    return profile
+
+
+def database_config(base_dir, environ=os.environ):
+    """
+    Build the ``default`` entry of ``DATABASES`` for the configured profile.
+
+    Args:
+        base_dir (Path): The project directory, where the SQLite file lives by default.
+        environ (Mapping): Where the settings are read from.
+
+    Returns:
+        dict: The database settings.
+    """
+    profile = database_profile(environ)
+
+    if profile.startswith('sqlite'):
+        config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('DB_NAME') or base_dir / 'db.sqlite3',
+        }
+        if profile == 'sqlite':
+            busy_timeout = int(environ.get('SQLITE_BUSY_TIMEOUT', SQLITE_BUSY_TIMEOUT))
+            config['OPTIONS'] = {
+                'timeout': busy_timeout / 1000,
+                'transaction_mode': 'IMMEDIATE',
+            }
+        return config
+
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('DB_NAME', 'quiz_portal'),
+        'USER': environ.get('DB_USER', ''),
+        'PASSWORD': environ.get('DB_PASSWORD', ''),
+        'HOST': environ.get('DB_HOST', ''),
+        'PORT': environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+    if profile == 'postgres-pooled':
+        config['CONN_MAX_AGE'] = 0  # the pool keeps connections open instead
+        config['OPTIONS'] = {
+            'pool': {
+                'min_size': int(environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(environ.get('DB_POOL_MAX_SIZE', 20)),
+                'timeout': int(environ.get('DB_POOL_TIMEOUT', 10)),
+            },
+        }
+    return config
+
+
+def sqlite_pragmas(environ=os.environ):
+    """
+    Return the pragmas applied to new SQLite connections, in order.
+
+    The ``sqlite-default`` and PostgreSQL profiles get none.
+    """
+    if database_profile(environ) != 'sqlite':
+        return {}
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(environ.get('SQLITE_BUSY_TIMEOUT', SQLITE_BUSY_TIMEOUT)),
+        'mmap_size': int(environ.get('SQLITE_MMAP_SIZE', SQLITE_MMAP_SIZE)),
+        'temp_store': 'MEMORY',
+    }
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver applying ``SQLITE_PRAGMAS`` to a new SQLite connection.
+    """
+    from django.conf import settings
+
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
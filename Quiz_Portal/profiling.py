@@ -0,0 +1,326 @@
+"""
+Per-request cost accounting: SQL queries, SQL time, template time and peak memory.
+
+``profiled()`` is a context manager that measures whatever runs inside it::
+
+    with profiled() as profile:
+        client.get('/leaderboard/')
+    profile.queries, profile.sql_seconds
+
+``RequestProfilingMiddleware`` profiles every request when ``REQUEST_PROFILING``
+is enabled. It writes one structured log line per request to the
+``Quiz_Portal.profiling`` logger and feeds per-view histograms that ``metrics``
+serves at ``/metrics`` in the Prometheus text format. In ``DEBUG``, and for staff
+users, it also adds a ``Server-Timing`` header; other clients never see it,
+because query counts and timings help to probe the site.
+
+Queries are counted by an execute wrapper installed on every database
+connection, and templates are timed around the Django backend's top-level
+``Template.render``. Both report to the profiles active in the current context,
+so the measurements follow a request into ``sync_to_async`` threads and
+concurrent requests never see each other's queries. Peak memory is traced with
+``tracemalloc`` only when ``REQUEST_PROFILING_MEMORY`` is enabled, because
+tracing slows every allocation; the peak is process-wide, so concurrent
+requests in one process inflate each other's figure.
+
+The histograms live in the memory of each process. Under several workers,
+every worker serves its own share of the requests.
+"""
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+MEMORY_BUCKETS = tuple(2 ** power * 1024 for power in range(4, 20, 2))  # 16 KiB .. 128 MiB
+
+_active = ContextVar('active_profiles', default=())
+
+
+class Profile:
+    """
+    The cost of one block of code, filled in while it runs.
+
+    Attributes:
+        queries (int): The number of SQL queries executed.
+        sql_seconds (float): The time spent executing them.
+        template_seconds (float): The time spent rendering templates.
+        peak_memory (int, optional): The peak traced memory in bytes, when memory tracing is on.
+        seconds (float): The wall-clock time of the block.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.peak_memory = None
+        self.seconds = 0.0
+
+    def server_timing(self):
+        """
+        Format the profile as a ``Server-Timing`` header value.
+        """
+        metrics = [
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.1f}',
+            f'total;dur={self.seconds * 1000:.1f}',
+        ]
+        if self.peak_memory is not None:
+            metrics.append(f'mem;desc="{self.peak_memory // 1024} KiB peak"')
+        return ', '.join(metrics)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper that charges each query to the active profiles.
+    """
+    profiles = _active.get()
+    if not profiles:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for profile in profiles:
+            profile.queries += 1
+            profile.sql_seconds += elapsed
+
+
+def instrument_connection(sender=None, connection=None, **kwargs):
+    """
+    Install ``record_query`` on a connection; also the ``connection_created`` receiver.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_templates():
+    """
+    Time the Django template backend's top-level renders; included templates are part of them.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'profiled', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        profiles = _active.get()
+        if not profiles:
+            return render(self, context, request)
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            elapsed = time.perf_counter() - started
+            for profile in profiles:
+                profile.template_seconds += elapsed
+
+    timed_render.profiled = True
+    Template.render = timed_render
+
+
+@contextmanager
+def profiled(trace_memory=False):
+    """
+    Measure the queries, SQL time, template time and wall-clock time of a block.
+
+    Args:
+        trace_memory (bool): Also record the peak traced memory of the block.
+
+    Yields:
+        Profile: Filled in as the block runs and complete when it exits.
+    """
+    instrument_templates()
+    for connection in connections.all(initialized_only=True):
+        instrument_connection(connection=connection)
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    profile = Profile()
+    token = _active.set(_active.get() + (profile,))
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.seconds = time.perf_counter() - started
+        _active.reset(token)
+        if trace_memory:
+            profile.peak_memory = tracemalloc.get_traced_memory()[1]
+
+
+class Histogram:
+    """
+    Cumulative Prometheus histogram of one measurement of one view.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Per-view request histograms and response counters, rendered for Prometheus.
+    """
+    HISTOGRAMS = {
+        'quiz_portal_request_duration_seconds': ("Request wall-clock time.", DURATION_BUCKETS, 'seconds'),
+        'quiz_portal_request_queries': ("SQL queries per request.", QUERY_BUCKETS, 'queries'),
+        'quiz_portal_request_sql_seconds': ("SQL time per request.", DURATION_BUCKETS, 'sql_seconds'),
+        'quiz_portal_request_template_seconds': (
+            "Template rendering time per request.", DURATION_BUCKETS, 'template_seconds'
+        ),
+        'quiz_portal_request_peak_memory_bytes': (
+            "Peak traced Python memory per request.", MEMORY_BUCKETS, 'peak_memory'
+        ),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._responses = {}
+
+    def observe(self, view, status, profile):
+        with self._lock:
+            self._responses[view, status] = self._responses.get((view, status), 0) + 1
+            for name, (_, buckets, attribute) in self.HISTOGRAMS.items():
+                value = getattr(profile, attribute)
+                if value is None:
+                    continue
+                histogram = self._histograms.get((name, view))
+                if histogram is None:
+                    histogram = self._histograms[name, view] = Histogram(buckets)
+                histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._responses.clear()
+
+    def render(self):
+        """
+        Return every metric in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP quiz_portal_responses_total Responses by view and status code.",
+            "# TYPE quiz_portal_responses_total counter",
+        ]
+        with self._lock:
+            for (view, status), count in sorted(self._responses.items()):
+                lines.append(f'quiz_portal_responses_total{{view="{view}",status="{status}"}} {count}')
+            for name, (help_text, _, _) in self.HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, view), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{view="{view}",le="{bound:g}"}} {count}')
+                    lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{view="{view}"}} {histogram.sum:g}')
+                    lines.append(f'{name}_count{{view="{view}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def view_label(request):
+    """
+    Name requests by their URL pattern; unresolved paths share one label.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles each request and reports it as a header, a log line and metrics.
+
+    Works under WSGI and ASGI. For streaming responses only the time until the
+    response is returned is measured, not the stream itself.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instrument_templates()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.REQUEST_PROFILING:
+            return self.get_response(request)
+        with profiled(settings.REQUEST_PROFILING_MEMORY) as profile:
+            response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        return self.report(request, response, profile, show_timing=bool(user and user.is_staff))
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_PROFILING:
+            return await self.get_response(request)
+        with profiled(settings.REQUEST_PROFILING_MEMORY) as profile:
+            response = await self.get_response(request)
+        user = await request.auser() if hasattr(request, 'auser') else None
+        return self.report(request, response, profile, show_timing=bool(user and user.is_staff))
+
+    def report(self, request, response, profile, show_timing=False):
+        view = view_label(request)
+        registry.observe(view, response.status_code, profile)
+        if settings.DEBUG or show_timing:
+            response['Server-Timing'] = profile.server_timing()
+        logger.info(
+            "view=%s method=%s status=%s duration_ms=%.1f queries=%d sql_ms=%.1f template_ms=%.1f peak_kb=%s",
+            view, request.method, response.status_code, profile.seconds * 1000, profile.queries,
+            profile.sql_seconds * 1000, profile.template_seconds * 1000,
+            '-' if profile.peak_memory is None else profile.peak_memory // 1024,
+            extra={'view': view, 'status': response.status_code, 'profile': vars(profile)},
+        )
+        return response
+
+
+def metrics(request):
+    """
+    Serves the request metrics in the Prometheus text format.
+
+    Open to staff users and to the addresses in ``METRICS_ALLOWED_IPS``. The address
+    is ``REMOTE_ADDR``, which behind a reverse proxy is the proxy's own address, so
+    allowing that address would open the metrics to everyone.
+
+    Args:
+        request: The HTTP request object.
+
+    Returns:
+        HttpResponse: The metrics, or 403 for anyone else.
+    """
+    user = getattr(request, 'user', None)
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS and not (user and user.is_staff):
+        return HttpResponseForbidden("Metrics are restricted.")
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
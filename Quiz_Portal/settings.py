@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
 from pathlib import Path
+from .database import database_config, sqlite_pragmas
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -80,6 +81,7 @@ INSTALLED_APPS = [
     'leaderboard',
     'feedback',
     'chatbox',
+    'search',
 
     # Allauth apps
     'django.contrib.sites',
@@ -91,6 +93,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Quiz_Portal.profiling.RequestProfilingMiddleware',  # first, so it measures the whole request
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -125,14 +128,15 @@ WSGI_APPLICATION = 'Quiz_Portal.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# the profile is chosen by the DB_PROFILE environment variable, see Quiz_Portal/database.py
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
 
+# pragmas run on every new SQLite connection (core.apps connects the receiver)
+SQLITE_PRAGMAS = sqlite_pragmas()
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -176,6 +180,39 @@ STATICFILES_DIRS = [STATIC_DIR, ]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# set_questions posts six fields per question; allow banks of a few hundred questions
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 6000
+
+# store each submission's answers packed on the Participant instead of one Response row per question
+PARTICIPATION_PACKED_RESPONSES = False
+
+# queue submissions for the process_submissions worker instead of grading them in the request
+PARTICIPATION_ASYNC_SUBMISSIONS = False
+
+# seconds a submission may arrive after its server-side deadline (network delay, the timer's submit jitter)
+PARTICIPATION_SUBMIT_GRACE = 30
+# the quiz timer submits at a random moment within this many seconds after time is up, spreading the burst
+PARTICIPATION_SUBMIT_JITTER = 10
+
+# full-text search backend (search.backends): 'auto' uses SQLite FTS5 when available, else 'inverted'
+SEARCH_BACKEND = 'auto'
+
+# coalesce chat posts into batched bulk_create transactions (chatbox.buffer) during bursts
+CHAT_WRITE_BUFFER = False
+
+# monthly gzip JSON Lines segments written by the archive_messages command
+CHAT_ARCHIVE_DIR = os.path.join(BASE_DIR, 'chat_archive')
+
+# per-request query count and SQL/template time (Quiz_Portal.profiling): Server-Timing header, log line, /metrics;
+# on in DEBUG unless REQUEST_PROFILING=0 is set, off otherwise unless REQUEST_PROFILING=1 is set.
+# The Server-Timing header is only sent in DEBUG or to staff users.
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', '1' if DEBUG else '0') == '1'
+# also trace each request's peak Python memory with tracemalloc, which slows every allocation
+REQUEST_PROFILING_MEMORY = False
+# addresses allowed to scrape /metrics besides staff users, e.g. ['127.0.0.1', '::1'] for a local Prometheus.
+# Leave it empty behind a reverse proxy on the same host: every proxied request then comes from its address.
+METRICS_ALLOWED_IPS = []
+
 # modification to generate email
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -0,0 +1,64 @@
+"""
+Query budgets for view tests.
+
+``QueryBudgetMixin`` adds ``assertQueryBudget`` to a ``TestCase``: the data a
+view reads is grown step by step, the view is requested at every size, and its
+query count must stay within a budget that may depend on the size. A constant
+budget pins a view to O(1) queries, so an N+1 pattern fails the test suite as
+soon as the data grows instead of going unnoticed against tiny fixtures::
+
+    class LeaderboardQueryTest(QueryBudgetMixin, TestCase):
+        def test_leaderboard(self):
+            self.assertQueryBudget(
+                lambda: self.client.get(reverse('leaderboard')),
+                budget=6,
+                grow=self.add_participants,
+            )
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+BUDGET_SIZES = (1, 5, 20)
+
+
+class QueryBudgetMixin:
+    """
+    Mixin for ``TestCase`` classes asserting how a view's query count scales with its data.
+
+    Attributes:
+        budget_sizes (tuple of int): The data sizes every view is requested at, ascending.
+    """
+    budget_sizes = BUDGET_SIZES
+
+    def assertQueryBudget(self, request, budget, grow=None, sizes=None, using=DEFAULT_DB_ALIAS):
+        """
+        Assert that a request runs at most ``budget`` queries at every data size.
+
+        Args:
+            request (callable): Makes the request and returns the response, e.g.
+                ``lambda: self.client.get(url)``.
+            budget (int or callable): The maximum number of queries, or a function
+                of the data size returning it. An int means the view is O(1).
+            grow (callable, optional): Called with each size, in ascending order, to
+                bring the data the view reads up to that size before the request.
+            sizes (iterable of int, optional): The data sizes. Defaults to ``budget_sizes``.
+            using (str): The database alias whose queries are counted.
+
+        Returns:
+            dict: The number of queries at every size.
+        """
+        counts = {}
+        for size in sizes or self.budget_sizes:
+            if grow is not None:
+                grow(size)
+            with CaptureQueriesContext(connections[using]) as queries:
+                response = request()
+            self.assertLess(response.status_code, 500, f"The request failed at size {size}.")
+            limit = budget(size) if callable(budget) else budget
+            counts[size] = len(queries)
+            if len(queries) > limit:
+                executed = "\n".join(f"  {query['sql']}" for query in queries.captured_queries)
+                self.fail(
+                    f"{len(queries)} queries at size {size}, over the budget of {limit}:\n{executed}"
+                )
+        return counts
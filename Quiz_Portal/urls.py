@@ -20,6 +20,7 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
+from Quiz_Portal.profiling import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),  # Admin panel
@@ -32,5 +33,7 @@ urlpatterns = [
     path('leaderboard/', include('leaderboard.urls')), #for leaderboard
     path('feedback/',include('feedback.urls')),
     path('chatbox/',include('chatbox.urls')),
+    path('search/', include('search.urls')),  # Full-text search
+    path('metrics', metrics, name='metrics'),  # Prometheus scrape endpoint
 
 ]
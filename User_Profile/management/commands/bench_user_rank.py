@@ -0,0 +1,94 @@
+"""
+Benchmark of the user rank lookup used by the ``user_stats`` view.
+
+The command fills the database with synthetic users and participations inside a
+transaction, times the previous O(N) ranking scan against ``UserScore.stats_for``
+and rolls everything back afterwards.
+
+Usage:
+    python manage.py bench_user_rank [--participants 100000] [--users 20000] [--repeat 200]
+"""
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+from participation.models import Participant
+from quiz.models import Quiz
+from User_Profile.models import UserScore
+
+User = get_user_model()
+
+
+def legacy_rank(user):
+    """The ranking scan ``user_stats`` performed before ``UserScore`` existed."""
+    for index, participant in enumerate(Participant.objects.all().order_by('-score')):
+        if participant.user == user:
+            return index + 1
+    return 1
+
+
+class Command(BaseCommand):
+    help = "Benchmark the user_stats rank lookup against the previous full scan (changes are rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--participants', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=20_000)
+        parser.add_argument('--quizzes', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=200, help="Lookups timed for the indexed rank.")
+        parser.add_argument('--skip-legacy', action='store_true', help="Do not time the previous full scan.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            users = self._populate(rng, options)
+            target = users[len(users) // 2]
+
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                stats = UserScore.stats_for(target)
+            indexed = (time.perf_counter() - started) / options['repeat']
+            self.stdout.write(f"UserScore.stats_for: {indexed * 1000:.3f} ms/lookup (rank {stats['rank']})")
+
+            if not options['skip_legacy']:
+                started = time.perf_counter()
+                rank = legacy_rank(target)
+                legacy = time.perf_counter() - started
+                self.stdout.write(f"legacy scan:         {legacy * 1000:.3f} ms/lookup (position {rank})")
+                self.stdout.write(f"speed-up:            {legacy / indexed:.0f}x")
+
+            transaction.set_rollback(True)
+
+    def _populate(self, rng, options):
+        started = time.perf_counter()
+        tag = f"bench{rng.randrange(10 ** 9)}"
+        User.objects.bulk_create(
+            [User(username=f"{tag}_{i}", email=f"{tag}_{i}@example.com", password='!')
+             for i in range(options['users'])],
+            batch_size=1000,
+        )
+        users = list(User.objects.filter(username__startswith=f"{tag}_").only('pk'))
+        Quiz.objects.bulk_create(
+            [Quiz(title=f"Bench quiz {i}", duration=timedelta(minutes=10), created_by=rng.choice(users))
+             for i in range(options['quizzes'])],
+            batch_size=1000,
+        )
+        quizzes = list(Quiz.objects.filter(title__startswith="Bench quiz ").only('pk'))
+        finished = now()
+        # A user takes a quiz at most once, so sample distinct (user, quiz) pairs
+        pairs = rng.sample(range(len(users) * len(quizzes)), min(options['participants'], len(users) * len(quizzes)))
+        Participant.objects.bulk_create(
+            (Participant(user=users[pair // len(quizzes)], quiz=quizzes[pair % len(quizzes)],
+                         score=rng.randrange(0, 21) * 5.0, end_time=finished)
+             for pair in pairs),
+            batch_size=1000,
+        )
+        UserScore.rebuild()
+        self.stdout.write(
+            f"Populated {len(pairs)} participants for {len(users)} users "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return users
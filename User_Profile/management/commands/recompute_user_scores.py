@@ -0,0 +1,19 @@
+"""
+Management command that rebuilds the per-user ``UserScore`` aggregates from the
+participation and quiz tables.
+
+Usage:
+    python manage.py recompute_user_scores
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from User_Profile.models import UserScore
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-user total scores, participation counts and created-quiz counts."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            UserScore.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {UserScore.objects.count()} user score(s)."))
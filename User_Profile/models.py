@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import Count, F, Func, OuterRef, Subquery, Sum
+from participation.models import Participant
+from quiz.models import Quiz
 
 class Profile(models.Model):
     """
@@ -35,8 +38,130 @@ class Profile(models.Model):
         """
         return f"Profile of {self.user.username}"
 
+
+class UserScore(models.Model):
+    """
+    Per-user aggregate of quiz results used for ranking users.
+
+    The aggregates are maintained incrementally on quiz submission and quiz
+    creation, so a user's global rank is a single indexed ``COUNT`` of the users
+    with a higher total score instead of a scan over every participation.
+
+    Attributes
+    ----------
+    user : OneToOneField
+        The user the aggregates belong to.
+    total_score : float
+        Sum of the user's participation scores.
+    participations_count : int
+        Number of quizzes the user has submitted.
+    created_quizzes_count : int
+        Number of quizzes the user has created.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='score')
+    total_score = models.FloatField(default=0.0, db_index=True)
+    participations_count = models.PositiveIntegerField(default=0)
+    created_quizzes_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """
+        Returns a string representation of the UserScore model.
+
+        Returns
+        -------
+        str
+            The username of the user and their total score.
+        """
+        return f"Score of {self.user.username}: {self.total_score:g}"
+
+    @classmethod
+    def _increment(cls, user_id, **deltas):
+        cls.objects.get_or_create(user_id=user_id)
+        cls.objects.filter(user_id=user_id).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+
+    @classmethod
+    def record_participation(cls, user_id, score):
+        """
+        Adds a submitted participation to the user's aggregates.
+
+        Parameters
+        ----------
+        user_id : int
+            Primary key of the participating user.
+        score : float
+            The participation's percentage score.
+        """
+        cls._increment(user_id, total_score=float(score), participations_count=1)
+
+    @classmethod
+    def stats_for(cls, user):
+        """
+        Returns the rank, total score, participation count and created-quiz count of a user.
+
+        The rank is computed in the same query as the aggregates through a
+        correlated ``COUNT`` over the ``total_score`` index. Users with equal total
+        scores share a rank.
+
+        Parameters
+        ----------
+        user : User
+            The user whose statistics are requested.
+
+        Returns
+        -------
+        dict
+            ``rank``, ``total_score``, ``participations_count`` and ``created_quizzes_count``.
+        """
+        higher = (
+            cls.objects.filter(total_score__gt=OuterRef('total_score'))
+            .order_by()
+            .annotate(n=Func('pk', function='COUNT'))
+            .values('n')
+        )
+        row = (
+            cls.objects.filter(user=user)
+            .annotate(higher=Subquery(higher, output_field=models.IntegerField()))
+            .values('total_score', 'participations_count', 'created_quizzes_count', 'higher')
+            .first()
+        )
+        if row is None:
+            return {
+                'rank': cls.objects.filter(total_score__gt=0).count() + 1,
+                'total_score': 0.0,
+                'participations_count': 0,
+                'created_quizzes_count': 0,
+            }
+        return {
+            'rank': row.pop('higher') + 1,
+            **row,
+        }
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """
+        Recomputes every user's aggregates from the participation and quiz tables.
+
+        Parameters
+        ----------
+        batch_size : int
+            Number of rows written per ``bulk_create`` call.
+        """
+        totals = {}
+        for row in (Participant.objects.filter(end_time__isnull=False).order_by()
+                    .values('user_id').annotate(total=Sum('score'), count=Count('pk'))):
+            totals[row['user_id']] = cls(user_id=row['user_id'], total_score=row['total'], participations_count=row['count'])
+        for row in (Quiz.objects.filter(created_by__isnull=False).order_by()
+                    .values('created_by_id').annotate(count=Count('pk'))):
+            totals.setdefault(row['created_by_id'], cls(user_id=row['created_by_id'])).created_quizzes_count = row['count']
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create(totals.values(), batch_size=batch_size)
+
+
 # Signals for Auto creation of profile
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -69,3 +194,39 @@ def save_user_profile(sender, instance, **kwargs):
         The instance of the User model being saved.
     """
     instance.profile.save()
+
+
+@receiver(post_save, sender=Quiz)
+def count_created_quiz(sender, instance, created, **kwargs):
+    """
+    Increments the author's created-quiz count when a new quiz is saved.
+
+    Parameters
+    ----------
+    sender : model
+        The Quiz model.
+    instance : Quiz
+        The quiz that was saved.
+    created : bool
+        Indicates whether a new instance was created.
+    """
+    if created and instance.created_by_id:
+        UserScore._increment(instance.created_by_id, created_quizzes_count=1)
+
+
+@receiver(post_delete, sender=Quiz)
+def uncount_created_quiz(sender, instance, **kwargs):
+    """
+    Decrements the author's created-quiz count when a quiz is deleted.
+
+    Parameters
+    ----------
+    sender : model
+        The Quiz model.
+    instance : Quiz
+        The quiz that was deleted.
+    """
+    if instance.created_by_id:
+        UserScore.objects.filter(user_id=instance.created_by_id, created_quizzes_count__gt=0).update(
+            created_quizzes_count=F('created_quizzes_count') - 1
+        )
@@ -1,3 +1,91 @@
+from datetime import timedelta
 from django.test import TestCase
+from django.urls import reverse
+from core.models import User
+from quiz.models import Quiz
+from django.utils.timezone import now
+from participation.models import Participant
+from Quiz_Portal.testing import QueryBudgetMixin
+from .models import UserScore
 
-# Create your tests here.
+
+class UserStatsTest(TestCase):
+    """
+    Tests for the per-user score aggregates and the user_stats view.
+    """
+    def setUp(self):
+        """
+        Sets up three users with different total scores and logs the first one in.
+        """
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="password123"
+        )
+        self.client.login(email="testuser@example.com", password="password123")
+        self.rival = User.objects.create(username="rival", email="rival@example.com")
+        self.tied = User.objects.create(username="tied", email="tied@example.com")
+
+        Quiz.objects.create(title="Own Quiz", duration=timedelta(minutes=5), created_by=self.user)
+        UserScore.record_participation(self.user.pk, 50)
+        UserScore.record_participation(self.user.pk, 30)
+        UserScore.record_participation(self.rival.pk, 100)
+        UserScore.record_participation(self.tied.pk, 80)
+
+    def test_stats_for(self):
+        """
+        Test that rank, total score and counts come back from the aggregate row.
+        """
+        self.assertEqual(UserScore.stats_for(self.user), {
+            'rank': 2,
+            'total_score': 80.0,
+            'participations_count': 2,
+            'created_quizzes_count': 1,
+        })
+        self.assertEqual(UserScore.stats_for(self.tied)['rank'], 2)
+        self.assertEqual(UserScore.stats_for(self.rival)['rank'], 1)
+
+    def test_stats_for_user_without_results(self):
+        """
+        Test that a user without an aggregate row ranks after every scoring user.
+        """
+        newcomer = User.objects.create(username="newcomer", email="newcomer@example.com")
+        self.assertEqual(UserScore.stats_for(newcomer)['rank'], 4)
+
+    def test_created_quiz_count_follows_deletion(self):
+        """
+        Test that deleting a quiz decrements the author's created-quiz count.
+        """
+        Quiz.objects.filter(created_by=self.user).delete()
+        self.assertEqual(UserScore.stats_for(self.user)['created_quizzes_count'], 0)
+
+    def test_user_stats_view(self):
+        """
+        Test that the user_stats view renders the precomputed values in one stats query.
+        """
+        with self.assertNumQueries(3):  # session, user, stats
+            response = self.client.get(reverse('user_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'User_Profile/user_stats.html')
+        self.assertEqual(response.context['user_rank'], 2)
+        self.assertEqual(response.context['total_score'], 80.0)
+        self.assertEqual(response.context['participations_count'], 2)
+        self.assertEqual(response.context['created_quizzes_count'], 1)
+
+
+class UserStatsQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    The user statistics are O(1) in the number of participations and created quizzes.
+    """
+
+    def test_user_stats(self):
+        user = User.objects.create_user(username='stats', email='stats@example.com', password='pass')
+        self.client.force_login(user)
+
+        def grow(size):
+            for i in range(Quiz.objects.count(), size):
+                quiz = Quiz.objects.create(title=f"Quiz {i}", duration=timedelta(minutes=10), created_by=user)
+                participant = Participant.objects.create(user=user, quiz=quiz, score=50, end_time=now())
+                UserScore.record_participation(participant.user_id, participant.score)
+
+        self.assertQueryBudget(lambda: self.client.get(reverse('user_stats')), budget=3, grow=grow)
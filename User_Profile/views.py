@@ -1,8 +1,7 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from quiz.models import Quiz 
-from participation.models import Participant
 from django.contrib.auth import get_user_model
+from .models import UserScore
 
 User = get_user_model()
 
@@ -30,9 +29,10 @@ def user_stats(request):
     """
     View to display the user's statistics, including their ranking and scores.
 
-    This view calculates and displays the user's rank based on the total 
-    score from all participations, the number of participations, and 
-    quizzes created by the user.
+    This view displays the user's rank based on the total score from all
+    participations, the number of participations, and quizzes created by
+    the user. All values come from the precomputed ``UserScore`` row in a
+    single query.
 
     Parameters
     ----------
@@ -45,32 +45,13 @@ def user_stats(request):
         A rendered response displaying the user's statistics, 
         including rank, total score, and quiz count.
     """
-    user = request.user
-
-    # Get all participations for ranking
-    all_participations = Participant.objects.all().order_by('-score')
-
-    # Calculate user rank
-    user_rank = 1
-    for index, participant in enumerate(all_participations):
-        if participant.user == user:
-            user_rank = index + 1
-            break
-
-    # Get user-specific participations
-    participations = Participant.objects.filter(user=user)
-
-    # Total score from all participations
-    total_score = sum(part.score for part in participations)
-
-    # Get quizzes created by the user
-    created_quizzes = Quiz.objects.filter(created_by=user)
+    stats = UserScore.stats_for(request.user)
 
     context = {
-        'created_quizzes_count': created_quizzes.count(),
-        'participations_count': participations.count(),
-        'total_score': total_score,
-        'user_rank': user_rank,
+        'created_quizzes_count': stats['created_quizzes_count'],
+        'participations_count': stats['participations_count'],
+        'total_score': stats['total_score'],
+        'user_rank': stats['rank'],
     }
     return render(request, 'User_Profile/user_stats.html', context)
 
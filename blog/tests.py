@@ -1,6 +1,7 @@
 from django.test import TestCase
 from django.urls import reverse
 from core.models import User
+from Quiz_Portal.testing import QueryBudgetMixin
 from .models import Blog
 
 class BlogModelTest(TestCase):
@@ -109,3 +110,17 @@ class BlogURLTest(TestCase):
                 self.assertEqual(response.status_code, 302)  # Redirect to login
             else:
                 self.assertEqual(response.status_code, 200)
+
+
+class BlogQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    The blog list runs a fixed number of queries however many posts and authors there are.
+    """
+
+    def test_blog_list(self):
+        def grow(size):
+            for i in range(Blog.objects.count(), size):
+                author = User.objects.create_user(username=f'author{i}', email=f'author{i}@example.com', password='pass')
+                Blog.objects.create(title=f"Post {i}", content="Text", author=author)
+
+        self.assertQueryBudget(lambda: self.client.get(reverse('blog_list')), budget=1, grow=grow)
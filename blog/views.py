@@ -20,7 +20,7 @@ def blog_list(request):
     HttpResponse
         A rendered response with a list of all blogs in the system.
     """
-    blogs = Blog.objects.all()
+    blogs = Blog.objects.select_related('author')  # the list shows every author's name
     return render(request, 'blog/blog_list.html', {'blogs': blogs})
 
 @login_required(login_url='login')
@@ -0,0 +1,90 @@
+"""
+In-process broker that pushes new chat messages to streaming clients.
+
+Each open event stream subscribes with a bounded ``asyncio.Queue`` on its own
+event loop. ``publish`` may be called from any thread (the message is saved by a
+synchronous view) and hands the payload to every subscriber's loop. A subscriber
+that falls too far behind is flagged as overflowed instead of growing without
+bound; its stream then catches up from the database.
+
+The broker only reaches clients connected to the same process. Streams also
+query the database whenever they are idle for a heartbeat interval, which picks
+up messages posted through other processes.
+"""
+import asyncio
+import threading
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """
+    A stream's mailbox for new messages.
+
+    Parameters
+    ----------
+    loop : asyncio.AbstractEventLoop
+        The event loop of the subscribing stream.
+    queue_size : int
+        The number of undelivered messages kept before the subscription overflows.
+    """
+
+    def __init__(self, loop, queue_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, payload):
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class MessageBroker:
+    """
+    Fans new chat messages out to every subscribed stream of this process.
+    """
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """
+        Register a subscription for the running event loop.
+
+        Returns
+        -------
+        Subscription
+            The mailbox the caller reads new messages from.
+        """
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, payload):
+        """
+        Deliver a message payload to every subscription. Safe to call from any thread.
+
+        Parameters
+        ----------
+        payload : dict
+            The serialized message.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, payload)
+            except RuntimeError:  # the subscriber's loop is closed
+                self.unsubscribe(subscription)
+
+
+broker = MessageBroker()
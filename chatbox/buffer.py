@@ -0,0 +1,230 @@
+"""
+Write-coalescing buffer for chat messages.
+
+Under a burst of posts every ``Message.objects.create`` is its own transaction,
+and SQLite serializes them on its single writer lock. With ``CHAT_WRITE_BUFFER``
+enabled, posting threads hand their message to a shared buffer instead. A flush
+thread writes whatever accumulated with one ``bulk_create`` in one transaction,
+as soon as ``max_batch`` messages are waiting or the oldest has waited
+``max_delay`` seconds. Posting threads block until their message is committed,
+so callers still get the saved message back.
+
+Messages are written in arrival order, which keeps every user's messages in the
+order they were posted. The buffer holds at most ``max_pending`` messages; beyond
+that, posters wait up to their timeout and are then rejected with ``BufferFull``
+so the view can answer 503 instead of queueing without bound. A poster whose
+message is queued but not committed within its timeout gets ``WriteTimeout``;
+the message stays queued and may still be written.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from django.db import close_old_connections, transaction
+from .broker import broker
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 200
+MAX_DELAY = 0.02  # seconds a message may wait for its batch to fill
+MAX_PENDING = 5000
+WRITE_TIMEOUT = 5.0  # seconds a poster waits for room in the buffer and for its commit
+
+
+class BufferFull(Exception):
+    """Raised when the buffer stays full for longer than the poster's timeout."""
+
+
+class WriteTimeout(Exception):
+    """Raised when a queued message is not committed within the poster's timeout; it may still be written."""
+
+
+class MessageWriteBuffer:
+    """
+    Collects chat messages from many threads and writes them in batches.
+
+    Parameters
+    ----------
+    max_batch : int
+        Messages written per transaction at most; a full batch is flushed at once.
+    max_delay : float
+        Seconds the oldest pending message waits before a partial batch is flushed.
+    max_pending : int
+        Messages the buffer holds before posters are made to wait.
+    background : bool
+        Start a flush thread on first use. Without it ``flush`` must be called explicitly.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, max_delay=MAX_DELAY, max_pending=MAX_PENDING, background=True):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.background = background
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._metrics = {
+            'submitted': 0,
+            'written': 0,
+            'rejected': 0,
+            'timed_out': 0,
+            'failed': 0,
+            'batches': 0,
+            'max_pending': 0,
+            'blocked_submits': 0,
+            'flush_seconds': 0.0,
+            'wait_seconds': 0.0,
+        }
+
+    def submit(self, user, content, timeout=WRITE_TIMEOUT):
+        """
+        Queue a message for the next batch.
+
+        Parameters
+        ----------
+        user : User
+            The author of the message.
+        content : str
+            The message text.
+        timeout : float
+            Seconds to wait for room when the buffer is full.
+
+        Returns
+        -------
+        Future
+            Resolves to the saved ``Message`` once its batch is committed.
+
+        Raises
+        ------
+        BufferFull
+            If the buffer stays full for ``timeout`` seconds.
+        """
+        future = Future()
+        with self._condition:
+            if len(self._pending) >= self.max_pending:
+                self._metrics['blocked_submits'] += 1
+                if not self._condition.wait_for(lambda: len(self._pending) < self.max_pending, timeout):
+                    self._metrics['rejected'] += 1
+                    raise BufferFull("The chat write buffer is full.")
+            self._pending.append((Message(user=user, content=content), future, time.monotonic()))
+            self._metrics['submitted'] += 1
+            self._metrics['max_pending'] = max(self._metrics['max_pending'], len(self._pending))
+            self._condition.notify_all()
+        if self.background:
+            self._ensure_thread()
+        return future
+
+    def write(self, user, content, timeout=WRITE_TIMEOUT):
+        """
+        Queue a message and wait until it is committed.
+
+        Returns
+        -------
+        Message
+            The saved message.
+
+        Raises
+        ------
+        BufferFull
+            If the buffer stays full for ``timeout`` seconds; the message is not written.
+        WriteTimeout
+            If the message is not committed within ``timeout`` seconds. It stays
+            queued and may still be written, so retrying can post it twice.
+        """
+        future = self.submit(user, content, timeout)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            with self._condition:
+                self._metrics['timed_out'] += 1
+            raise WriteTimeout("The chat message was not committed in time.") from None
+
+    def flush(self):
+        """
+        Write every pending message, ``max_batch`` per transaction.
+
+        Returns
+        -------
+        int
+            The number of messages written.
+        """
+        written = 0
+        while True:
+            with self._condition:
+                batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+                self._condition.notify_all()
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def _write(self, batch):
+        started = time.monotonic()
+        messages = [message for message, _, _ in batch]
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(messages)
+        except Exception as error:
+            logger.exception("Writing a batch of %d chat messages failed", len(batch))
+            for _, future, _ in batch:
+                future.set_exception(error)
+            with self._condition:
+                self._metrics['failed'] += len(batch)
+            return 0
+
+        finished = time.monotonic()
+        for message, future, queued_at in batch:
+            future.set_result(message)
+            # bulk_create sends no post_save signal, so publish to the live streams here
+            broker.publish(message.to_dict())
+        with self._condition:
+            self._metrics['written'] += len(batch)
+            self._metrics['batches'] += 1
+            self._metrics['flush_seconds'] += finished - started
+            self._metrics['wait_seconds'] += sum(finished - queued_at for _, _, queued_at in batch)
+        return len(batch)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='chat-write-buffer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                # Give the batch until the oldest message's deadline to fill up
+                deadline = self._pending[0][2] + self.max_delay
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self.max_batch, max(0.0, deadline - time.monotonic())
+                )
+            close_old_connections()
+            self.flush()
+
+    def metrics(self):
+        """
+        Return throughput and back-pressure counters.
+
+        Returns
+        -------
+        dict
+            Counters of submitted, written, rejected, timed out and failed messages, the
+            number of batches, the current and highest number of pending messages,
+            how often posters had to wait for room, and the average batch size,
+            flush time and time from submit to commit.
+        """
+        with self._condition:
+            metrics = dict(self._metrics, pending=len(self._pending))
+        batches = metrics['batches'] or 1
+        written = metrics['written'] or 1
+        metrics['avg_batch_size'] = metrics['written'] / batches
+        metrics['avg_flush_ms'] = metrics.pop('flush_seconds') / batches * 1000
+        metrics['avg_wait_ms'] = metrics.pop('wait_seconds') / written * 1000
+        return metrics
+
+
+write_buffer = MessageWriteBuffer()
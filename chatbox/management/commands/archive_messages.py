@@ -0,0 +1,54 @@
+"""
+Management command that moves chat messages older than a retention window into
+the compressed monthly archive (see ``chatbox.archive``).
+
+Messages are archived in timestamp order, one batch at a time: a batch is
+appended to its month's segment and flushed before it is deleted from the
+database, so memory use is bounded by the batch size.
+
+Usage:
+    python manage.py archive_messages [--days 90] [--batch-size 1000] [--dir PATH]
+    python manage.py archive_messages --read 2024-05      # print an archived month
+"""
+from datetime import timedelta
+from itertools import groupby
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import now
+from chatbox.archive import append_to_segment, read_segment
+from chatbox.models import Message
+
+
+class Command(BaseCommand):
+    help = "Archive chat messages older than the retention window into monthly gzip JSON Lines segments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="Keep messages newer than this many days.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Messages archived per batch.")
+        parser.add_argument('--dir', help="Archive directory (defaults to CHAT_ARCHIVE_DIR).")
+        parser.add_argument('--read', metavar='YYYY-MM', help="Print the archived messages of a month instead.")
+
+    def handle(self, *args, **options):
+        if options['read']:
+            try:
+                for record in read_segment(options['read'], options['dir']):
+                    self.stdout.write(json.dumps(record))
+            except FileNotFoundError:
+                raise CommandError(f"No archive segment for {options['read']}.")
+            return
+
+        cutoff = now() - timedelta(days=options['days'])
+        expired = Message.objects.filter(timestamp__lt=cutoff).select_related('user').order_by('timestamp', 'id')
+        archived = 0
+        while True:
+            batch = list(expired[:options['batch_size']])
+            if not batch:
+                break
+            for month, messages in groupby(batch, key=lambda message: message.timestamp.strftime('%Y-%m')):
+                append_to_segment(month, [message.to_dict() for message in messages], options['dir'])
+            with transaction.atomic():
+                Message.objects.filter(id__in=[message.id for message in batch]).delete()
+            archived += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} message(s) older than {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,86 @@
+"""
+Load test of chat message writes under a burst of concurrent posters.
+
+Every client thread posts its messages as fast as it can, first with one
+``Message.objects.create`` per message and then through the write-coalescing
+buffer. The command reports messages per second, failed writes and the buffer's
+back-pressure metrics. It runs against the configured database and deletes its
+users and messages afterwards.
+
+Usage:
+    python manage.py bench_chat_writes [--clients 100] [--messages 20]
+"""
+import threading
+import time
+import uuid
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from chatbox.buffer import MessageWriteBuffer
+from chatbox.models import Message
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Measure chat messages per second with direct writes and with the write buffer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100, help="Concurrent posting threads.")
+        parser.add_argument('--messages', type=int, default=20, help="Messages posted per client.")
+        parser.add_argument('--max-batch', type=int, default=200)
+        parser.add_argument('--max-delay', type=float, default=0.02)
+
+    def handle(self, *args, **options):
+        tag = f"chatbench{uuid.uuid4().hex[:8]}"
+        User.objects.bulk_create([
+            User(username=f"{tag}_{i}", email=f"{tag}_{i}@example.com", password='!')
+            for i in range(options['clients'])
+        ])
+        users = list(User.objects.filter(username__startswith=f"{tag}_"))
+        try:
+            def direct(user, content):
+                Message.objects.create(user=user, content=content)
+
+            self._run("direct create", direct, users, options)
+
+            buffer = MessageWriteBuffer(max_batch=options['max_batch'], max_delay=options['max_delay'])
+            self._run("write buffer", buffer.write, users, options)
+            metrics = buffer.metrics()
+            self.stdout.write(
+                f"buffer: {metrics['batches']} batches, avg {metrics['avg_batch_size']:.1f} messages, "
+                f"avg flush {metrics['avg_flush_ms']:.1f} ms, avg wait {metrics['avg_wait_ms']:.1f} ms, "
+                f"peak pending {metrics['max_pending']}, rejected {metrics['rejected']}"
+            )
+        finally:
+            User.objects.filter(username__startswith=f"{tag}_").delete()
+
+    def _run(self, label, write, users, options):
+        failures = []
+        start = threading.Barrier(len(users) + 1)
+
+        def client(user):
+            start.wait()
+            try:
+                for i in range(options['messages']):
+                    try:
+                        write(user, f"load test message {i}")
+                    except Exception as error:
+                        failures.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        written = len(users) * options['messages'] - len(failures)
+        self.stdout.write(
+            f"{label + ':':<16}{written / elapsed:10.0f} messages/s "
+            f"({written} written, {len(failures)} failed in {elapsed:.2f}s)"
+        )
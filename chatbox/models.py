@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from .broker import broker
 
 # Get the custom user model
 User = get_user_model()
@@ -24,11 +27,19 @@ class Message(models.Model):
     -------
     __str__() :
         Returns a string representation of the message, including the user and timestamp.
+    to_dict() :
+        Returns the JSON-serializable form sent to chat clients.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)  # Link each message to a user
     content = models.TextField()  # The message content
     timestamp = models.DateTimeField(auto_now_add=True)  # The time when the message is sent
 
+    class Meta:
+        indexes = [
+            # Serves the latest-first window and its "load older" cursor
+            models.Index(fields=['timestamp', 'id'], name='chat_timestamp_idx'),
+        ]
+
     def __str__(self):
         """
         String representation of the Message object.
@@ -37,3 +48,30 @@ class Message(models.Model):
         "Message by <username> at <timestamp>"
         """
         return f"Message by {self.user.username} at {self.timestamp}"
+
+    def to_dict(self):
+        """
+        JSON-serializable representation of the message sent to chat clients.
+
+        Returns
+        -------
+        dict
+            The message id, author id and username, content and ISO 8601 timestamp.
+        """
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'user': self.user.username,
+            'content': self.content,
+            'timestamp': self.timestamp.isoformat(),
+        }
+
+
+@receiver(post_save, sender=Message)
+def publish_new_message(sender, instance, created, **kwargs):
+    """
+    Pushes a new message to the connected chat streams once it is committed.
+    """
+    if created:
+        payload = instance.to_dict()
+        transaction.on_commit(lambda: broker.publish(payload))
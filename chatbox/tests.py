@@ -1,7 +1,20 @@
+import asyncio
+import tempfile
+import threading
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import override_settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
+from Quiz_Portal.testing import QueryBudgetMixin
+from .archive import read_segment
+from .broker import MessageBroker
+from .buffer import BufferFull, MessageWriteBuffer, WriteTimeout
 from .models import Message
+from .views import stream_events
 
 # Get the custom user model
 User = get_user_model()
@@ -91,3 +104,256 @@ class ChatboxTests(TestCase):
         """
         new_message = Message.objects.create(user=self.user, content="Message with timestamp.")
         self.assertIsNotNone(new_message.timestamp)
+
+
+class ChatFetchAndStreamTests(TestCase):
+    """
+    Test case for the incremental message endpoint and the message stream.
+
+    Methods
+    -------
+    setUp() :
+        Creates a logged-in user and five messages.
+    test_messages_since_id() :
+        Tests that only newer messages are returned, within a bounded window.
+    test_messages_latest_window() :
+        Tests the latest window when no position is given.
+    test_json_post() :
+        Tests that a JSON client gets the created message instead of a redirect.
+    test_broker_cross_thread_publish() :
+        Tests that a message published from another thread reaches a subscriber.
+    test_stream_sends_backlog_then_pushed_messages() :
+        Tests that the stream replays newer messages, then forwards broker messages.
+    test_stream_view() :
+        Tests that the stream view requires a login and resumes from Last-Event-ID.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='chatter', email='chatter@example.com', password='testpassword')
+        self.client.force_login(self.user)
+        self.chat = [Message.objects.create(user=self.user, content=f"Message {i}") for i in range(5)]
+
+    def test_messages_since_id(self):
+        response = self.client.get(reverse('chat_messages_since'), {'after': self.chat[1].id, 'limit': 2})
+        data = response.json()
+        self.assertEqual([m['content'] for m in data['messages']], ["Message 2", "Message 3"])
+        self.assertTrue(data['has_more'])
+        self.assertEqual(data['messages'][0]['user'], 'chatter')
+
+        response = self.client.get(reverse('chat_messages_since'), {'after': self.chat[3].id})
+        self.assertEqual([m['id'] for m in response.json()['messages']], [self.chat[4].id])
+        self.assertFalse(response.json()['has_more'])
+        self.assertEqual(self.client.get(reverse('chat_messages_since'), {'after': 'x'}).status_code, 400)
+
+    def test_messages_latest_window(self):
+        data = self.client.get(reverse('chat_messages_since'), {'limit': 3}).json()
+        self.assertEqual([m['content'] for m in data['messages']], ["Message 2", "Message 3", "Message 4"])
+
+    def test_json_post(self):
+        response = self.client.post(
+            reverse('chatbox_home'), {'content': 'Pushed'}, HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['content'], 'Pushed')
+
+    def test_broker_cross_thread_publish(self):
+        broker = MessageBroker(queue_size=1)
+
+        async def receive():
+            subscription = broker.subscribe()
+            thread = threading.Thread(target=lambda: [broker.publish({'id': 1}), broker.publish({'id': 2})])
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0)  # run the delivery callbacks scheduled by the other thread
+            return subscription.queue.get_nowait(), subscription.overflowed
+
+        self.assertEqual(asyncio.run(receive()), ({'id': 1}, True))
+
+    async def test_stream_sends_backlog_then_pushed_messages(self):
+        from . import views
+
+        events = stream_events(self.chat[3].id, heartbeat=1, max_age=5)
+        retry, backlog = await events.__anext__(), await events.__anext__()
+        views.broker.publish({'id': self.chat[4].id + 1, 'content': 'Live'})
+        live = await events.__anext__()
+        await events.aclose()
+
+        self.assertEqual(retry, "retry: 3000\n\n")
+        self.assertIn('"Message 4"', backlog)
+        self.assertTrue(live.startswith(f"id: {self.chat[4].id + 1}\n"))
+
+    async def test_stream_view(self):
+        response = await self.async_client.get(reverse('chat_stream'))
+        self.assertEqual(response.status_code, 302)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('chat_stream'), HTTP_LAST_EVENT_ID=str(self.chat[4].id))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b"retry: 3000\n\n")
+        await events.aclose()
+
+
+class ChatHistoryTests(TestCase):
+    """
+    Test case for the "load older" cursor and the message archive.
+
+    Methods
+    -------
+    setUp() :
+        Creates a logged-in user, five messages and a temporary archive directory.
+    test_load_older_cursor() :
+        Tests that each window links to the next older one until the history ends.
+    test_archive_messages() :
+        Tests that expired messages move to monthly segments that can be read back.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='historian', email='historian@example.com', password='testpassword')
+        self.client.force_login(self.user)
+        self.chat = [Message.objects.create(user=self.user, content=f"Message {i}") for i in range(5)]
+        self.archive = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive.cleanup)
+
+    @mock.patch('chatbox.views.CHAT_WINDOW_SIZE', 2)
+    def test_load_older_cursor(self):
+        pages = []
+        url = reverse('chatbox_home')
+        params = {}
+        while True:
+            response = self.client.get(url, params)
+            pages.append([message.content for message in response.context['messages']])
+            if not response.context['older_cursor']:
+                break
+            self.assertEqual(response.context['live'], not params)
+            params = {'before': response.context['older_cursor']}
+        self.assertEqual(pages, [["Message 3", "Message 4"], ["Message 1", "Message 2"], ["Message 0"]])
+        self.assertEqual(self.client.get(url, {'before': 'nonsense'}).status_code, 400)
+
+    def test_archive_messages(self):
+        Message.objects.filter(pk__in=[self.chat[0].pk, self.chat[1].pk]).update(
+            timestamp=datetime(2024, 1, 15, tzinfo=timezone.utc))
+        Message.objects.filter(pk=self.chat[2].pk).update(timestamp=datetime(2024, 2, 1, tzinfo=timezone.utc))
+
+        with override_settings(CHAT_ARCHIVE_DIR=self.archive.name):
+            call_command('archive_messages', '--days', '30', '--batch-size', '2', stdout=StringIO())
+            self.assertEqual(list(Message.objects.values_list('content', flat=True)), ["Message 3", "Message 4"])
+            self.assertEqual([r['content'] for r in read_segment('2024-01')], ["Message 0", "Message 1"])
+            self.assertEqual([r['id'] for r in read_segment('2024-02')], [self.chat[2].id])
+
+            # A later run appends another gzip member to the same segment
+            Message.objects.filter(pk=self.chat[3].pk).update(timestamp=datetime(2024, 1, 20, tzinfo=timezone.utc))
+            call_command('archive_messages', '--days', '30', stdout=StringIO())
+            self.assertEqual(len(list(read_segment('2024-01'))), 3)
+
+            response = self.client.get(reverse('chatbox_home'))
+            self.assertEqual(response.context['archived_months'], ['2024-01', '2024-02'])
+            response = self.client.get(reverse('chat_archive', args=['2024-02']))
+            self.assertIn(b'"Message 2"', b''.join(response.streaming_content))
+            self.assertEqual(self.client.get(reverse('chat_archive', args=['2023-12'])).status_code, 404)
+
+
+class MessageWriteBufferTests(TestCase):
+    """
+    Test case for the write-coalescing chat buffer, flushed explicitly.
+
+    Methods
+    -------
+    setUp() :
+        Creates two users.
+    test_flush_in_batches_keeps_order() :
+        Tests that pending messages are written in arrival order, ``max_batch`` at a time.
+    test_back_pressure() :
+        Tests that a full buffer rejects posters after their timeout.
+    test_write_timeout() :
+        Tests that an uncommitted write times out with ``WriteTimeout`` and answers 503.
+    test_metrics_view_is_staff_only() :
+        Tests that only staff can read the buffer metrics.
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='testpassword')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='testpassword')
+
+    def test_flush_in_batches_keeps_order(self):
+        buffer = MessageWriteBuffer(max_batch=2, background=False)
+        posts = [(self.alice, "a1"), (self.bob, "b1"), (self.alice, "a2")]
+        futures = [buffer.submit(user, content) for user, content in posts]
+        self.assertFalse(Message.objects.exists())
+
+        self.assertEqual(buffer.flush(), 3)
+        saved = [future.result(0) for future in futures]
+        self.assertEqual([message.content for message in saved], ["a1", "b1", "a2"])
+        self.assertEqual(
+            list(Message.objects.order_by('id').values_list('content', flat=True)), ["a1", "b1", "a2"]
+        )
+        metrics = buffer.metrics()
+        self.assertEqual((metrics['written'], metrics['batches'], metrics['pending']), (3, 2, 0))
+        self.assertEqual(metrics['avg_batch_size'], 1.5)
+
+    def test_back_pressure(self):
+        buffer = MessageWriteBuffer(max_pending=1, background=False)
+        buffer.submit(self.alice, "first")
+        with self.assertRaises(BufferFull):
+            buffer.submit(self.bob, "second", timeout=0)
+        metrics = buffer.metrics()
+        self.assertEqual((metrics['blocked_submits'], metrics['rejected'], metrics['max_pending']), (1, 1, 1))
+
+    def test_write_timeout(self):
+        buffer = MessageWriteBuffer(background=False)
+        with self.assertRaises(WriteTimeout):
+            buffer.write(self.alice, "late", timeout=0)
+        self.assertEqual(buffer.metrics()['timed_out'], 1)
+        # The message stays queued and is written by the next flush
+        self.assertEqual(buffer.flush(), 1)
+        self.assertTrue(Message.objects.filter(content="late").exists())
+
+        self.client.force_login(self.alice)
+        with mock.patch('chatbox.views.save_message', side_effect=WriteTimeout):
+            response = self.client.post(reverse('chatbox_home'), {'content': 'Slow'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_metrics_view_is_staff_only(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('chat_buffer_metrics')).status_code, 302)
+        self.alice.is_staff = True
+        self.alice.save()
+        self.assertIn('avg_wait_ms', self.client.get(reverse('chat_buffer_metrics')).json())
+
+
+@override_settings(CHAT_WRITE_BUFFER=True)
+class BufferedPostTests(TransactionTestCase):
+    """
+    Test case for posting through the write buffer's flush thread.
+
+    Methods
+    -------
+    test_buffered_post() :
+        Tests that a buffered JSON post returns the committed message.
+    """
+
+    def test_buffered_post(self):
+        user = User.objects.create_user(username='burst', email='burst@example.com', password='testpassword')
+        self.client.force_login(user)
+        with mock.patch('chatbox.views.write_buffer', MessageWriteBuffer(max_delay=0.001)):
+            response = self.client.post(reverse('chatbox_home'), {'content': 'Buffered'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Message.objects.get(pk=response.json()['id']).content, 'Buffered')
+
+
+class ChatQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    The chat page runs a fixed number of queries however many messages there are.
+    """
+
+    def test_chatbox_home(self):
+        user = User.objects.create_user(username='budget', email='budget@example.com', password='pass')
+        self.client.force_login(user)
+
+        def grow(size):
+            Message.objects.bulk_create(
+                Message(user=user, content=f"Message {i}") for i in range(Message.objects.count(), size)
+            )
+
+        self.assertQueryBudget(lambda: self.client.get(reverse('chatbox_home')), budget=3, grow=grow)
@@ -3,4 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.chatbox_home, name='chatbox_home'),  # Maps the home page of the chatbox
+    path('messages/', views.messages_since, name='chat_messages_since'),  # JSON window of newer messages
+    path('stream/', views.message_stream, name='chat_stream'),  # Server-Sent Events of new messages
+    path('buffer-metrics/', views.chat_buffer_metrics, name='chat_buffer_metrics'),  # Write buffer counters (staff)
+    path('archive/<str:month>/', views.chat_archive, name='chat_archive'),  # Archived month as JSON Lines
 ]
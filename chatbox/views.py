@@ -1,17 +1,42 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.timezone import is_naive, make_aware
+from .archive import archived_months, read_segment
+from .broker import broker
+from .buffer import BufferFull, WriteTimeout, write_buffer
 from .models import Message
 
+CHAT_WINDOW_SIZE = 50  # messages rendered with the page
+MAX_FETCH_SIZE = 100  # messages returned by one messages_since request
+STREAM_HEARTBEAT = 15  # seconds between database catch-ups on an idle stream
+STREAM_MAX_AGE = 300  # seconds before a stream closes and the client reconnects
+
+
+def wants_json(request):
+    return 'application/json' in request.headers.get('Accept', '')
+
+
 @login_required
 def chatbox_home(request):
     """
     View function for the chatbox home page.
 
-    This view displays all the messages in the chatbox and allows authenticated 
-    users to submit new messages. The messages are ordered by timestamp, and 
-    new messages are added via a POST request.
+    This view displays one window of messages in the chatbox and allows authenticated
+    users to submit new messages. The latest window is shown by default and older
+    windows are reached through the ``before`` cursor ("load older"). Newer messages
+    are pushed to the page by ``message_stream``, so history is never rendered whole.
 
     If the request method is POST, a new message is created and saved to the database.
+    Clients that accept JSON get the created message back instead of a redirect.
 
     Parameters
     ----------
@@ -21,17 +46,261 @@ def chatbox_home(request):
     Returns
     -------
     HttpResponse
-        Renders the 'chatbox/chatbox_home.html' template with the list of messages
-        or redirects to the same page after a new message is submitted.
+        Renders the 'chatbox/chatbox_home.html' template with a window of messages,
+        or redirects to the same page (or returns the message as JSON) after a new
+        message is submitted.
     """
-    # Fetch all messages, order by timestamp so the latest messages appear last
-    messages = Message.objects.all().order_by('timestamp')
-    
     if request.method == 'POST':
         # If the user submits a message, save it
         content = request.POST.get('content')
+        message = None
         if content:
-            Message.objects.create(user=request.user, content=content)
+            try:
+                message = save_message(request.user, content)
+            except BufferFull:
+                response = HttpResponse("The chat is busy, please try again.", status=503)
+                response['Retry-After'] = '1'
+                return response
+            except WriteTimeout:
+                # The message is still queued, so a blind retry could post it twice
+                response = HttpResponse(
+                    "The chat is busy and your message may still appear; check before sending it again.", status=503
+                )
+                response['Retry-After'] = '1'
+                return response
+        if wants_json(request):
+            if message is None:
+                return JsonResponse({'error': "Message content is required."}, status=400)
+            return JsonResponse(message.to_dict(), status=201)
         return redirect('chatbox_home')  # Redirect to the same page to reload the messages
 
-    return render(request, 'chatbox/chatbox_home.html', {'messages': messages})
+    # Fetch one window of messages, newest first, starting below the "load older" cursor
+    window = Message.objects.select_related('user').order_by('-timestamp', '-id')
+    before = request.GET.get('before')
+    if before:
+        try:
+            timestamp, message_id = decode_cursor(before)
+        except ValueError:
+            return HttpResponse("Invalid 'before' cursor.", status=400)
+        window = window.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id))
+    rows = list(window[:CHAT_WINDOW_SIZE + 1])
+    has_older = len(rows) > CHAT_WINDOW_SIZE
+
+    # Oldest first so the latest messages appear last
+    messages = list(reversed(rows[:CHAT_WINDOW_SIZE]))
+    return render(request, 'chatbox/chatbox_home.html', {
+        'messages': messages,
+        'live': not before,  # only the latest window follows new messages
+        'last_message_id': messages[-1].id if messages else 0,
+        'older_cursor': encode_cursor(messages[0]) if has_older else None,
+        'archived_months': [] if has_older else archived_months(),
+    })
+
+
+def save_message(user, content):
+    """
+    Save a chat message, through the write buffer when ``CHAT_WRITE_BUFFER`` is enabled.
+
+    Raises
+    ------
+    BufferFull
+        If the write buffer stays full for its timeout.
+    WriteTimeout
+        If the buffered message is not committed within the timeout; it may still be written.
+    """
+    if settings.CHAT_WRITE_BUFFER:
+        return write_buffer.write(user, content)
+    return Message.objects.create(user=user, content=content)
+
+
+def encode_cursor(message):
+    return f"{message.timestamp.isoformat()}_{message.id}"
+
+
+def decode_cursor(cursor):
+    """
+    Split a "load older" cursor into its timestamp and message id.
+
+    Raises
+    ------
+    ValueError
+        If the cursor is malformed.
+    """
+    timestamp, message_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(timestamp), int(message_id)
+
+
+def fetch_messages_after(message_id, limit=MAX_FETCH_SIZE):
+    """
+    Return up to ``limit`` serialized messages newer than ``message_id``, oldest first.
+    """
+    rows = Message.objects.select_related('user').filter(id__gt=message_id).order_by('id')[:limit]
+    return [message.to_dict() for message in rows]
+
+
+@login_required
+def messages_since(request):
+    """
+    Returns a bounded window of messages newer than a message id or a timestamp.
+
+    Query parameters
+    ----------------
+    after : int, optional
+        Only return messages with a larger id.
+    since : str, optional
+        Only return messages posted after this ISO 8601 timestamp.
+    limit : int, optional
+        Maximum number of messages, at most ``MAX_FETCH_SIZE``.
+
+    Without ``after`` or ``since`` the latest messages are returned.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request object containing metadata about the request.
+
+    Returns
+    -------
+    JsonResponse
+        ``messages`` oldest first, and ``has_more`` when the window was cut off.
+    """
+    try:
+        limit = min(int(request.GET.get('limit', MAX_FETCH_SIZE)), MAX_FETCH_SIZE)
+        if limit < 1:
+            raise ValueError(limit)
+        after = request.GET.get('after')
+        since = request.GET.get('since')
+        queryset = Message.objects.select_related('user')
+        if after is not None:
+            queryset = queryset.filter(id__gt=int(after)).order_by('id')
+        elif since is not None:
+            since = datetime.fromisoformat(since)
+            if is_naive(since):
+                since = make_aware(since)
+            queryset = queryset.filter(timestamp__gt=since).order_by('timestamp', 'id')
+        else:
+            queryset = queryset.order_by('-timestamp', '-id')
+    except ValueError:
+        return HttpResponse("Invalid 'after', 'since' or 'limit' parameter.", status=400)
+
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is None and since is None:
+        rows.reverse()
+    return JsonResponse({'messages': [message.to_dict() for message in rows], 'has_more': has_more})
+
+
+def format_event(payload):
+    return f"id: {payload['id']}\nevent: message\ndata: {json.dumps(payload)}\n\n"
+
+
+async def stream_events(last_id, heartbeat=STREAM_HEARTBEAT, max_age=STREAM_MAX_AGE):
+    """
+    Yield Server-Sent Events for every message newer than ``last_id``.
+
+    Messages are taken from the in-process broker as they are published. The
+    database is consulted at start, after an overflow and on every idle heartbeat,
+    so nothing is missed between reconnects or across processes.
+    """
+    subscription = broker.subscribe()
+    fetch = sync_to_async(fetch_messages_after)
+    deadline = time.monotonic() + max_age
+    try:
+        yield "retry: 3000\n\n"
+        pending = await fetch(last_id)
+        while True:
+            for payload in pending:
+                if payload['id'] > last_id:
+                    last_id = payload['id']
+                    yield format_event(payload)
+            # Catch up from the database after an overflow or while the backlog fills whole windows
+            if subscription.overflowed or len(pending) >= MAX_FETCH_SIZE:
+                subscription.overflowed = False
+                pending = await fetch(last_id)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                pending = [await asyncio.wait_for(subscription.queue.get(), min(heartbeat, remaining))]
+            except asyncio.TimeoutError:
+                pending = await fetch(last_id)
+                if not pending:
+                    yield ": keep-alive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@login_required
+async def message_stream(request):
+    """
+    Server-Sent Events stream of new chat messages.
+
+    Clients resume from the ``Last-Event-ID`` header that ``EventSource`` sends on
+    reconnect, or from the ``after`` query parameter. The stream closes after
+    ``STREAM_MAX_AGE`` seconds and the browser reconnects on its own.
+
+    The stream is meant to be served by an ASGI server (``Quiz_Portal.asgi``);
+    under WSGI a worker would be held for the whole stream.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request object containing metadata about the request.
+
+    Returns
+    -------
+    StreamingHttpResponse
+        A ``text/event-stream`` response.
+    """
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or 0)
+    except ValueError:
+        return HttpResponse("Invalid 'after' parameter.", status=400)
+
+    response = StreamingHttpResponse(stream_events(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # keep reverse proxies from buffering the stream
+    return response
+
+
+@login_required
+def chat_archive(request, month):
+    """
+    Streams the archived messages of a month as JSON Lines.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request object containing metadata about the request.
+    month : str
+        The ``YYYY-MM`` month to read.
+
+    Returns
+    -------
+    StreamingHttpResponse
+        One JSON message per line, oldest first.
+    """
+    if month not in archived_months():
+        raise Http404("No archived messages for this month.")
+    lines = (json.dumps(record) + "\n" for record in read_segment(month))
+    return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+
+@staff_member_required
+def chat_buffer_metrics(request):
+    """
+    Reports the throughput and back-pressure counters of the chat write buffer.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request object containing metadata about the request.
+
+    Returns
+    -------
+    JsonResponse
+        The counters of ``MessageWriteBuffer.metrics`` and whether the buffer is enabled.
+    """
+    return JsonResponse(dict(write_buffer.metrics(), enabled=settings.CHAT_WRITE_BUFFER))
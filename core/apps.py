@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from Quiz_Portal.database import apply_sqlite_pragmas
+        from Quiz_Portal.profiling import instrument_connection
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='apply_sqlite_pragmas')
+        connection_created.connect(instrument_connection, dispatch_uid='profiling_instrument_connection')
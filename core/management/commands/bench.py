@@ -0,0 +1,257 @@
+"""
+Benchmark suite: every page of the site against synthetic data at a given scale.
+
+The command creates a throwaway test database, fills it with
+``core.synthetic.generate_dataset`` and requests every URL of
+``Quiz_Portal/urls.py`` through the test client as a logged-in staff user. Each
+URL gets a few warm-up requests and then ``--iterations`` measured ones; the
+latency percentiles and SQL query counts are printed and written as JSON.
+Quiz submission is measured as well, with a fresh user per request whose quiz
+session is started by an unmeasured request for the quiz page; the command fails
+if a submission is not graded.
+
+With ``--baseline`` the results are compared with a stored run of the same
+scale, and the command fails when a page's median latency or query count grew
+by more than ``--threshold``. ``--update-baseline`` stores the current run as
+the new baseline instead. The admin site, allauth pages and pages that cannot
+be requested repeatedly (logout, e-mail verification, the chat event stream)
+are listed as skipped.
+
+Usage:
+    python manage.py bench [--scale 1k|100k|1m | --participants N] [--seed 0]
+        [--iterations 20] [--output bench-results.json]
+        [--baseline benchmarks/baseline-1k.json [--threshold 0.2] [--min-delta-ms 5] [--update-baseline]]
+"""
+import json
+import logging
+import math
+import platform
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import URLPattern, URLResolver, Resolver404, get_resolver, resolve, reverse
+from Quiz_Portal.profiling import profiled
+from core.synthetic import SCALES, generate_dataset
+from participation.models import Participant
+from quiz.models import Question, Quiz
+from blog.models import Blog
+
+SKIPPED_PREFIXES = ('admin/', 'accounts/')
+SKIPPED_VIEWS = {
+    'logout': "ends the session",
+    'verify': "needs a one-time e-mail token",
+    'chat_stream': "an open-ended event stream",
+}
+WARMUP = 3
+
+
+def iter_patterns(patterns, prefix=''):
+    """
+    Yield ``(route, pattern)`` for every named URL pattern, descending into includes.
+    """
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_patterns(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield route, pattern
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def is_graded(response):
+    """
+    Whether a quiz submission was graded, or queued for grading with a redirect to its result page.
+    """
+    if response.status_code == 200:
+        return True
+    if response.status_code != 302:
+        return False
+    try:
+        return resolve(response.url).url_name == 'submission_result'
+    except Resolver404:
+        return False
+
+
+class Command(BaseCommand):
+    help = "Benchmark every URL against synthetic data and compare the results with a baseline."
+
+    def add_arguments(self, parser):
+        scale = parser.add_mutually_exclusive_group()
+        scale.add_argument('--scale', choices=SCALES, default='1k', help="Preset number of participants.")
+        scale.add_argument('--participants', type=int, help="Exact number of participants.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=20, help="Measured requests per URL.")
+        parser.add_argument('--output', default='bench-results.json', help="Where to write the JSON results.")
+        parser.add_argument('--baseline', help="JSON results of an earlier run to compare with.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed relative growth of median latency and query count.")
+        parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                            help="Latency growth below this many milliseconds is noise, whatever the threshold.")
+        parser.add_argument('--update-baseline', action='store_true',
+                            help="Write this run to --baseline instead of comparing with it.")
+
+    def handle(self, *args, **options):
+        if options['update_baseline'] and not options['baseline']:
+            raise CommandError("--update-baseline needs --baseline.")
+        participants = options['participants'] or SCALES[options['scale']]
+        spare_users = WARMUP + options['iterations']
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        request_logger = logging.getLogger('django.request')
+        request_log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)  # expected 403s and 404s would drown the report
+        try:
+            started = time.perf_counter()
+            dataset = generate_dataset(participants, seed=options['seed'], spare_users=spare_users)
+            generated = time.perf_counter() - started
+            self.stdout.write(
+                f"Generated {dataset.participants} participants, {dataset.responses} responses, "
+                f"{dataset.quizzes} quizzes and {dataset.users} users in {generated:.1f}s"
+            )
+            results, skipped = self._run(dataset, options)
+        finally:
+            request_logger.setLevel(request_log_level)
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'scale': participants,
+            'seed': options['seed'],
+            'iterations': options['iterations'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'generated_seconds': round(generated, 2),
+            'results': results,
+            'skipped': skipped,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self._print(results, skipped)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            if options['update_baseline']:
+                with open(options['baseline'], 'w') as output:
+                    json.dump(report, output, indent=2)
+                self.stdout.write(f"Baseline {options['baseline']} updated")
+            else:
+                self._compare(report, options['baseline'], options['threshold'], options['min_delta_ms'])
+
+    def _targets(self):
+        """
+        Return the URL of every benchmarked view and the reasons the others are skipped.
+        """
+        user = Participant.objects.select_related('user').order_by('user_id').first().user
+        user.is_staff = True
+        user.save(update_fields=['is_staff'])
+        taken = Participant.objects.filter(user=user).values('quiz_id')
+        fresh_quiz = Quiz.objects.exclude(quiz_id__in=taken).filter(expiry_date__isnull=True).first()
+        kwargs = {
+            'quiz_id': fresh_quiz.quiz_id,
+            'participant_id': Participant.objects.filter(user=user).first().participant_id,
+            'id': Blog.objects.order_by('id').first().id,
+        }
+
+        targets, skipped = {}, {}
+        for route, pattern in iter_patterns(get_resolver().url_patterns):
+            if route.startswith(SKIPPED_PREFIXES):
+                continue
+            if pattern.name in SKIPPED_VIEWS:
+                skipped[pattern.name] = SKIPPED_VIEWS[pattern.name]
+                continue
+            try:
+                targets[pattern.name] = reverse(
+                    pattern.name, kwargs={name: kwargs[name] for name in pattern.pattern.converters}
+                )
+            except KeyError as missing:
+                skipped[pattern.name] = f"no synthetic value for {missing}"
+        return user, fresh_quiz, targets, skipped
+
+    def _measure(self, request, iterations):
+        latencies, queries, statuses = [], [], set()
+        for i in range(WARMUP + iterations):
+            with profiled() as profile:
+                response = request(i)
+            if i >= WARMUP:
+                latencies.append(profile.seconds * 1000)
+                queries.append(profile.queries)
+                statuses.add(response.status_code)
+        return {
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p90_ms': round(percentile(latencies, 0.9), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(max(latencies), 2),
+            'queries': percentile(queries, 0.5),
+            'queries_max': max(queries),
+        }
+
+    def _run(self, dataset, options):
+        user, fresh_quiz, targets, skipped = self._targets()
+        client = Client()
+        client.force_login(user)
+
+        results = {}
+        for name, path in sorted(targets.items()):
+            results[name] = dict(path=path, **self._measure(lambda i: client.get(path), options['iterations']))
+
+        # Submitting a quiz only works once per user, so every request comes from a spare user
+        answers = {
+            f"selected_option_{no}": 'A'
+            for no in Question.objects.filter(quiz=fresh_quiz).values_list('question_no', flat=True)
+        }
+        path = reverse('participate', kwargs={'quiz_id': fresh_quiz.quiz_id})
+        submitters = [Client() for _ in dataset.spare_user_ids]
+        for submitter, user_id in zip(submitters, dataset.spare_user_ids):
+            submitter.force_login(get_user_model().objects.get(pk=user_id))
+            submitter.get(path)  # starts the quiz session the submission is checked against
+
+        def submit(i):
+            response = submitters[i].post(path, answers)
+            if not is_graded(response):
+                raise CommandError(f"submit_quiz was not graded: status {response.status_code}")
+            return response
+
+        results['submit_quiz'] = dict(path=path, **self._measure(submit, options['iterations']))
+        return results, skipped
+
+    def _print(self, results, skipped):
+        self.stdout.write(f"{'view':<24}{'status':<12}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for name, result in results.items():
+            status = ','.join(map(str, result['status']))
+            self.stdout.write(
+                f"{name:<24}{status:<12}{result['p50_ms']:>9.1f}{result['p90_ms']:>9.1f}"
+                f"{result['p99_ms']:>9.1f}{result['queries']:>9}"
+            )
+        for name, reason in skipped.items():
+            self.stdout.write(f"{name:<24}skipped: {reason}")
+
+    def _compare(self, report, path, threshold, min_delta_ms):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['scale'] != report['scale']:
+            raise CommandError(f"The baseline was recorded with {baseline['scale']} participants, not {report['scale']}.")
+
+        regressions = []
+        for name, before in baseline['results'].items():
+            after = report['results'].get(name)
+            if after is None:
+                continue
+            if after['p50_ms'] > before['p50_ms'] * (1 + threshold) and after['p50_ms'] - before['p50_ms'] > min_delta_ms:
+                regressions.append(f"{name}: median {before['p50_ms']:.1f} ms -> {after['p50_ms']:.1f} ms")
+            if after['queries'] > before['queries'] * (1 + threshold):
+                regressions.append(f"{name}: {before['queries']} -> {after['queries']} queries")
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(f"No regressions against {path} (threshold {threshold:.0%})")
@@ -0,0 +1,83 @@
+"""
+Fill the configured database with seeded synthetic data for load testing.
+
+Creates users with their profiles, tags, quizzes and questions, finished
+participants with their responses, feedback, blogs and chat messages, plus the
+quiz statistics, leaderboard entries and user scores derived from them, with
+``core.synthetic.generate_dataset`` (the generator ``bench`` uses). Rows are
+written in batches without model signals, so ten million responses take
+minutes on SQLite.
+
+The same ``--seed`` and ``--prefix`` reproduce the same rows. Usernames,
+emails and tag names start with the prefix, so datasets with different
+prefixes can share a database; a prefix that is already taken is refused.
+
+Usage:
+    python manage.py generate_fixture_data [--participants 100000 | --responses 10000000] [--seed 0]
+        [--prefix synth0] [--questions-per-quiz 10] [--participations-per-user 10]
+        [--blogs N] [--messages N] [--feedback-rate 0.1] [--packed] [--batch-size 50000]
+"""
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core.synthetic import generate_dataset
+
+
+class Command(BaseCommand):
+    help = "Bulk-create a seeded synthetic dataset: users, quizzes, participants, responses and more."
+
+    def add_arguments(self, parser):
+        size = parser.add_mutually_exclusive_group()
+        size.add_argument('--participants', type=int, help="Finished participants to create (default 100000).")
+        size.add_argument('--responses', type=int,
+                          help="Responses to create; the participants follow from --questions-per-quiz.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', help="Prefix of the generated names. Defaults to 'synth' and the seed.")
+        parser.add_argument('--questions-per-quiz', type=int, default=10)
+        parser.add_argument('--participations-per-user', type=int, default=10)
+        parser.add_argument('--blogs', type=int, help="Blog posts. Defaults to one per 100 participants.")
+        parser.add_argument('--messages', type=int, help="Chat messages. Defaults to one per 10 participants.")
+        parser.add_argument('--feedback-rate', type=float, default=0.1,
+                            help="Share of the participants leaving feedback.")
+        parser.add_argument('--packed', action='store_true', default=None,
+                            help="Store answers packed on the participant instead of as responses.")
+        parser.add_argument('--batch-size', type=int, default=50_000, help="Rows per batch and transaction.")
+
+    def handle(self, *args, **options):
+        if options['responses'] is not None:
+            participants = -(-options['responses'] // options['questions_per_quiz'])
+        else:
+            participants = options['participants'] or 100_000
+        if participants < 1:
+            raise CommandError("Create at least one participant.")
+        if not 0 <= options['feedback_rate'] <= 1:
+            raise CommandError("--feedback-rate must lie between 0 and 1.")
+        prefix = options['prefix'] or f"synth{options['seed']}"
+        if get_user_model().objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"Users with the prefix {prefix!r} exist already; choose another --prefix.")
+
+        started = time.perf_counter()
+
+        def progress(created):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {created}/{participants} participants ({elapsed:.1f}s)")
+
+        dataset = generate_dataset(
+            participants,
+            seed=options['seed'],
+            questions_per_quiz=options['questions_per_quiz'],
+            participations_per_user=options['participations_per_user'],
+            blogs=options['blogs'],
+            messages=options['messages'],
+            feedback_rate=options['feedback_rate'],
+            packed=options['packed'],
+            batch_size=options['batch_size'],
+            prefix=prefix,
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {dataset.users} users, {dataset.quizzes} quizzes, {dataset.participants} participants "
+            f"and {dataset.responses} responses with prefix {prefix!r} in {elapsed:.1f}s "
+            f"({dataset.responses / elapsed:,.0f} responses/s)"
+        ))
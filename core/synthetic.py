@@ -0,0 +1,326 @@
+"""
+Synthetic data at benchmark scale.
+
+``generate_dataset`` fills every model with plausible, seeded data: users with
+their profiles, tags, quizzes and their questions, finished participants with
+their answers, feedback, blogs and chat messages, followed by the derived
+quiz statistics, leaderboard entries and user scores. No model signals fire;
+the rows those signals would have added (profiles, aggregates, the search
+index) are written in bulk as well.
+
+The small tables are written with batched ``bulk_create``. Participants,
+responses, feedback and leaderboard entries, which grow with the scale, skip
+model instances altogether: their rows are built as plain tuples (with every
+column, since model defaults are not applied) and inserted with
+``executemany``, one transaction per batch. Primary keys share a high half
+drawn from the seed and the prefix and count up in the low half, so a seed
+reproduces the same rows and every index is appended to in order. On SQLite,
+``bulk_load`` also turns off syncing during the load, which
+keeps ten million responses within minutes.
+
+Every user takes ``participations_per_user`` different quizzes, so the number
+of users and quizzes follows from the requested number of participants.
+"""
+import itertools
+import random
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.timezone import now
+from blog.models import Blog
+from chatbox.models import Message
+from feedback.models import Feedback
+from leaderboard.models import LeaderboardEntry, LeaderboardScore
+from participation.models import Participant, Response
+from participation.packing import pack_answers
+from quiz.listing import invalidate_listing
+from quiz.models import Question, Quiz, QuizStats
+from quiz.tag_index import invalidate_tag_index
+from search.indexing import index_objects
+from User_Profile.models import Profile, UserScore
+from .tags import resolve_tags
+
+User = get_user_model()
+
+OPTIONS = 'ABCD'
+PASSWORD = 'synthetic-password'
+
+Dataset = namedtuple('Dataset', 'prefix users quizzes participants responses spare_user_ids')
+
+SCALES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+
+def _bulk_create(model, rows, batch_size):
+    model.objects.bulk_create(rows, batch_size=batch_size)
+    return rows
+
+
+# Fields whose Python values the database adapter takes as they are
+PLAIN_TYPES = {
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'BooleanField', 'CharField', 'FloatField',
+    'IntegerField', 'PositiveIntegerField', 'PositiveSmallIntegerField', 'SmallIntegerField', 'TextField',
+}
+
+
+def _converter(field, connection):
+    """
+    Return the fastest function preparing a value of ``field`` the way ``get_db_prep_save`` does.
+    """
+    target = field.target_field if field.is_relation else field
+    internal_type = target.get_internal_type()
+    if internal_type in PLAIN_TYPES:
+        return None
+    if internal_type == 'UUIDField' and not connection.features.has_native_uuid_field:
+        return lambda value: None if value is None else value.hex
+    return lambda value: field.get_db_prep_save(value, connection)
+
+
+def insert_rows(model, field_names, rows):
+    """
+    Insert plain value tuples into a model's table with one ``executemany``.
+
+    Each value is prepared for the database as ``save`` would prepare it, but
+    no model instance is built, no defaults are applied and no signals are
+    sent. Values of plain columns are passed through unchanged.
+
+    Args:
+        model (Model): The model whose table receives the rows.
+        field_names (list of str): The fields, in the order of the values of each row.
+        rows (list of tuple): The rows.
+    """
+    if not rows:
+        return
+    connection = connections[DEFAULT_DB_ALIAS]  # the thread's connection itself, not the proxy
+    fields = [model._meta.get_field(name) for name in field_names]
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    converters = [(i, _converter(field, connection)) for i, field in enumerate(fields)]
+    converters = [(i, convert) for i, convert in converters if convert is not None]
+    if converters:
+        prepared = []
+        for row in rows:
+            row = list(row)
+            for i, convert in converters:
+                row[i] = convert(row[i])
+            prepared.append(row)
+        rows = prepared
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+# SQLite settings while loading: no fsync and a 256 MiB page cache
+LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': -262144,
+}
+
+
+@contextmanager
+def bulk_load(using=DEFAULT_DB_ALIAS):
+    """
+    Trade durability for write speed on SQLite while a dataset is generated.
+
+    A crash during the load may lose the generated rows, which are disposable.
+    The previous settings are restored and the write-ahead log is checkpointed
+    afterwards. Automatic checkpoints stay on: a write-ahead log growing to the
+    size of the dataset slows down every lookup in it. Other databases, and connections inside a transaction (where
+    SQLite refuses to change ``synchronous``), are left as they are.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        previous = {}
+        for name, value in LOAD_PRAGMAS.items():
+            previous[name] = cursor.execute(f"PRAGMA {name}").fetchone()[0]
+            cursor.execute(f"PRAGMA {name} = {value}")
+        try:
+            yield
+        finally:
+            for name, value in previous.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+            cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def generate_dataset(participants, seed=0, questions_per_quiz=10, participations_per_user=10,
+                     spare_users=0, blogs=None, messages=None, feedback_rate=0.1, packed=None,
+                     batch_size=5000, prefix='synth', progress=None):
+    """
+    Create a synthetic dataset with the given number of finished participants.
+
+    Args:
+        participants (int): Finished participants to create, each with one response per question.
+        seed (int): Seed of the random choices, so a scale is reproduced exactly.
+        questions_per_quiz (int): Questions of every quiz.
+        participations_per_user (int): Quizzes taken by every user.
+        spare_users (int): Extra users without any participation, e.g. for submission benchmarks.
+        blogs (int, optional): Blog posts to create. Defaults to one per 100 participants, at least 20.
+        messages (int, optional): Chat messages to create. Defaults to one per 10 participants, at least 100.
+        feedback_rate (float): Share of the participants that leave feedback.
+        packed (bool, optional): Store answers packed on the participant instead of as
+            ``Response`` rows. Defaults to ``PARTICIPATION_PACKED_RESPONSES``.
+        batch_size (int): Rows written per statement batch and transaction.
+        prefix (str): Prefix of the generated usernames, emails and tag names.
+        progress (callable, optional): Called with the number of participants written so far.
+
+    Returns:
+        Dataset: The row counts and the ids of the spare users.
+    """
+    with bulk_load():
+        return _generate(participants, seed, questions_per_quiz, participations_per_user, spare_users,
+                         blogs, messages, feedback_rate, packed, batch_size, prefix, progress)
+
+
+def _generate(participants, seed, questions_per_quiz, participations_per_user, spare_users,
+              blogs, messages, feedback_rate, packed, batch_size, prefix, progress):
+    rng = random.Random(seed)
+    packed = settings.PARTICIPATION_PACKED_RESPONSES if packed is None else packed
+    blogs = max(20, participants // 100) if blogs is None else blogs
+    messages = max(100, participants // 10) if messages is None else messages
+    moment = now()
+
+    # Ids share a random high half per seed and prefix and count up in the low half, so every
+    # index receives them in order instead of at random places
+    id_base = random.Random(f"{seed}:{prefix}").getrandbits(64) << 64
+    id_counter = itertools.count()
+
+    def new_uuid():
+        return uuid.UUID(int=id_base | next(id_counter), version=4)
+
+    user_count = max(1, -(-participants // participations_per_user))
+    quiz_count = max(participations_per_user, participants // 500, 20)
+    password = make_password(PASSWORD)  # hashed once, shared by every user
+
+    with transaction.atomic():
+        _bulk_create(User, [
+            User(username=f"{prefix}_{i}", email=f"{prefix}_{i}@example.com", password=password,
+                 is_verified=True, date_joined=moment - timedelta(days=rng.randint(0, 365)))
+            for i in range(user_count + spare_users)
+        ], batch_size)
+        usernames = dict(
+            User.objects.filter(username__startswith=f"{prefix}_").order_by('id').values_list('id', 'username')
+        )
+        user_ids = list(usernames)
+        _bulk_create(Profile, [Profile(user_id=user_id) for user_id in user_ids], batch_size)
+        takers, spare_user_ids = user_ids[:user_count], user_ids[user_count:]
+
+        tags = resolve_tags([f"{prefix}-tag-{i}" for i in range(30)])
+
+        quizzes = _bulk_create(Quiz, [
+            Quiz(
+                quiz_id=new_uuid(), title=f"Synthetic quiz {i}", description=f"Generated quiz number {i}.",
+                created_by_id=rng.choice(takers), quiz_type=Quiz.PUBLIC,
+                duration=timedelta(minutes=rng.choice((10, 20, 30))),
+                expiry_date=moment + timedelta(days=rng.randint(1, 60)) if rng.random() < 0.5 else None,
+            )
+            for i in range(quiz_count)
+        ], batch_size)
+        Quiz.tags.through.objects.bulk_create([
+            Quiz.tags.through(quiz_id=quiz.quiz_id, tag_id=tag.id)
+            for quiz in quizzes for tag in rng.sample(tags, 3)
+        ], batch_size=batch_size)
+
+        answer_keys = {}
+        questions = []
+        for quiz in quizzes:
+            key = [rng.choice(OPTIONS) for _ in range(questions_per_quiz)]
+            answer_keys[quiz.quiz_id] = key
+            questions.extend(
+                Question(question_id=new_uuid(), quiz=quiz, question_no=no,
+                         text=f"Synthetic question {no} of quiz {quiz.title}",
+                         option_a="Alpha", option_b="Bravo", option_c="Charlie", option_d="Delta",
+                         correct_option=correct)
+                for no, correct in enumerate(key, start=1)
+            )
+        _bulk_create(Question, questions, batch_size)
+        index_objects(quizzes)
+        index_objects(questions)
+        question_ids = {}
+        for question in questions:
+            question_ids.setdefault(question.quiz_id, []).append(question.question_id)
+
+    # Participants, their answers, feedback and leaderboard entries, one transaction per batch of users
+    titles = {quiz.quiz_id: quiz.title for quiz in quizzes}
+    created = responses = 0
+    scores = {quiz.quiz_id: [] for quiz in quizzes}
+    per_batch = max(1, batch_size // (participations_per_user * questions_per_quiz))
+    for start in range(0, len(takers), per_batch):
+        participant_rows, response_rows, feedback_rows, entry_rows = [], [], [], []
+        for user_id in takers[start:start + per_batch]:
+            for quiz in rng.sample(quizzes, participations_per_user):
+                if created >= participants:
+                    break
+                key = answer_keys[quiz.quiz_id]
+                selected = [rng.choice(OPTIONS) for _ in key]
+                correct = [choice == answer for choice, answer in zip(selected, key)]
+                score = sum(correct) / len(key) * 100
+                finished = moment - timedelta(minutes=rng.randint(1, 60 * 24 * 90))
+                participant_id = new_uuid()
+                packed_answers = None
+                if packed:
+                    packed_answers = pack_answers(zip(range(1, len(key) + 1), selected, correct))
+                else:
+                    response_rows.extend(
+                        (new_uuid(), participant_id, question_id, choice, is_correct)
+                        for question_id, choice, is_correct in zip(question_ids[quiz.quiz_id], selected, correct)
+                    )
+                participant_rows.append((
+                    participant_id, user_id, quiz.quiz_id, score,
+                    finished - timedelta(minutes=rng.randint(1, 30)), finished, packed_answers,
+                ))
+                entry_rows.append(
+                    (participant_id, user_id, quiz.quiz_id, usernames[user_id], titles[quiz.quiz_id], score)
+                )
+                scores[quiz.quiz_id].append(score)
+                if rng.random() < feedback_rate:
+                    feedback_rows.append((participant_id, quiz.quiz_id, f"Feedback on {quiz.title}.", finished))
+                created += 1
+        with transaction.atomic():
+            insert_rows(Participant, ['participant_id', 'user', 'quiz', 'score', 'start_time', 'end_time',
+                                      'packed_responses'], participant_rows)
+            insert_rows(Response, ['response_id', 'participant', 'question', 'selected_option', 'is_correct'],
+                        response_rows)
+            insert_rows(Feedback, ['participant', 'quiz', 'comment', 'created_at'], feedback_rows)
+            insert_rows(LeaderboardEntry, ['participant', 'user', 'quiz', 'username', 'quiz_title', 'score'],
+                        entry_rows)
+        responses += len(response_rows)
+        if progress:
+            progress(created)
+
+    with transaction.atomic():
+        _bulk_create(QuizStats, [
+            QuizStats(quiz_id=quiz_id, total_participants=len(values), total_score=sum(values),
+                      total_score_squared=sum(value * value for value in values),
+                      highest_score=max(values, default=None), lowest_score=min(values, default=None),
+                      average_score=sum(values) / len(values) if values else None)
+            for quiz_id, values in scores.items()
+        ], batch_size)
+        index_objects(_bulk_create(Blog, [
+            Blog(title=f"Synthetic post {i}", content="Lorem ipsum dolor sit amet. " * 20,
+                 author_id=rng.choice(takers))
+            for i in range(blogs)
+        ], batch_size))
+        _bulk_create(Message, [
+            Message(user_id=rng.choice(takers), content=f"Synthetic chat message {i}")
+            for i in range(messages)
+        ], batch_size)
+        LeaderboardScore.recount()
+        UserScore.rebuild(batch_size=batch_size)
+
+    invalidate_listing()
+    invalidate_tag_index()
+    return Dataset(prefix, len(user_ids), len(quizzes), created, responses, spare_user_ids)
@@ -0,0 +1,88 @@
+"""
+Resolving tag names and ids to ``Tag`` rows in bulk.
+
+Everything that attaches tags to quizzes goes through ``resolve_tags``: the
+names are normalized and deduplicated, the existing tags are fetched with one
+``IN`` query, the missing ones are inserted with one ``bulk_create`` and read
+back, so attaching any number of tags costs a constant number of queries,
+followed by a single ``quiz.tags.add(*tags)``.
+
+``bulk_create`` sends no ``post_save`` signals, so the tags it inserts are
+announced with the ``tags_created`` signal instead.
+"""
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.dispatch import Signal
+from .models import Tag
+
+TAG_NAME_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+# Sent with sender=Tag and tags=[Tag, ...] after resolve_tags inserted new tags
+tags_created = Signal()
+
+
+def normalize_tag_name(name):
+    """
+    Return a tag name with surrounding whitespace stripped and inner runs of whitespace collapsed.
+    """
+    return ' '.join(str(name).split())
+
+
+def split_tag_names(values):
+    """
+    Split comma-separated inputs into normalized, distinct tag names.
+
+    Args:
+        values (iterable of str): Inputs such as ``"python, django"``.
+
+    Returns:
+        list of str: The non-empty names, in the order they first appear.
+    """
+    names = {}
+    for value in values:
+        for name in str(value).split(','):
+            name = normalize_tag_name(name)
+            if name:
+                names.setdefault(name, None)
+    return list(names)
+
+
+def resolve_tags(names=(), ids=(), using=DEFAULT_DB_ALIAS):
+    """
+    Return the tags with the given names, creating the missing ones, and the tags with the given ids.
+
+    Runs one query when every name exists and three when some are new: the
+    lookup, the insert and the read-back of the inserted rows. Names created
+    concurrently by another request are read back like the ones inserted here.
+
+    Args:
+        names (iterable of str): Tag names; normalized and deduplicated.
+        ids (iterable of int): Ids of existing tags; unknown ids are ignored.
+        using (str): The database alias.
+
+    Returns:
+        list of Tag: The distinct tags.
+
+    Raises:
+        ValidationError: If a name is longer than the tag name column allows.
+    """
+    names = split_tag_names(names)
+    too_long = [name for name in names if len(name) > TAG_NAME_MAX_LENGTH]
+    if too_long:
+        raise ValidationError(
+            f"Tag names can have at most {TAG_NAME_MAX_LENGTH} characters: {', '.join(too_long)}."
+        )
+    ids = set(ids)
+    if not names and not ids:
+        return []
+
+    tags = {tag.pk: tag for tag in Tag.objects.using(using).filter(Q(name__in=names) | Q(pk__in=ids))}
+    missing = set(names) - {tag.name for tag in tags.values()}
+    if missing:
+        # ignore_conflicts leaves the primary keys unset, so the new rows are read back
+        Tag.objects.using(using).bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        created = list(Tag.objects.using(using).filter(name__in=missing))
+        tags.update((tag.pk, tag) for tag in created)
+        tags_created.send(sender=Tag, tags=created)
+    return list(tags.values())
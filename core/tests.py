@@ -1,14 +1,25 @@
 """
 Here is all functions that will verify the validity of the core app functionality
 """
+import io
+import tracemalloc
+from pathlib import Path
 from unittest.mock import patch
-from django.test import TestCase
+from django.db import connection, models
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.messages import get_messages
 import uuid
 from .utils import send_email_token
 from Quiz_Portal import settings
+from Quiz_Portal.database import database_config, sqlite_pragmas
+from Quiz_Portal.profiling import profiled, registry
+from .management.commands.bench import is_graded, percentile
+from .synthetic import generate_dataset
+from .models import Tag
+from .tags import resolve_tags, split_tag_names
+from django.core.exceptions import ValidationError
 import random
 import string
 
@@ -174,3 +185,209 @@ class TestSendEmailToken(TestCase):
         token = '12345'
         result = send_email_token(email, token)
         self.assertFalse(result)
+
+
+class DatabaseProfileTest(SimpleTestCase):
+    """
+    Tests for the environment-driven database profiles.
+    """
+    base_dir = Path('/srv/quiz')
+
+    def test_default_profile_is_tuned_sqlite(self):
+        config = database_config(self.base_dir, {})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], self.base_dir / 'db.sqlite3')
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertEqual(sqlite_pragmas({})['journal_mode'], 'WAL')
+
+    def test_stock_sqlite_has_no_tuning(self):
+        environ = {'DB_PROFILE': 'sqlite-default'}
+        self.assertNotIn('OPTIONS', database_config(self.base_dir, environ))
+        self.assertEqual(sqlite_pragmas(environ), {})
+
+    def test_postgres_profiles(self):
+        environ = {'DB_PROFILE': 'postgres', 'DB_NAME': 'quiz', 'DB_CONN_MAX_AGE': '120'}
+        config = database_config(self.base_dir, environ)
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['CONN_MAX_AGE'], 120)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+
+        environ['DB_PROFILE'] = 'postgres-pooled'
+        config = database_config(self.base_dir, environ)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 20)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            database_config(self.base_dir, {'DB_PROFILE': 'mysql'})
+
+
+class SqlitePragmaTest(TestCase):
+    """
+    Tests that new SQLite connections get the configured pragmas.
+    """
+
+    def test_pragmas_applied_on_connect(self):
+        if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+            self.skipTest("Only the tuned SQLite profile sets pragmas.")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+
+
+class RequestProfilingTest(TestCase):
+    """
+    Tests for the per-request profiling middleware, context manager and metrics endpoint.
+    """
+
+    def setUp(self):
+        registry.reset()
+        self.user = get_user_model().objects.create_user(
+            username=generate_unique_username(), email=generate_unique_email(), password='pass'
+        )
+
+    def test_profiled_counts_queries(self):
+        self.addCleanup(tracemalloc.stop)
+        with profiled(trace_memory=True) as profile:
+            list(get_user_model().objects.all())
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        self.assertEqual(profile.queries, 2)
+        self.assertGreater(profile.sql_seconds, 0)
+        self.assertGreater(profile.peak_memory, 0)
+
+    def test_server_timing_header(self):
+        self.client.force_login(self.user)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('quiz_home')))
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('quiz_home'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_header_in_debug(self):
+        self.assertIn('total;dur=', self.client.get(reverse('login'))['Server-Timing'])
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('login'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_endpoint(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('quiz_home'))
+        response = self.client.get(reverse('metrics'))  # the test client connects from 127.0.0.1
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('quiz_portal_request_queries_count{view="quiz_home"} 1', body)
+        self.assertIn('quiz_portal_responses_total{view="quiz_home",status="200"} 1', body)
+
+    def test_metrics_restricted(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class SyntheticDatasetTest(TestCase):
+    """
+    Tests for the synthetic data used by the ``bench`` command.
+    """
+
+    def test_generate_dataset(self):
+        from leaderboard.models import LeaderboardEntry
+        from participation.models import Participant, Response
+        from User_Profile.models import Profile
+
+        dataset = generate_dataset(45, seed=1, questions_per_quiz=4, participations_per_user=10, spare_users=2)
+        self.assertEqual(dataset.participants, 45)
+        self.assertEqual(dataset.users, 7)  # 5 users take 10, 10, 10, 10 and 5 quizzes, plus 2 spare users
+        self.assertEqual(len(dataset.spare_user_ids), 2)
+        self.assertEqual(Participant.objects.count(), 45)
+        self.assertEqual(Response.objects.count(), 45 * 4)
+        self.assertEqual(Profile.objects.count(), get_user_model().objects.count())
+        self.assertEqual(LeaderboardEntry.objects.count(), 45)
+        self.assertFalse(Participant.objects.filter(user_id__in=dataset.spare_user_ids).exists())
+
+    def test_same_seed_same_scores(self):
+        from participation.models import Participant
+
+        generate_dataset(20, seed=7, prefix='first')
+        first = sorted(Participant.objects.values_list('score', flat=True))
+        Participant.objects.all().delete()
+        generate_dataset(20, seed=7, prefix='second')
+        self.assertEqual(sorted(Participant.objects.values_list('score', flat=True)), first)
+
+    def test_generate_fixture_data(self):
+        from django.core.management import CommandError, call_command
+        from feedback.models import Feedback
+        from participation.models import Participant, Response
+
+        call_command('generate_fixture_data', responses=100, questions_per_quiz=5, seed=3,
+                     feedback_rate=1, stdout=io.StringIO())
+        self.assertEqual(Participant.objects.count(), 20)
+        self.assertEqual(Response.objects.count(), 100)
+        self.assertEqual(Feedback.objects.count(), 20)
+        self.assertTrue(get_user_model().objects.filter(username='synth3_0').exists())
+        self.assertEqual(
+            Response.objects.exclude(participant__quiz=models.F('question__quiz')).count(), 0
+        )
+        with self.assertRaises(CommandError):
+            call_command('generate_fixture_data', participants=5, seed=3, stdout=io.StringIO())
+
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 0.5), 3)
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 0.99), 5)
+
+    def test_is_graded(self):
+        import uuid
+        from django.http import HttpResponse, HttpResponseRedirect
+
+        self.assertTrue(is_graded(HttpResponse()))
+        self.assertTrue(is_graded(HttpResponseRedirect(reverse('submission_result', args=[uuid.uuid4()]))))
+        self.assertFalse(is_graded(HttpResponseRedirect(reverse('quiz_home'))))
+        self.assertFalse(is_graded(HttpResponseRedirect('/no/such/page/')))
+
+
+class TagResolutionTest(TestCase):
+    """
+    Tests for resolving tag names and ids to tags in bulk.
+    """
+
+    def setUp(self):
+        self.python = Tag.objects.create(name="python")
+        self.django = Tag.objects.create(name="Django")
+
+    def test_split_tag_names(self):
+        self.assertEqual(
+            split_tag_names(["python,  web   dev ", "", " ,python", "Python"]),
+            ["python", "web dev", "Python"],
+        )
+
+    def test_existing_tags_take_one_query(self):
+        with self.assertNumQueries(1):
+            tags = resolve_tags(["python", " python "], [self.django.pk, 999])
+        self.assertEqual(sorted(tag.name for tag in tags), ["Django", "python"])
+
+    def test_missing_tags_are_created_in_bulk(self):
+        names = [f"topic {i}" for i in range(30)] + ["python"]
+        with self.assertNumQueries(3):  # lookup, insert, read back
+            tags = resolve_tags(names)
+        self.assertEqual(len(tags), 31)
+        self.assertTrue(all(tag.pk for tag in tags))
+        self.assertEqual(Tag.objects.filter(name__startswith="topic ").count(), 30)
+        with self.assertNumQueries(1):
+            resolve_tags(names)
+
+    def test_nothing_to_resolve(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_tags([" ", ","], []), [])
+
+    def test_too_long_names_are_rejected(self):
+        with self.assertRaises(ValidationError):
+            resolve_tags(["x" * 51])
+        self.assertFalse(Tag.objects.filter(name__startswith="x").exists())
@@ -23,6 +23,15 @@ class Feedback(models.Model):
     content = models.TextField(blank=True, null=True)  # Optional additional feedback content
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # A participant leaves at most one feedback per quiz
+            models.UniqueConstraint(fields=['quiz', 'participant'], name='unique_feedback_per_participant'),
+        ]
+        indexes = [
+            models.Index(fields=['quiz', '-created_at'], name='feedback_quiz_created_idx'),
+        ]
+
     def _str_(self):
         """
         Returns a string representation of the Feedback object, 
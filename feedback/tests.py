@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from quiz.models import Quiz
 from participation.models import Participant
 from feedback.models import Feedback
+from Quiz_Portal.testing import QueryBudgetMixin
 from django.utils.timezone import now, timedelta
 import random
 import string
@@ -108,3 +109,37 @@ class FeedbackViewTests(TestCase):
                 comment="New feedback"
             ).exists()
         )
+
+
+class FeedbackQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    The feedback pages run a fixed number of queries however much feedback there is.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username=generate_unique_username(), email=generate_unique_email(), password='pass'
+        )
+        self.quiz = Quiz.objects.create(title="Budget Quiz", duration=timedelta(minutes=10), created_by=self.user)
+        self.client.force_login(self.user)
+
+    def test_view_feedback(self):
+        def grow(size):
+            for _ in range(Feedback.objects.count(), size):
+                user = get_user_model().objects.create_user(
+                    username=generate_unique_username(), email=generate_unique_email(), password='pass'
+                )
+                participant = Participant.objects.create(user=user, quiz=self.quiz)
+                Feedback.objects.create(participant=participant, quiz=self.quiz, comment="Fine")
+
+        url = reverse('view_feedback', args=[self.quiz.quiz_id])
+        self.assertQueryBudget(lambda: self.client.get(url), budget=4, grow=grow)
+
+    def test_my_feedback(self):
+        def grow(size):
+            for i in range(Feedback.objects.count(), size):
+                quiz = Quiz.objects.create(title=f"Quiz {i}", duration=timedelta(minutes=10))
+                participant = Participant.objects.create(user=self.user, quiz=quiz)
+                Feedback.objects.create(participant=participant, quiz=quiz, comment="Fine")
+
+        self.assertQueryBudget(lambda: self.client.get(reverse('my_feedback')), budget=4, grow=grow)
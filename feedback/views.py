@@ -69,7 +69,7 @@ def view_feedback(request, quiz_id):
     quiz = get_object_or_404(Quiz, quiz_id=quiz_id)
     
     # Fetch all feedbacks for the given quiz
-    feedbacks = Feedback.objects.filter(quiz=quiz).order_by('-created_at')
+    feedbacks = Feedback.objects.filter(quiz=quiz).select_related('participant__user').order_by('-created_at')
 
     # If no feedbacks exist for the quiz, show the message
     no_feedback_message = "No feedback available for this quiz." if not feedbacks else ""
@@ -106,7 +106,7 @@ def my_feedback(request):
         })
     
     # Fetch all feedbacks associated with the participant(s) for the logged-in user
-    feedbacks = Feedback.objects.filter(participant__in=participants).order_by('-created_at')
+    feedbacks = Feedback.objects.filter(participant__in=participants).select_related('quiz').order_by('-created_at')
 
     # If there are no feedbacks, display a message
     no_feedback_message = "No feedback available for the quizzes you've participated in." if not feedbacks else ""
@@ -1,3 +1,21 @@
 from django.contrib import admin
+from .models import LeaderboardEntry, LeaderboardScore
 
-# Register your models here.
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    """
+    Customizes the display of the LeaderboardEntry model in the Django admin interface.
+    """
+    list_display = ('username', 'quiz_title', 'score')
+    search_fields = ('username', 'quiz_title')
+    raw_id_fields = ('participant', 'user', 'quiz')
+
+
+@admin.register(LeaderboardScore)
+class LeaderboardScoreAdmin(admin.ModelAdmin):
+    """
+    Customizes the display of the LeaderboardScore model in the Django admin interface.
+    """
+    list_display = ('quiz', 'score', 'entries')
+    raw_id_fields = ('quiz',)
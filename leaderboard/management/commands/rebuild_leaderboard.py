@@ -0,0 +1,22 @@
+"""
+Management command that backfills the materialized leaderboard and recomputes its
+dense ranks.
+
+Usage:
+    python manage.py rebuild_leaderboard [--batch-size N]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from leaderboard.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    help = "Create missing leaderboard entries and recompute every dense rank."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows written per batch.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = LeaderboardEntry.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Leaderboard rebuilt ({created} new entries)."))
@@ -1,6 +1,321 @@
-from django.db import models
+from collections import Counter
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from participation.models import Participant
+from quiz.models import Quiz
 
-# No need to define new models for leaderboard. We query Participant model directly.
- 
- 
+
+class LeaderboardScore(models.Model):
+    """
+    Number of leaderboard entries with a given score, in the global scope or in one quiz.
+
+    One row exists per distinct score of each scope, so the dense rank of a score
+    is one plus the number of rows of its scope with a higher score: an indexed
+    ``COUNT`` over the distinct scores above it, computed when the leaderboard is
+    read. Recording a score only increments the count of that score, so no other
+    row is written and concurrent submissions cannot corrupt the ranks.
+
+    Attributes
+    ----------
+    quiz : ForeignKey
+        The quiz of the per-quiz scope, or None for the global scope.
+    score : float
+        A percentage score held by at least one entry of the scope.
+    entries : int
+        The number of entries of the scope with this score.
+
+    Methods
+    -------
+    rank(score, quiz_id) :
+        Returns the dense rank of a score in the global or a per-quiz scope.
+    move(changes) :
+        Applies entries added, removed or rescored to the counts of both scopes.
+    recount(quiz_id) :
+        Recomputes the counts of every scope, or of one quiz, from the entries.
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, null=True, related_name="leaderboard_scores")
+    score = models.FloatField()
+    entries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the indexes the rank counts are served by
+            models.UniqueConstraint(fields=['quiz', 'score'], name='leaderboard_quiz_score_unique'),
+            models.UniqueConstraint(fields=['score'], condition=Q(quiz__isnull=True),
+                                    name='leaderboard_global_score_unique'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the score count.
+
+        Returns
+        -------
+        str
+            The score and the number of entries holding it.
+        """
+        return f"{self.score:g} points x {self.entries}"
+
+    @classmethod
+    def rank(cls, score, quiz_id=None):
+        """
+        Return the dense rank of a score: one plus the number of higher distinct scores.
+
+        Parameters
+        ----------
+        score : float
+            The score to rank.
+        quiz_id : UUID, optional
+            The quiz of the per-quiz scope; the global scope if None.
+
+        Returns
+        -------
+        int
+            The rank, 1 for the highest score.
+        """
+        return cls.objects.filter(quiz_id=quiz_id, score__gt=score).count() + 1
+
+    @classmethod
+    def _adjust(cls, quiz_id, score, delta):
+        rows = cls.objects.filter(quiz_id=quiz_id, score=score)
+        if delta > 0:
+            if not rows.update(entries=F('entries') + delta):
+                # A new score; the row may be created concurrently, so the insert only ensures it exists
+                cls.objects.bulk_create([cls(quiz_id=quiz_id, score=score)], ignore_conflicts=True)
+                rows.update(entries=F('entries') + delta)
+        elif delta < 0:
+            rows.update(entries=F('entries') + delta)
+            rows.filter(entries__lte=0).delete()
+
+    @classmethod
+    def move(cls, changes):
+        """
+        Apply entries added, removed or rescored to the score counts of both scopes.
+
+        Every count is changed with a single ``UPDATE ... SET entries = entries + n``,
+        which row-locks only that score, so concurrent writers never read a
+        count they are about to overwrite.
+
+        Parameters
+        ----------
+        changes : iterable of tuple
+            ``(quiz_id, old_score, new_score)`` per entry; ``old_score`` is None for
+            an added entry and ``new_score`` is None for a removed one.
+        """
+        deltas = Counter()
+        for quiz_id, old_score, new_score in changes:
+            for scope in (None, quiz_id):
+                if old_score is not None:
+                    deltas[scope, old_score] -= 1
+                if new_score is not None:
+                    deltas[scope, new_score] += 1
+        for (quiz_id, score), delta in deltas.items():
+            cls._adjust(quiz_id, score, delta)
+
+    @classmethod
+    def recount(cls, quiz_id=None):
+        """
+        Recompute the score counts from the leaderboard entries.
+
+        Parameters
+        ----------
+        quiz_id : UUID, optional
+            Only recompute the per-quiz scope of this quiz; every scope if None.
+        """
+        entries = LeaderboardEntry.objects.all()
+        scopes = cls.objects.all()
+        if quiz_id is not None:
+            entries = entries.filter(quiz_id=quiz_id)
+            scopes = scopes.filter(quiz_id=quiz_id)
+        scopes.delete()
+        rows = [
+            cls(quiz_id=row['quiz_id'], score=row['score'], entries=row['entries'])
+            for row in entries.order_by().values('quiz_id', 'score').annotate(entries=Count('pk'))
+        ]
+        if quiz_id is None:
+            rows += [
+                cls(quiz_id=None, score=row['score'], entries=row['entries'])
+                for row in entries.order_by().values('score').annotate(entries=Count('pk'))
+            ]
+        cls.objects.bulk_create(rows, batch_size=1000)
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Denormalized leaderboard row for a finished participation.
+
+    Each entry copies the username, quiz title and score of a participant so the
+    leaderboard page can be served from a single indexed table without joins.
+    Dense ranks are not stored: they are computed when read from the distinct
+    scores counted by ``LeaderboardScore``, for the global and the per-quiz scope.
+
+    Attributes
+    ----------
+    participant : OneToOneField
+        The participation this entry mirrors.
+    user : ForeignKey
+        The user who took the quiz.
+    quiz : ForeignKey
+        The quiz that was taken.
+    username : str
+        Copy of the user's username at submission time.
+    quiz_title : str
+        Copy of the quiz title.
+    score : float
+        The participant's percentage score.
+    global_rank : int
+        Dense rank of the score among all entries, queried on access.
+    quiz_rank : int
+        Dense rank of the score among the entries of the same quiz, queried on access.
+
+    Methods
+    -------
+    record(participant) :
+        Inserts or refreshes the entry of a participant and counts its score.
+    rebuild(batch_size) :
+        Backfills missing entries and recounts every score.
+    """
+    participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name="leaderboard_entry")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="leaderboard_entries")
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="leaderboard_entries")
+    username = models.CharField(max_length=150)
+    quiz_title = models.CharField(max_length=200)
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score', 'id']
+        indexes = [
+            models.Index(fields=['-score', 'id'], name='leaderboard_global_idx'),
+            models.Index(fields=['quiz', '-score', 'id'], name='leaderboard_quiz_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the leaderboard entry.
+
+        Returns
+        -------
+        str
+            The username, quiz title and score of the entry.
+        """
+        return f"{self.username} - {self.quiz_title} - {self.score:g} points"
+
+    @property
+    def global_rank(self):
+        """Dense rank of the entry's score among all entries."""
+        return LeaderboardScore.rank(self.score)
+
+    @property
+    def quiz_rank(self):
+        """Dense rank of the entry's score among the entries of its quiz."""
+        return LeaderboardScore.rank(self.score, self.quiz_id)
+
+    @classmethod
+    def record(cls, participant):
+        """
+        Insert or refresh the leaderboard entry of a finished participation.
+
+        Call this inside the submission transaction so the entry and its score
+        count are committed together.
+
+        Parameters
+        ----------
+        participant : Participant
+            The participant whose score was just saved.
+
+        Returns
+        -------
+        LeaderboardEntry
+            The saved entry.
+        """
+        with transaction.atomic():
+            # The delete receiver uncounts the previous score
+            cls.objects.filter(participant=participant).delete()
+            entry = cls.objects.create(
+                participant=participant,
+                user_id=participant.user_id,
+                quiz_id=participant.quiz_id,
+                username=participant.user.username,
+                quiz_title=participant.quiz.title,
+                score=participant.score,
+            )
+            LeaderboardScore.move([(entry.quiz_id, None, entry.score)])
+            return entry
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """
+        Backfill entries for finished participations and recount every score.
+
+        Missing entries are streamed and written with ``bulk_create`` in batches,
+        so memory stays bounded regardless of the table size.
+
+        Parameters
+        ----------
+        batch_size : int
+            Number of rows written per ``bulk_create`` call.
+
+        Returns
+        -------
+        int
+            The number of entries that were created.
+        """
+        missing = (
+            Participant.objects.filter(end_time__isnull=False, leaderboard_entry__isnull=True)
+            .select_related('user', 'quiz')
+            .only('participant_id', 'score', 'user__username', 'quiz__title')
+        )
+        created = 0
+        batch = []
+        for participant in missing.iterator(chunk_size=batch_size):
+            batch.append(cls(
+                participant_id=participant.participant_id,
+                user_id=participant.user_id,
+                quiz_id=participant.quiz_id,
+                username=participant.user.username,
+                quiz_title=participant.quiz.title,
+                score=participant.score,
+            ))
+            if len(batch) >= batch_size:
+                cls.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            cls.objects.bulk_create(batch)
+            created += len(batch)
+
+        LeaderboardScore.recount()
+        return created
+
+
+@receiver(post_delete, sender=LeaderboardEntry)
+def uncount_leaderboard_entry(sender, instance, **kwargs):
+    """
+    Removes a deleted entry's score from the counts, including entries deleted with their quiz or user.
+    """
+    LeaderboardScore.move([(instance.quiz_id, instance.score, None)])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_leaderboard_username(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keeps the denormalized username of leaderboard entries in sync with the user.
+
+    Saves that cannot touch the username (e.g. ``last_login`` updates on login) are skipped.
+    """
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    LeaderboardEntry.objects.filter(user=instance).exclude(username=instance.username).update(username=instance.username)
+
+
+@receiver(post_save, sender=Quiz)
+def sync_leaderboard_quiz_title(sender, instance, created, **kwargs):
+    """
+    Keeps the denormalized quiz title of leaderboard entries in sync with the quiz.
+    """
+    if created:
+        return
+    LeaderboardEntry.objects.filter(quiz=instance).exclude(quiz_title=instance.title).update(quiz_title=instance.title)
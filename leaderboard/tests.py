@@ -1,145 +1,260 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
+from django.utils.timezone import now
 from core.models import User
-from quiz.models import Quiz  # Assuming we have a Quiz model
-from .models import Leaderboard, Participation  # Assuming we have Leaderboard and Participation models
+from quiz.models import Quiz
+from participation.models import Participant
+from Quiz_Portal.testing import QueryBudgetMixin
+from .models import LeaderboardEntry, LeaderboardScore
+from .views import PAGE_SIZE
+
+
+def finish(user, quiz, score):
+    """Create a finished participation and record it on the leaderboard."""
+    participant = Participant.objects.create(user=user, quiz=quiz, score=score, end_time=now())
+    return LeaderboardEntry.record(participant)
+
 
 class LeaderboardModelTest(TestCase):
     """
-    Test case for the Leaderboard model.
+    Test case for the LeaderboardEntry model.
 
-    This test checks the functionality of the Leaderboard model, including
-    the creation of leaderboard entries and the string representation of the entries.
+    This test checks that entries are created on submission with dense ranks in both
+    the global and the per-quiz scope, that deleted entries leave no gap, and that a
+    rebuild restores drifted score counts.
 
     Methods
     -------
     setUp() :
-        Creates the necessary test data for leaderboard, participation, and users.
-    test_leaderboard_creation() :
-        Verifies the correct creation of leaderboard entries.
+        Creates users and two quizzes.
+    test_leaderboard_dense_ranks() :
+        Verifies that tied scores share a rank and ranks have no gaps.
+    test_leaderboard_new_score_shifts_lower_ranks() :
+        Verifies that a new distinct score pushes lower ranks down.
+    test_leaderboard_new_score_writes_one_count() :
+        Verifies that recording a score writes no other entry or count.
+    test_leaderboard_deleted_entries_leave_no_gap() :
+        Verifies that re-recorded and cascade-deleted entries give up their score.
     test_leaderboard_string_representation() :
         Verifies that the string representation of leaderboard entries is correct.
+    test_leaderboard_rebuild() :
+        Verifies that rebuilding backfills entries and restores ranks.
     """
 
     def setUp(self):
         """
         Sets up test data for the leaderboard model.
 
-        Creates two users, a quiz, two participation entries, and two leaderboard entries 
-        for testing leaderboard functionality.
+        Creates four users and two quizzes.
         """
-        self.user1 = User.objects.create_user(
-            username="user1",
-            email="user1@example.com",
-            password="password123"
-        )
-        self.user2 = User.objects.create_user(
-            username="user2",
-            email="user2@example.com",
-            password="password123"
-        )
-        self.quiz = Quiz.objects.create(
-            title="Test Quiz"
-        )
+        self.users = [
+            User.objects.create(username=f"user{i}", email=f"user{i}@example.com")
+            for i in range(4)
+        ]
+        self.quiz = Quiz.objects.create(title="Test Quiz", duration=timedelta(minutes=10))
+        self.other_quiz = Quiz.objects.create(title="Other Quiz", duration=timedelta(minutes=10))
 
-        # Create some leaderboard entries for the users
-        self.participation1 = Participation.objects.create(
-            user=self.user1,
-            quiz=self.quiz,
-            score=80
-        )
-        self.participation2 = Participation.objects.create(
-            user=self.user2,
-            quiz=self.quiz,
-            score=90
-        )
-        
-        # Create leaderboard entry
-        self.leaderboard1 = Leaderboard.objects.create(
-            participant=self.user1,
-            quiz=self.quiz,
-            score=self.participation1.score,
-            rank=2
-        )
-        self.leaderboard2 = Leaderboard.objects.create(
-            participant=self.user2,
-            quiz=self.quiz,
-            score=self.participation2.score,
-            rank=1
-        )
+    def test_leaderboard_dense_ranks(self):
+        """
+        Test that tied scores share a rank and the next score gets the next rank.
+        """
+        first = finish(self.users[0], self.quiz, 80)
+        second = finish(self.users[1], self.quiz, 90)
+        third = finish(self.users[2], self.quiz, 80)
 
-    def test_leaderboard_creation(self):
+        ranks = {entry.username: entry.quiz_rank for entry in LeaderboardEntry.objects.all()}
+        self.assertEqual(ranks, {'user0': 2, 'user1': 1, 'user2': 2})
+        self.assertEqual(first.username, "user0")
+        self.assertEqual(second.quiz_title, "Test Quiz")
+        self.assertEqual(third.global_rank, 2)
+
+    def test_leaderboard_new_score_shifts_lower_ranks(self):
+        """
+        Test that global and per-quiz ranks are maintained independently.
         """
-        Test if leaderboard entries are created correctly.
+        finish(self.users[0], self.quiz, 50)
+        finish(self.users[1], self.other_quiz, 70)
+        finish(self.users[2], self.quiz, 60)
+
+        entries = {entry.username: entry for entry in LeaderboardEntry.objects.all()}
+        self.assertEqual(entries['user0'].global_rank, 3)
+        self.assertEqual(entries['user0'].quiz_rank, 2)
+        self.assertEqual(entries['user1'].global_rank, 1)
+        self.assertEqual(entries['user1'].quiz_rank, 1)
+        self.assertEqual(entries['user2'].global_rank, 2)
+        self.assertEqual(entries['user2'].quiz_rank, 1)
 
-        Verifies that the leaderboard entries have the correct participant, score, 
-        and rank values.
+    def test_leaderboard_new_score_writes_one_count(self):
         """
-        self.assertEqual(self.leaderboard1.participant.username, "user1")
-        self.assertEqual(self.leaderboard2.participant.username, "user2")
-        self.assertEqual(self.leaderboard1.score, 80)
-        self.assertEqual(self.leaderboard2.score, 90)
-        self.assertEqual(self.leaderboard1.rank, 2)
-        self.assertEqual(self.leaderboard2.rank, 1)
+        Test that a new distinct score only inserts its own counts, whatever ranks below it.
+        """
+        for i, score in enumerate([10, 20, 30]):
+            finish(self.users[i], self.quiz, score)
+        participant = Participant.objects.create(user=self.users[3], quiz=self.quiz, score=25, end_time=now())
+        # find previous entry, insert entry, and per scope: update count, insert count, update it
+        with self.assertNumQueries(10):
+            LeaderboardEntry.record(participant)
+        self.assertEqual(LeaderboardEntry.objects.get(username='user0').global_rank, 4)
+        self.assertEqual(LeaderboardEntry.objects.get(username='user3').quiz_rank, 2)
+
+    def test_leaderboard_deleted_entries_leave_no_gap(self):
+        """
+        Test that re-recording or deleting an entry gives up its score in both scopes.
+        """
+        finish(self.users[0], self.quiz, 90)
+        finish(self.users[1], self.other_quiz, 80)
+        low = finish(self.users[2], self.quiz, 70)
+
+        participant = low.participant
+        participant.score = 95
+        participant.save()
+        LeaderboardEntry.record(participant)
+        self.assertEqual(LeaderboardEntry.objects.get(username='user0').global_rank, 2)
+        self.assertFalse(LeaderboardScore.objects.filter(score=70).exists())
+
+        self.quiz.delete()  # cascades to its participants and their entries
+        self.assertEqual(LeaderboardEntry.objects.get().global_rank, 1)
+        self.assertCountEqual(LeaderboardScore.objects.values_list('quiz_id', 'score', 'entries'), [
+            (self.other_quiz.quiz_id, 80.0, 1), (None, 80.0, 1),
+        ])
 
     def test_leaderboard_string_representation(self):
         """
         Test the string representation of leaderboard entries.
+        """
+        entry = finish(self.users[0], self.quiz, 80)
+        self.assertEqual(str(entry), "user0 - Test Quiz - 80 points")
 
-        Verifies that the string representation of the leaderboard entries is correct.
+    def test_leaderboard_rebuild(self):
+        """
+        Test that the rebuild command backfills missing entries and restores the score counts.
         """
-        self.assertEqual(str(self.leaderboard1), "user1 - Test Quiz - 80 points")
-        self.assertEqual(str(self.leaderboard2), "user2 - Test Quiz - 90 points")
+        finish(self.users[0], self.quiz, 40)
+        Participant.objects.create(user=self.users[1], quiz=self.quiz, score=90, end_time=now())
+        Participant.objects.create(user=self.users[2], quiz=self.quiz, score=10)  # not finished
+        LeaderboardScore.objects.update(entries=7)
+        LeaderboardScore.objects.create(score=99, entries=1)
+
+        call_command('rebuild_leaderboard', stdout=StringIO())
+
+        ranks = {entry.username: entry.global_rank for entry in LeaderboardEntry.objects.all()}
+        self.assertEqual(ranks, {'user0': 2, 'user1': 1})
+        self.assertEqual(sorted(LeaderboardScore.objects.values_list('score', 'entries')), [
+            (40.0, 1), (40.0, 1), (90.0, 1), (90.0, 1),
+        ])
 
 
 class LeaderboardViewTest(TestCase):
     """
     Test case for the Leaderboard view.
 
-    This test verifies that the leaderboard view correctly renders the leaderboard page 
-    and displays the expected content.
+    This test verifies that the leaderboard view renders a page of entries, supports
+    the per-quiz scope and keyset pagination, and runs a fixed number of queries.
 
     Methods
     -------
     setUp() :
-        Creates a user and a quiz, and sets up the test data for the leaderboard view.
+        Creates a quiz and a set of finished participations.
     test_leaderboard_view() :
         Verifies the correct behavior of the leaderboard view.
+    test_leaderboard_quiz_scope() :
+        Verifies that the per-quiz scope only lists entries of that quiz.
+    test_leaderboard_keyset_pagination() :
+        Verifies that following the cursor visits every entry exactly once.
+    test_leaderboard_query_count_is_constant() :
+        Verifies that the page query count does not grow with the number of entries.
     """
 
     def setUp(self):
         """
         Set up test data for the leaderboard view.
 
-        Creates a user, logs the user in, creates a quiz, and adds a leaderboard entry.
+        Creates a quiz and a set of finished participations with tied scores.
         """
-        self.user = User.objects.create_user(
-            username="testuser",
-            email="testuser@example.com",
-            password="password123"
-        )
-        self.client.login(username="testuser@example.com", password="password123")
-
-        self.quiz = Quiz.objects.create(title="Test Quiz")
-        
-        # Simulating leaderboard data
-        self.leaderboard1 = Leaderboard.objects.create(
-            participant=self.user,
-            quiz=self.quiz,
-            score=80,
-            rank=1
-        )
+        self.quiz = Quiz.objects.create(title="Test Quiz", duration=timedelta(minutes=10))
+        self.other_quiz = Quiz.objects.create(title="Other Quiz", duration=timedelta(minutes=10))
+        self.users = [
+            User.objects.create(username=f"player{i}", email=f"player{i}@example.com")
+            for i in range(PAGE_SIZE + 5)
+        ]
+        for i, user in enumerate(self.users):
+            finish(user, self.quiz, (i % 7) * 10)
+        finish(self.users[0], self.other_quiz, 100)
 
     def test_leaderboard_view(self):
         """
         Test the leaderboard view.
 
-        Verifies that the leaderboard view returns the correct status code, uses 
+        Verifies that the leaderboard view returns the correct status code, uses
         the correct template, and contains the expected content.
         """
         response = self.client.get(reverse('leaderboard'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'leaderboard/leaderboard.html')
         self.assertContains(response, "Leaderboard")
-        self.assertContains(response, "user")
+        self.assertContains(response, "player")
         self.assertContains(response, "Test Quiz")
+        entries = response.context['entries']
+        self.assertEqual(len(entries), PAGE_SIZE)
+        self.assertEqual(entries[0].score, 100)
+        self.assertEqual(entries[0].rank, 1)
+        self.assertEqual(entries[1].rank, 2)
+
+    def test_leaderboard_quiz_scope(self):
+        """
+        Test that the per-quiz scope uses per-quiz ranks and hides other quizzes.
+        """
+        response = self.client.get(reverse('leaderboard'), {'quiz': self.other_quiz.quiz_id})
+        self.assertEqual(response.status_code, 200)
+        entries = response.context['entries']
+        self.assertEqual([(entry.username, entry.rank) for entry in entries], [('player0', 1)])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_leaderboard_keyset_pagination(self):
+        """
+        Test that following the cursor visits every entry exactly once in score order.
+        """
+        seen = []
+        params = {}
+        while True:
+            response = self.client.get(reverse('leaderboard'), params)
+            seen.extend((entry.score, entry.id, entry.rank) for entry in response.context['entries'])
+            if not response.context['next_cursor']:
+                break
+            params = {'after': response.context['next_cursor']}
+        self.assertEqual(len(seen), LeaderboardEntry.objects.count())
+        self.assertEqual(seen, sorted(seen, key=lambda item: (-item[0], item[1])))
+        # Ranks stay dense across pages
+        scores = sorted({score for score, _, _ in seen}, reverse=True)
+        self.assertEqual([rank for _, _, rank in seen], [scores.index(score) + 1 for score, _, _ in seen])
+
+    def test_leaderboard_query_count_is_constant(self):
+        """
+        Test that rendering a full page does not issue a query per row.
+        """
+        with self.assertNumQueries(2):  # page, rank of its first score
+            self.client.get(reverse('leaderboard'))
+        with self.assertNumQueries(3):
+            self.client.get(reverse('leaderboard'), {'quiz': self.quiz.quiz_id})
+
+
+class LeaderboardQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    The leaderboard is O(1) in the number of participants.
+    """
+
+    def test_leaderboard(self):
+        quiz = Quiz.objects.create(title="Budget Quiz", duration=timedelta(minutes=10))
+
+        def grow(size):
+            for i in range(LeaderboardEntry.objects.count(), size):
+                user = User.objects.create_user(username=f'player{i}', email=f'player{i}@example.com', password='pass')
+                finish(user, quiz, i)
+
+        self.assertQueryBudget(lambda: self.client.get(reverse('leaderboard')), budget=2, grow=grow)
+        self.assertQueryBudget(
+            lambda: self.client.get(reverse('leaderboard'), {'quiz': str(quiz.quiz_id)}), budget=3, grow=grow
+        )
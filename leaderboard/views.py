@@ -1,37 +1,81 @@
-from django.shortcuts import render
-from participation.models import Participant
+import uuid
+from django.http import HttpResponse
+from django.shortcuts import render, get_object_or_404
+from django.db.models import Q
+from quiz.models import Quiz
+from .models import LeaderboardEntry, LeaderboardScore
+
+PAGE_SIZE = 50
+
 
 def leaderboard(request):
     """
     View function to display the leaderboard of participants.
 
-    This view retrieves all participants from the database, orders them by their 
-    score in descending order, and calculates their rank based on the order.
-
-    It then renders the 'leaderboard/leaderboard.html' template with the 
-    ordered participants.
+    This view reads one page of the materialized ``LeaderboardEntry`` table, ordered by
+    score in descending order. Ranks are dense ranks (tied scores share a rank): the
+    rank of the page's first score is counted in ``LeaderboardScore`` and the following
+    ones step by one per distinct score. The username and quiz title are denormalized
+    on the entry, so the page costs a fixed number of queries regardless of its size.
 
     Parameters
     ----------
     request : HttpRequest
-        The request object containing metadata about the request.
+        The request object containing metadata about the request. Supported query
+        parameters are ``quiz`` (restricts the leaderboard to one quiz) and ``after``
+        (the keyset cursor returned as ``next_cursor`` by the previous page).
 
     Returns
     -------
     HttpResponse
-        Renders the 'leaderboard/leaderboard.html' template with the list of participants.
-    
+        Renders the 'leaderboard/leaderboard.html' template with one page of entries.
+
     Notes
     -----
-    The rank for each participant is dynamically calculated by enumerating through the
-    sorted participants, with ranks starting from 1.
+    Pagination uses the ``(-score, id)`` keyset, which is served by an index in both
+    scopes, so deep pages are as cheap as the first one.
     """
-    participants = Participant.objects.all().order_by('-score')  # Order by score in descending order
+    entries = LeaderboardEntry.objects.all()
+    quiz = None
+
+    quiz_id = request.GET.get('quiz')
+    if quiz_id:
+        try:
+            quiz_id = uuid.UUID(quiz_id)
+        except ValueError:
+            return HttpResponse("Invalid quiz id.", status=400)
+        quiz = get_object_or_404(Quiz.objects.only('quiz_id', 'title'), quiz_id=quiz_id)
+        entries = entries.filter(quiz=quiz)
+
+    cursor = request.GET.get('after')
+    if cursor:
+        try:
+            score, last_id = cursor.rsplit('_', 1)
+            score, last_id = float(score), int(last_id)
+        except ValueError:
+            return HttpResponse("Invalid page cursor.", status=400)
+        entries = entries.filter(Q(score__lt=score) | Q(score=score, id__gt=last_id))
+
+    page = list(
+        entries.order_by('-score', 'id')
+        .only('id', 'username', 'quiz_title', 'score')[:PAGE_SIZE + 1]
+    )
+    next_cursor = None
+    if len(page) > PAGE_SIZE:
+        page = page[:PAGE_SIZE]
+        next_cursor = f"{page[-1].score!r}_{page[-1].id}"
 
-    # Calculate rank for each participant
-    for i, participant in enumerate(participants):
-        participant.rank = i + 1  # Rank starts from 1
+    # Entries are in score order, so every distinct score between two on the page is on it
+    if page:
+        rank = LeaderboardScore.rank(page[0].score, quiz.quiz_id if quiz else None)
+        score = page[0].score
+        for entry in page:
+            if entry.score != score:
+                rank, score = rank + 1, entry.score
+            entry.rank = rank
 
     return render(request, 'leaderboard/leaderboard.html', {
-        'participants': participants,
+        'entries': page,
+        'quiz': quiz,
+        'next_cursor': next_cursor,
     })
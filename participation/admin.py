@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Participant, Response
+from .models import Participant, QueuedSubmission, QuizSession, Response
 
 admin.site.register(Participant)
 admin.site.register(Response)
+admin.site.register(QueuedSubmission)
+admin.site.register(QuizSession)
@@ -0,0 +1,176 @@
+"""
+Grading engine for quiz submissions.
+
+A quiz's answer key is held as a compact byte string with one ASCII option letter
+per question, and a submission is encoded the same way. Grading compares the two
+byte strings as a whole instead of looping over questions in Python: a single
+submission is XOR-ed against the key as one integer, and a batch of submissions
+is compared as a 2-D byte matrix with NumPy when it is installed.
+
+Every grade reports the raw score, the percentage and a correctness bitmap packed
+most significant bit first (question ``i`` is bit ``7 - i % 8`` of byte ``i // 8``),
+the same layout as ``numpy.packbits``.
+"""
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, batches fall back to per-row grading
+    numpy = None
+
+UNANSWERED = b'-'
+OPTION_CODES = {option: option.encode() for option in ('A', 'B', 'C', 'D')}
+
+# Maps each byte of ``answers XOR key`` to '1' when it is zero (a correct answer) and '0' otherwise
+_MATCH_DIGITS = bytes([ord('1')] + [ord('0')] * 255)
+
+
+class GradeResult(namedtuple('GradeResult', ['raw_score', 'percentage', 'bitmap', 'total_questions'])):
+    """
+    The grade of one submission.
+
+    Attributes:
+        raw_score (int): Number of correct answers.
+        percentage (float): Score as a percentage of the number of questions.
+        bitmap (bytes): Packed per-question correctness flags.
+        total_questions (int): Number of graded questions.
+    """
+    __slots__ = ()
+
+    def is_correct(self, index):
+        """
+        Return whether the question at ``index`` (0-based) was answered correctly.
+        """
+        return bool(self.bitmap[index >> 3] & (0x80 >> (index & 7)))
+
+    def correctness(self):
+        """
+        Return the correctness flags of every question as a list of booleans.
+        """
+        return [self.is_correct(index) for index in range(self.total_questions)]
+
+
+def encode_answers(selected_options):
+    """
+    Encode selected options as one byte per question.
+
+    Args:
+        selected_options (iterable of str): The option letter of each question, in
+            question order. Missing or invalid answers are encoded as unanswered.
+
+    Returns:
+        bytes: The encoded answers.
+    """
+    return b''.join(OPTION_CODES.get(option, UNANSWERED) for option in selected_options)
+
+
+def pack_bits(digits, length):
+    """
+    Pack a string of ``'0'``/``'1'`` digits into bytes, most significant bit first.
+    """
+    if not length:
+        return b''
+    padding = -length % 8
+    return (int(digits, 2) << padding).to_bytes((length + padding) // 8, 'big')
+
+
+class AnswerKey:
+    """
+    The correct options of a quiz as a byte string, ready for grading.
+
+    Attributes:
+        key (bytes): One option letter per question, in question order.
+        question_nos (tuple of int): The question number of each position in ``key``.
+        question_ids (tuple of UUID): The question id of each position in ``key``.
+    """
+
+    def __init__(self, correct_options, question_nos=(), question_ids=()):
+        self.key = encode_answers(correct_options)
+        self.question_nos = tuple(question_nos)
+        self.question_ids = tuple(question_ids)
+        self._key_int = int.from_bytes(self.key, 'big')
+
+    @classmethod
+    def from_question_set(cls, question_set):
+        """
+        Build the answer key of a cached ``quiz.question_sets.QuestionSet``.
+        """
+        answer_key = question_set.answer_key
+        return cls(
+            [entry.correct_option for entry in answer_key],
+            [entry.question_no for entry in answer_key],
+            [entry.question_id for entry in answer_key],
+        )
+
+    def __len__(self):
+        return len(self.key)
+
+    def answers_from_post(self, data):
+        """
+        Return the selected option of every question from submitted form data.
+
+        Args:
+            data (QueryDict): The POST data with one ``selected_option_<no>`` per question.
+
+        Returns:
+            list: The selected option (or ``None``) of each question, in key order.
+        """
+        return [data.get(f"selected_option_{question_no}") for question_no in self.question_nos]
+
+    def _result(self, raw_score, bitmap):
+        length = len(self.key)
+        percentage = (raw_score / length) * 100 if length else 0.0
+        return GradeResult(raw_score, percentage, bitmap, length)
+
+    def grade(self, answers):
+        """
+        Grade one encoded submission.
+
+        Args:
+            answers (bytes): The output of ``encode_answers``, one byte per question.
+
+        Returns:
+            GradeResult: The grade of the submission.
+
+        Raises:
+            ValueError: If the submission does not have one answer per question.
+        """
+        length = len(self.key)
+        if len(answers) != length:
+            raise ValueError(f"Expected {length} answers, got {len(answers)}.")
+        # Equal bytes XOR to zero, so the correct answers are the zero bytes of the difference
+        difference = (int.from_bytes(answers, 'big') ^ self._key_int).to_bytes(length, 'big')
+        digits = difference.translate(_MATCH_DIGITS)
+        return self._result(digits.count(b'1'), pack_bits(digits, length))
+
+    def grade_batch(self, submissions):
+        """
+        Grade many encoded submissions at once.
+
+        With NumPy installed the batch is compared against the key as one byte
+        matrix. Without it every submission goes through ``grade``.
+
+        Args:
+            submissions (sequence of bytes): Encoded submissions, one per participant.
+
+        Returns:
+            list of GradeResult: The grade of each submission, in order.
+
+        Raises:
+            ValueError: If a submission does not have one answer per question.
+        """
+        if numpy is None or not self.key or not submissions:
+            return [self.grade(answers) for answers in submissions]
+
+        length = len(self.key)
+        if any(len(answers) != length for answers in submissions):
+            raise ValueError(f"Every submission must have {length} answers.")
+        matrix = numpy.frombuffer(b''.join(submissions), dtype=numpy.uint8).reshape(len(submissions), length)
+        matches = matrix == numpy.frombuffer(self.key, dtype=numpy.uint8)
+        raw_scores = matches.sum(axis=1).tolist()
+        bitmaps = numpy.packbits(matches, axis=1).tobytes()
+        width = (length + 7) // 8
+        return [
+            self._result(raw_score, bitmaps[row * width:(row + 1) * width])
+            for row, raw_score in enumerate(raw_scores)
+        ]
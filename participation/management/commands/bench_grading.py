@@ -0,0 +1,76 @@
+"""
+Benchmark of the grading engine against the per-question loop ``submit_quiz`` used before.
+
+Synthetic submissions are graded in memory, without touching the database, with
+the previous loop, with ``AnswerKey.grade`` one submission at a time and with
+``AnswerKey.grade_batch``.
+
+Usage:
+    python manage.py bench_grading [--questions 50] [--submissions 10000]
+"""
+import random
+import time
+from django.core.management.base import BaseCommand
+from participation.grading import AnswerKey, encode_answers, numpy
+
+OPTIONS = 'ABCD'
+
+
+def legacy_grade(questions, post):
+    """The grading loop ``submit_quiz`` ran before the grading engine existed."""
+    raw_score = 0
+    correctness = []
+    for question_no, correct_option in questions:
+        is_correct = post.get(f"selected_option_{question_no}") == correct_option
+        if is_correct:
+            raw_score += 1
+        correctness.append(is_correct)
+    return raw_score, (raw_score / len(questions)) * 100, correctness
+
+
+class Command(BaseCommand):
+    help = "Benchmark the grading engine against the previous per-question grading loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--submissions', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        question_nos = range(1, options['questions'] + 1)
+        correct_options = [rng.choice(OPTIONS) for _ in question_nos]
+        questions = list(zip(question_nos, correct_options))
+        answer_key = AnswerKey(correct_options, question_nos)
+        posts = [
+            {f"selected_option_{no}": rng.choice(OPTIONS) for no in question_nos}
+            for _ in range(options['submissions'])
+        ]
+        self.stdout.write(
+            f"{options['submissions']} submissions of {options['questions']} questions "
+            f"(NumPy {'available' if numpy is not None else 'not installed'})"
+        )
+
+        started = time.perf_counter()
+        legacy = [legacy_grade(questions, post) for post in posts]
+        legacy_time = time.perf_counter() - started
+        self._report("legacy loop", legacy_time, legacy_time)
+
+        started = time.perf_counter()
+        encoded = [encode_answers(answer_key.answers_from_post(post)) for post in posts]
+        encode_time = time.perf_counter() - started
+        self._report("encoding answers", encode_time, legacy_time)
+
+        started = time.perf_counter()
+        single = [answer_key.grade(answers) for answers in encoded]
+        self._report("AnswerKey.grade", time.perf_counter() - started, legacy_time)
+
+        started = time.perf_counter()
+        batch = answer_key.grade_batch(encoded)
+        self._report("AnswerKey.grade_batch", time.perf_counter() - started, legacy_time)
+
+        if [result.raw_score for result in single] != [raw_score for raw_score, _, _ in legacy] or single != batch:
+            self.stderr.write("Grades differ between the legacy loop and the grading engine.")
+
+    def _report(self, label, elapsed, baseline):
+        self.stdout.write(f"{label + ':':<24}{elapsed * 1000:10.1f} ms  ({baseline / elapsed:.1f}x)")
@@ -0,0 +1,141 @@
+"""
+Load test of concurrent quiz submissions against the configured database profile.
+
+Every client thread submits one quiz per synthetic user the way ``submit_quiz``
+does: ``get_or_create`` the participant, then ``record_submission`` in one
+transaction. Connections are closed or kept after each submission as they are
+at the end of a request, so ``CONN_MAX_AGE`` and the pool take effect. The
+command reports submissions per second and failed submissions (such as
+"database is locked"), and deletes its quiz and users afterwards.
+
+With ``--compare`` the benchmark is run once per ``DB_PROFILE`` in a fresh
+process and the results are listed side by side. The database of each profile
+must already have its tables (``migrate --run-syncdb``).
+
+Usage:
+    python manage.py bench_submissions [--clients 20] [--submissions 10] [--questions 20]
+    python manage.py bench_submissions --compare sqlite-default sqlite postgres postgres-pooled
+"""
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, transaction
+from django.utils.timezone import now
+from Quiz_Portal.database import PROFILES, database_profile
+from participation.models import Participant
+from participation.submissions import answer_key_for, record_submission
+from quiz.models import Question, Quiz
+
+User = get_user_model()
+
+OPTIONS = 'ABCD'
+
+
+class Command(BaseCommand):
+    help = "Measure quiz submissions per second under concurrent clients for each database profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=20, help="Concurrent submitting threads.")
+        parser.add_argument('--submissions', type=int, default=10, help="Submissions per client.")
+        parser.add_argument('--questions', type=int, default=20, help="Questions in the quiz.")
+        parser.add_argument('--compare', nargs='+', choices=PROFILES, metavar='PROFILE',
+                            help="Run the benchmark once per profile in a separate process.")
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self._compare(options)
+
+        tag = f"subbench{uuid.uuid4().hex[:8]}"
+        users = self._create_users(tag, options['clients'] * options['submissions'])
+        quiz = self._create_quiz(tag, users[0], options['questions'])
+        try:
+            self._run(quiz, users, options)
+        finally:
+            quiz.delete()
+            User.objects.filter(username__startswith=f"{tag}_").delete()
+
+    def _compare(self, options):
+        arguments = [
+            sys.executable, sys.argv[0], 'bench_submissions',
+            '--clients', str(options['clients']),
+            '--submissions', str(options['submissions']),
+            '--questions', str(options['questions']),
+        ]
+        for profile in options['compare']:
+            result = subprocess.run(
+                arguments, env=dict(os.environ, DB_PROFILE=profile), capture_output=True, text=True
+            )
+            output = result.stdout.strip() or result.stderr.strip().splitlines()[-1]
+            self.stdout.write(f"{profile + ':':<17}{output}")
+
+    def _create_users(self, tag, count):
+        User.objects.bulk_create([
+            User(username=f"{tag}_{i}", email=f"{tag}_{i}@example.com", password='!')
+            for i in range(count)
+        ])
+        return list(User.objects.filter(username__startswith=f"{tag}_"))
+
+    def _create_quiz(self, tag, owner, questions):
+        quiz = Quiz.objects.create(
+            title=f"Submission benchmark {tag}", quiz_type=Quiz.PUBLIC,
+            duration=timedelta(minutes=30), created_by=owner,
+        )
+        Question.objects.bulk_create([
+            Question(
+                quiz=quiz, question_no=no, text=f"Question {no}",
+                option_a="a", option_b="b", option_c="c", option_d="d",
+                correct_option=random.choice(OPTIONS),
+            )
+            for no in range(1, questions + 1)
+        ])
+        return quiz
+
+    def _run(self, quiz, users, options):
+        answer_key = answer_key_for(quiz.quiz_id)
+        failures = []
+        start = threading.Barrier(options['clients'] + 1)
+
+        def submit(user):
+            with transaction.atomic():
+                participant, _ = Participant.objects.get_or_create(
+                    user=user, quiz=quiz, defaults={"start_time": now()}
+                )
+                selected = [random.choice(OPTIONS) for _ in range(len(answer_key))]
+                record_submission(participant, answer_key, selected)
+
+        def client(batch):
+            start.wait()
+            try:
+                for user in batch:
+                    try:
+                        submit(user)
+                    except Exception as error:
+                        failures.append(error)
+                    close_old_connections()  # what request_finished does after every request
+            finally:
+                connection.close()
+
+        batches = [users[i::options['clients']] for i in range(options['clients'])]
+        threads = [threading.Thread(target=client, args=(batch,)) for batch in batches]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        written = len(users) - len(failures)
+        self.stdout.write(
+            f"{written / elapsed:8.0f} submissions/s ({written} recorded, {len(failures)} failed "
+            f"in {elapsed:.2f}s, profile {database_profile()})"
+        )
+        if failures:
+            self.stdout.write(f"first failure: {failures[0]!r}")
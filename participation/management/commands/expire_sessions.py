@@ -0,0 +1,46 @@
+"""
+Sweeper that finalizes quiz sessions whose time ran out.
+
+A session starts when the participate view sends the questions. When no
+submission arrives within ``PARTICIPATION_SUBMIT_GRACE`` seconds after its
+deadline (the tab was closed, the browser went offline), this command records
+the attempt as a submission without answers. Sessions are found through the
+deadline index and finalized in batches, one transaction per batch, so the
+server closes expired attempts at its own pace instead of depending on every
+browser's timer firing at once. A sweep walks the overdue sessions once, in
+deadline order; sessions that fail are logged and retried by the next sweep.
+
+Usage:
+    python manage.py expire_sessions [--batch-size 100] [--interval 5] [--once]
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from participation.submissions import expire_sessions
+
+
+class Command(BaseCommand):
+    help = "Finalize quiz sessions past their deadline as submissions without answers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Sessions finalized per transaction.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to wait when no session is overdue.")
+        parser.add_argument('--once', action='store_true', help="Exit once no session is overdue.")
+
+    def handle(self, *args, **options):
+        grace = timedelta(seconds=settings.PARTICIPATION_SUBMIT_GRACE)
+        cursor = None
+        try:
+            while True:
+                finalized, failed, cursor = expire_sessions(now() - grace, options['batch_size'], cursor)
+                if finalized or failed:
+                    self.stdout.write(f"finalized {finalized}, failed {failed}")
+                if cursor is None:  # the sweep is over; the next one starts again at the oldest deadline
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
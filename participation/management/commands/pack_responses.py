@@ -0,0 +1,58 @@
+"""
+Management command that converts existing ``Response`` rows into packed responses.
+
+Submitted participants without packed responses are processed in batches, each in
+its own transaction. With ``--delete-rows`` the converted ``Response`` rows are
+deleted in the same transaction, which is what actually reclaims the space.
+
+Usage:
+    python manage.py pack_responses [<quiz_id>...] [--batch-size 500] [--delete-rows]
+"""
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from participation.models import Participant, Response
+from participation.packing import pack_answers
+
+
+class Command(BaseCommand):
+    help = "Pack the Response rows of submitted participants into Participant.packed_responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', help="Only convert the participants of these quizzes.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Participants converted per transaction.")
+        parser.add_argument('--delete-rows', action='store_true', help="Delete the Response rows once packed.")
+
+    def handle(self, *args, **options):
+        pending = Participant.objects.filter(end_time__isnull=False, packed_responses__isnull=True)
+        if options['quiz_ids']:
+            pending = pending.filter(quiz_id__in=options['quiz_ids'])
+        pending = pending.order_by('participant_id').values_list('participant_id', flat=True)
+
+        converted = deleted = 0
+        last_id = None
+        while True:
+            batch_query = pending if last_id is None else pending.filter(participant_id__gt=last_id)
+            with transaction.atomic():
+                participant_ids = list(batch_query[:options['batch_size']])
+                if not participant_ids:
+                    break
+                answers = defaultdict(list)
+                rows = Response.objects.filter(participant_id__in=participant_ids).values_list(
+                    'participant_id', 'question__question_no', 'selected_option', 'is_correct'
+                )
+                for participant_id, question_no, selected_option, is_correct in rows.iterator():
+                    answers[participant_id].append((question_no, selected_option, is_correct))
+                Participant.objects.bulk_update(
+                    [Participant(participant_id=participant_id, packed_responses=pack_answers(answers[participant_id]))
+                     for participant_id in participant_ids],
+                    ['packed_responses'],
+                )
+                if options['delete_rows']:
+                    deleted += Response.objects.filter(participant_id__in=participant_ids).delete()[0]
+            converted += len(participant_ids)
+            last_id = participant_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Packed the responses of {converted} participant(s), deleted {deleted} response row(s)."
+        ))
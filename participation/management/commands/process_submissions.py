@@ -0,0 +1,66 @@
+"""
+Worker that grades queued quiz submissions.
+
+With ``PARTICIPATION_ASYNC_SUBMISSIONS`` enabled, the participate view only stores
+the raw answers. This command claims pending submissions in batches and grades
+each batch in one transaction, so a burst of timer auto-submits costs one commit
+per batch instead of one per participant. Submissions claimed by a worker that
+died are returned to the queue after ``--stale-after`` seconds.
+
+Usage:
+    python manage.py process_submissions [--workers 1] [--batch-size 100] [--once]
+"""
+import multiprocessing
+import time
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils.timezone import now
+from participation.models import QueuedSubmission
+from participation.submissions import process_batch
+
+
+class Command(BaseCommand):
+    help = "Grade queued quiz submissions in batched transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Number of worker processes.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Submissions graded per transaction.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help="Seconds after which an unfinished claim is returned to the queue.")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 1:
+            self.work(options)
+            return
+
+        # Forked workers must open their own database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=self.work, args=(options,))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    def work(self, options):
+        worker = uuid.uuid4().hex
+        stale_after = timedelta(seconds=options['stale_after'])
+        try:
+            while True:
+                QueuedSubmission.requeue_stale(now() - stale_after)
+                batch = QueuedSubmission.claim(worker, options['batch_size'])
+                if not batch:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                graded, failed = process_batch(batch)
+                self.stdout.write(f"[{worker[:8]}] graded {graded}, failed {failed}")
+        except KeyboardInterrupt:
+            pass
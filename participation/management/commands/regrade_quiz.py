@@ -0,0 +1,30 @@
+"""
+Management command that re-grades submitted quizzes after their answer key was corrected.
+
+Usage:
+    python manage.py regrade_quiz <quiz_id>... [--chunk-size 20000]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from quiz.models import Quiz
+from participation.regrade import DEFAULT_CHUNK_SIZE, regrade_quiz
+
+
+class Command(BaseCommand):
+    help = "Grade the stored responses of quizzes again and refresh scores, stats and the leaderboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='+', help="The quizzes to re-grade.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Approximate number of responses re-graded per transaction.")
+
+    def handle(self, *args, **options):
+        quizzes = list(Quiz.objects.filter(quiz_id__in=options['quiz_ids']))
+        if len(quizzes) != len(set(options['quiz_ids'])):
+            raise CommandError("One or more quiz ids do not exist.")
+
+        for quiz in quizzes:
+            summary = regrade_quiz(quiz, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{quiz.title}: re-graded {summary.participants} participant(s), "
+                f"{summary.responses_changed} response(s) and {summary.scores_changed} score(s) changed."
+            ))
@@ -1,9 +1,13 @@
 from django.db import models
 
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
 from django.utils.timezone import now
 from django.contrib.auth import get_user_model
 from quiz.models import Quiz, Question
+from quiz.question_sets import get_question_set
+from .packing import Answer, count_correct, unpack_answers
 import uuid
 
 User = get_user_model()
@@ -20,6 +24,9 @@ class Participant(models.Model):
         score: The participant's score in the quiz, calculated based on correct responses.
         start_time: The time when the participant started the quiz.
         end_time: The time when the participant completed the quiz.
+        packed_responses: The participant's answers in the compact layout of
+            ``participation.packing``, used instead of ``Response`` rows when
+            ``PARTICIPATION_PACKED_RESPONSES`` is enabled or after ``pack_responses`` ran.
     """
     participant_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="participations")
@@ -27,10 +34,49 @@ class Participant(models.Model):
     score = models.FloatField(default=0.0)
     start_time = models.DateTimeField(default=now)
     end_time = models.DateTimeField(null=True, blank=True)
+    packed_responses = models.BinaryField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            # One attempt per user and quiz; also serves the (user, quiz) lookups
+            models.UniqueConstraint(fields=['user', 'quiz'], name='unique_participant_per_quiz'),
+        ]
+        indexes = [
+            models.Index(fields=['quiz', '-score'], name='participant_quiz_score_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title}"
 
+    def get_answers(self):
+        """
+        Returns the participant's answers, whether they are packed or stored as ``Response`` rows.
+
+        Returns:
+            list of Answer: ``(question_no, question_id, selected_option, is_correct)`` per
+            question, in question-number order.
+        """
+        if self.packed_responses is None:
+            return [
+                Answer(*row) for row in self.responses.order_by('question__question_no').values_list(
+                    'question__question_no', 'question_id', 'selected_option', 'is_correct'
+                )
+            ]
+        question_ids = {entry.question_no: entry.question_id for entry in get_question_set(self.quiz_id).answer_key}
+        return [
+            answer._replace(question_id=question_ids[answer.question_no])
+            for answer in unpack_answers(self.packed_responses)
+            if answer.question_no in question_ids
+        ]
+
+    def correct_count(self):
+        """
+        Returns the number of correctly answered questions.
+        """
+        if self.packed_responses is None:
+            return self.responses.filter(is_correct=True).count()
+        return count_correct(self.packed_responses)
+
     def calculate_score(self):
         """
         Calculates the score for the participant based on correct responses.
@@ -41,8 +87,8 @@ class Participant(models.Model):
         
         This method updates the participant's score and saves it in the database.
         """
-        correct_responses = self.responses.filter(is_correct=True).count()  # Count the correct responses
-        total_questions = self.quiz.questions.count()
+        correct_responses = self.correct_count()  # Count the correct responses
+        total_questions = len(get_question_set(self.quiz_id))  # Cached, no extra COUNT query
         self.score = (correct_responses / total_questions) * 100  # Calculate score as percentage
         self.save()  # Save the score to the database
 
@@ -67,3 +113,150 @@ class Response(models.Model):
 
     def __str__(self):
         return f"Response: {self.participant.user.username} - {self.question.text[:30]}"
+
+
+class QuizSession(models.Model):
+    """
+    An attempt in progress: when the user opened the quiz and when its time runs out.
+
+    The participate view starts the session when it sends the questions, so the
+    server, not the browser's timer, decides whether a submission is in time.
+    The session is deleted when the submission is recorded; sessions left past
+    their deadline are finalized by the ``expire_sessions`` sweeper.
+
+    Attributes:
+        user: The user taking the quiz.
+        quiz: The quiz being taken (one session per user and quiz).
+        started_at: When the questions were sent; becomes the participant's start time.
+        deadline: ``started_at`` plus the quiz duration.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="quiz_sessions")
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="sessions")
+    started_at = models.DateTimeField(default=now)
+    deadline = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'quiz'], name='unique_session_per_quiz'),
+        ]
+        indexes = [models.Index(fields=['deadline', 'id'], name='session_deadline_idx')]
+
+    def __str__(self):
+        return f"Session of user {self.user_id} on quiz {self.quiz_id} until {self.deadline}"
+
+    @classmethod
+    def start(cls, user, quiz):
+        """
+        Returns the user's session on the quiz, starting it now if there is none.
+
+        Reloading the quiz page therefore keeps the original deadline.
+
+        Args:
+            user: The user taking the quiz.
+            quiz: The quiz being taken.
+
+        Returns:
+            The session.
+        """
+        started_at = now()
+        session, _ = cls.objects.get_or_create(
+            user=user, quiz=quiz, defaults={'started_at': started_at, 'deadline': started_at + quiz.duration}
+        )
+        return session
+
+    def seconds_left(self, at=None):
+        """
+        Returns the whole seconds until the deadline, or 0 once it has passed.
+        """
+        return max(0, int((self.deadline - (at or now())).total_seconds()))
+
+    def is_overdue(self, at=None):
+        """
+        Returns whether a submission at ``at`` (default now) comes too late to be graded.
+
+        Submissions are accepted until ``PARTICIPATION_SUBMIT_GRACE`` seconds after
+        the deadline, which covers network delay and the timer's submit jitter.
+        """
+        return (at or now()) > self.deadline + timedelta(seconds=settings.PARTICIPATION_SUBMIT_GRACE)
+
+
+class QueuedSubmission(models.Model):
+    """
+    A submitted answer sheet waiting to be graded by the ``process_submissions`` worker.
+
+    When ``PARTICIPATION_ASYNC_SUBMISSIONS`` is enabled, the participate view only
+    stores the raw answers here and returns. Workers claim pending rows in batches,
+    grade them and delete them once the participant's result is committed.
+
+    Attributes:
+        participant: The participant who submitted (one queued submission per participant).
+        answers: The selected option of each question, keyed by question number.
+        status: ``pending``, ``processing`` or ``failed``.
+        submitted_at: When the answers were posted; becomes the participant's end time.
+        claimed_by: Token of the worker processing the submission.
+        claimed_at: When the worker claimed the submission.
+        error: The error of a failed submission.
+    """
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (FAILED, 'Failed'),
+    ]
+
+    participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name="queued_submission")
+    answers = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    submitted_at = models.DateTimeField(default=now)
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'], name='submission_queue_idx')]
+
+    def __str__(self):
+        return f"Submission of {self.participant} ({self.status})"
+
+    @classmethod
+    def claim(cls, worker, batch_size):
+        """
+        Marks up to ``batch_size`` pending submissions as processed by ``worker`` and returns them.
+
+        The claim is a conditional ``UPDATE``, so concurrent workers never claim the same row.
+
+        Args:
+            worker: A token unique to the claiming worker.
+            batch_size: The maximum number of submissions to claim.
+
+        Returns:
+            A list of the claimed submissions, oldest first.
+        """
+        ids = list(cls.objects.filter(status=cls.PENDING).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        cls.objects.filter(pk__in=ids, status=cls.PENDING).update(
+            status=cls.PROCESSING, claimed_by=worker, claimed_at=now()
+        )
+        return list(
+            cls.objects.filter(pk__in=ids, status=cls.PROCESSING, claimed_by=worker)
+            .select_related('participant__user', 'participant__quiz')
+            .order_by('id')
+        )
+
+    @classmethod
+    def requeue_stale(cls, older_than):
+        """
+        Returns submissions claimed by a worker that died before ``older_than`` to the queue.
+
+        Args:
+            older_than: A datetime; claims older than it are considered abandoned.
+
+        Returns:
+            The number of requeued submissions.
+        """
+        return cls.objects.filter(status=cls.PROCESSING, claimed_at__lt=older_than).update(
+            status=cls.PENDING, claimed_by='', claimed_at=None
+        )
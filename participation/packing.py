@@ -0,0 +1,102 @@
+"""
+Compact storage of a participant's answers in a single binary field.
+
+Instead of one ``Response`` row per question, a participant can keep all of its
+answers in ``Participant.packed_responses``. Question ``no`` owns slot
+``no - 1``, so numbering gaps left by deleted questions stay harmless and
+questions appended later simply fall outside the stored slots. The layout is::
+
+    slot count   2 bytes, big-endian
+    answers      2 bits per slot (A=0, B=1, C=2, D=3), most significant bits first
+    answered     1 bit per slot, set when the slot holds an answer
+    correct      1 bit per slot, set when the answer was graded correct
+
+A 50-question submission takes 34 bytes instead of 50 rows.
+"""
+from collections import namedtuple
+
+OPTIONS = 'ABCD'
+OPTION_BITS = {option: code for code, option in enumerate(OPTIONS)}
+
+# One answered question, whether it comes from packed storage or from a ``Response`` row
+Answer = namedtuple('Answer', ['question_no', 'question_id', 'selected_option', 'is_correct'])
+
+
+def _bitmap(flags):
+    """
+    Pack booleans into bytes, most significant bit first.
+    """
+    data = bytearray((len(flags) + 7) // 8)
+    for index, flag in enumerate(flags):
+        if flag:
+            data[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(data)
+
+
+def _bit(data, index):
+    return bool(data[index >> 3] & (0x80 >> (index & 7)))
+
+
+def pack_answers(answers):
+    """
+    Pack graded answers into the compact binary layout.
+
+    Args:
+        answers (iterable of tuple): ``(question_no, selected_option, is_correct)`` per
+            question. ``selected_option`` may be ``None`` for an unanswered question.
+
+    Returns:
+        bytes: The packed answers.
+    """
+    answers = list(answers)
+    slots = max((question_no for question_no, _, _ in answers), default=0)
+    codes = bytearray((slots + 3) // 4)
+    answered, correct = [False] * slots, [False] * slots
+    for question_no, selected_option, is_correct in answers:
+        slot = question_no - 1
+        code = OPTION_BITS.get(selected_option)
+        if code is not None:
+            codes[slot >> 2] |= code << (6 - 2 * (slot & 3))
+            answered[slot] = True
+        correct[slot] = bool(is_correct)
+    return slots.to_bytes(2, 'big') + bytes(codes) + _bitmap(answered) + _bitmap(correct)
+
+
+def unpack_answers(data):
+    """
+    Decode packed answers.
+
+    Args:
+        data (bytes): The output of ``pack_answers``.
+
+    Returns:
+        list of Answer: One entry per stored slot, in question-number order, with a
+        ``question_id`` of ``None``. Unanswered slots have a ``selected_option`` of ``None``.
+    """
+    data = bytes(data)
+    slots = int.from_bytes(data[:2], 'big')
+    codes_end = 2 + (slots + 3) // 4
+    bitmap_size = (slots + 7) // 8
+    codes = data[2:codes_end]
+    answered = data[codes_end:codes_end + bitmap_size]
+    correct = data[codes_end + bitmap_size:codes_end + 2 * bitmap_size]
+    return [
+        Answer(
+            slot + 1,
+            None,
+            OPTIONS[(codes[slot >> 2] >> (6 - 2 * (slot & 3))) & 3] if _bit(answered, slot) else None,
+            _bit(correct, slot),
+        )
+        for slot in range(slots)
+    ]
+
+
+def count_correct(data):
+    """
+    Return the number of correct answers in packed answers without decoding them.
+    """
+    data = bytes(data)
+    slots = int.from_bytes(data[:2], 'big')
+    bitmap_size = (slots + 7) // 8
+    correct = data[len(data) - bitmap_size:]
+    return int.from_bytes(correct, 'big').bit_count()
@@ -0,0 +1,177 @@
+"""
+Re-grading of submitted quizzes after an answer-key correction.
+
+When a question's ``correct_option`` is fixed after participants have submitted,
+``regrade_quiz`` grades the stored responses again against the current answer
+key. Participants are processed in keyset-ordered chunks, each in its own short
+transaction. Only the rows that actually change are written, and they are written
+with a few ``UPDATE ... CASE`` statements per chunk. Memory use and lock time are
+bounded by the chunk size, not by the number of responses of the quiz.
+"""
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import BinaryField, BooleanField, Case, F, FloatField, Value, When
+from leaderboard.models import LeaderboardEntry, LeaderboardScore
+from quiz.models import QuizStats
+from quiz.question_sets import get_question_set
+from User_Profile.models import UserScore
+from .grading import UNANSWERED, AnswerKey, OPTION_CODES
+from .models import Participant, Response
+from .packing import pack_answers, unpack_answers
+
+DEFAULT_CHUNK_SIZE = 20_000  # responses re-graded per transaction
+UPDATE_BATCH_SIZE = 250  # rows per UPDATE ... CASE, keeps SQLite under its 999 variable limit
+
+OPTIONS_BY_CODE = {code[0]: option for option, code in OPTION_CODES.items()}
+
+RegradeSummary = namedtuple('RegradeSummary', ['participants', 'responses_changed', 'scores_changed'])
+
+
+def case_update(queryset, key, field, values, output_field, increment=False):
+    """
+    Set ``field`` to a different value per row with one ``UPDATE ... CASE`` per batch.
+
+    Args:
+        queryset (QuerySet): The rows that may be updated.
+        key (str): The column identifying a row in ``values``.
+        field (str): The column to update.
+        values (dict): The new value of each row, keyed by ``key``.
+        output_field (Field): The model field type of the values.
+        increment (bool): Add the values to the current column value instead of replacing it.
+
+    Returns:
+        int: The number of updated rows.
+    """
+    updated = 0
+    items = list(values.items())
+    for start in range(0, len(items), UPDATE_BATCH_SIZE):
+        batch = items[start:start + UPDATE_BATCH_SIZE]
+        expression = Case(
+            *[When(**{key: row_key}, then=Value(value)) for row_key, value in batch],
+            output_field=output_field,
+        )
+        if increment:
+            expression = F(field) + expression
+        updated += queryset.filter(**{f'{key}__in': [row_key for row_key, _ in batch]}).update(**{field: expression})
+    return updated
+
+
+def _regrade_chunk(answer_key, positions, participants):
+    """
+    Re-grade the responses of a chunk of participants and write back what changed.
+
+    Answers are read from ``Response`` rows and from packed responses alike.
+
+    Returns:
+        tuple: The number of changed responses and changed scores.
+    """
+    responses = (
+        Response.objects.filter(participant_id__in=[participant_id for participant_id, _, _, _ in participants])
+        .values_list('response_id', 'participant_id', 'question_id', 'selected_option', 'is_correct')
+    )
+    answers = {participant_id: bytearray(UNANSWERED * len(answer_key)) for participant_id, _, _, _ in participants}
+    packed_positions = {question_no: position for position, question_no in enumerate(answer_key.question_nos)}
+    packed_stored = []
+    for participant_id, _, _, packed in participants:
+        if packed is None:
+            continue
+        for answer in unpack_answers(packed):
+            position = packed_positions.get(answer.question_no)
+            if position is None:
+                continue
+            if answer.selected_option:
+                answers[participant_id][position] = OPTION_CODES[answer.selected_option][0]
+            packed_stored.append((participant_id, position, answer.is_correct))
+    stored = []
+    for response_id, participant_id, question_id, selected_option, is_correct in responses.iterator():
+        position = positions.get(question_id)
+        if position is None:
+            continue
+        answers[participant_id][position] = OPTION_CODES.get(selected_option, UNANSWERED)[0]
+        stored.append((response_id, participant_id, position, is_correct))
+
+    grades = dict(zip(answers, answer_key.grade_batch([bytes(row) for row in answers.values()])))
+
+    correctness = {}
+    for response_id, participant_id, position, is_correct in stored:
+        now_correct = grades[participant_id].is_correct(position)
+        if now_correct != is_correct:
+            correctness[response_id] = now_correct
+    packed_changed = sum(
+        grades[participant_id].is_correct(position) != is_correct
+        for participant_id, position, is_correct in packed_stored
+    )
+    scores, deltas, repacked = {}, {}, {}
+    for participant_id, user_id, score, packed in participants:
+        grade = grades[participant_id]
+        if grade.percentage != score:
+            scores[participant_id] = grade.percentage
+            deltas[user_id] = grade.percentage - score
+        if packed is not None:
+            new_packed = pack_answers(
+                (question_no, OPTIONS_BY_CODE.get(code), is_correct)
+                for question_no, code, is_correct in zip(answer_key.question_nos, answers[participant_id], grade.correctness())
+            )
+            if new_packed != bytes(packed):
+                repacked[participant_id] = new_packed
+
+    case_update(Response.objects.all(), 'response_id', 'is_correct', correctness, BooleanField())
+    case_update(Participant.objects.all(), 'participant_id', 'score', scores, FloatField())
+    case_update(Participant.objects.all(), 'participant_id', 'packed_responses', repacked, BinaryField())
+    # Move the changed entries between the score counts of their quiz and the global scope
+    if scores:
+        LeaderboardScore.move(
+            (quiz_id, score, scores[participant_id])
+            for participant_id, quiz_id, score in LeaderboardEntry.objects.filter(participant_id__in=scores)
+            .values_list('participant_id', 'quiz_id', 'score')
+        )
+    case_update(LeaderboardEntry.objects.all(), 'participant_id', 'score', scores, FloatField())
+    case_update(UserScore.objects.all(), 'user_id', 'total_score', deltas, FloatField(), increment=True)
+    return len(correctness) + packed_changed, len(scores)
+
+
+def regrade_quiz(quiz, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Grade every submitted response of a quiz again against its current answer key.
+
+    Updates ``Response.is_correct``, ``Participant.score``, the participants'
+    leaderboard entries and their score counts, and ``UserScore`` totals chunk by
+    chunk, then rebuilds the quiz statistics. Only the counts of the changed
+    scores are touched, so other quizzes' leaderboards are left alone.
+
+    Args:
+        quiz (Quiz): The quiz whose answer key was corrected.
+        chunk_size (int): Approximate number of responses re-graded per transaction.
+
+    Returns:
+        RegradeSummary: The number of re-graded participants, changed responses and changed scores.
+    """
+    question_set = get_question_set(quiz.quiz_id)
+    answer_key = AnswerKey.from_question_set(question_set)
+    positions = {question_id: position for position, question_id in enumerate(answer_key.question_ids)}
+    participants_per_chunk = max(1, chunk_size // max(1, len(answer_key)))
+
+    submitted = (
+        Participant.objects.filter(quiz=quiz, end_time__isnull=False)
+        .order_by('participant_id')
+        .values_list('participant_id', 'user_id', 'score', 'packed_responses')
+    )
+    total_participants = total_responses = total_scores = 0
+    last_id = None
+    while True:
+        chunk_query = submitted if last_id is None else submitted.filter(participant_id__gt=last_id)
+        with transaction.atomic():
+            participants = list(chunk_query.select_for_update()[:participants_per_chunk])
+            if not participants:
+                break
+            responses_changed, scores_changed = _regrade_chunk(answer_key, positions, participants)
+        total_participants += len(participants)
+        total_responses += responses_changed
+        total_scores += scores_changed
+        last_id = participants[-1][0]
+
+    if total_scores:
+        with transaction.atomic():
+            stats, _ = QuizStats.objects.get_or_create(quiz=quiz)
+            stats.rebuild()
+    return RegradeSummary(total_participants, total_responses, total_scores)
@@ -0,0 +1,211 @@
+"""
+Recording of graded quiz submissions, synchronously or through the submission queue.
+
+``record_submission`` performs every write of a submission: the answers, the
+participant's score and end time, the quiz statistics, the leaderboard and the
+user's totals. The participate view calls it directly, or, with
+``PARTICIPATION_ASYNC_SUBMISSIONS`` enabled, stores the raw answers as a
+``QueuedSubmission`` that ``process_batch`` grades later in batched transactions.
+
+Attempts are timed by a ``QuizSession`` started when the questions are sent.
+``finalize_session`` records a session whose time ran out as a submission
+without answers; ``expire_sessions`` does so in batches for the
+``expire_sessions`` sweeper, so browsers that never submit still end up with a
+result and nobody has to race the clock.
+"""
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+from leaderboard.models import LeaderboardEntry
+from quiz.models import QuizStats
+from quiz.question_sets import get_question_set
+from User_Profile.models import UserScore
+from .grading import AnswerKey, encode_answers
+from .models import Participant, QueuedSubmission, QuizSession, Response
+from .packing import pack_answers
+
+logger = logging.getLogger(__name__)
+
+
+def answer_key_for(quiz_id):
+    """
+    Return the ``AnswerKey`` of a quiz from its cached question set.
+    """
+    return AnswerKey.from_question_set(get_question_set(quiz_id))
+
+
+def record_submission(participant, answer_key, selected_options, finished_at=None):
+    """
+    Grade a participant's answers and write the result everywhere it is aggregated.
+
+    Must run inside a transaction so the answers, the score and the aggregates are
+    committed together.
+
+    Args:
+        participant (Participant): The participant who submitted.
+        answer_key (AnswerKey): The answer key of the participant's quiz.
+        selected_options (list): The selected option (or ``None``) of each question, in key order.
+        finished_at (datetime, optional): The submission time. Defaults to now.
+
+    Returns:
+        tuple: The ``GradeResult`` and the updated ``QuizStats``.
+    """
+    grade = answer_key.grade(encode_answers(selected_options))
+    correctness = grade.correctness()
+
+    # Save the answers, packed on the participant or as one response row per question
+    if settings.PARTICIPATION_PACKED_RESPONSES:
+        participant.packed_responses = pack_answers(zip(answer_key.question_nos, selected_options, correctness))
+    else:
+        # Unanswered questions (e.g. when the timer submits the form) have no response row
+        Response.objects.bulk_create([
+            Response(
+                participant=participant,
+                question_id=question_id,
+                selected_option=selected_option,
+                is_correct=is_correct
+            )
+            for question_id, selected_option, is_correct
+            in zip(answer_key.question_ids, selected_options, correctness)
+            if selected_option
+        ])
+
+    participant.score = grade.percentage
+    participant.end_time = finished_at or now()
+    participant.save()
+
+    # Fold the new score into the running quiz stats, the leaderboard and the user's totals
+    quiz_stats = QuizStats.record_score(participant.quiz, grade.percentage)
+    LeaderboardEntry.record(participant)
+    UserScore.record_participation(participant.user_id, grade.percentage)
+    return grade, quiz_stats
+
+
+def enqueue_submission(participant, answer_key, selected_options):
+    """
+    Store a participant's raw answers for a worker to grade.
+
+    Args:
+        participant (Participant): The participant who submitted.
+        answer_key (AnswerKey): The answer key the form was rendered from.
+        selected_options (list): The selected option (or ``None``) of each question, in key order.
+
+    Returns:
+        bool: ``False`` if the participant already has a queued submission.
+    """
+    _, created = QueuedSubmission.objects.get_or_create(
+        participant=participant,
+        defaults={'answers': {
+            str(question_no): option
+            for question_no, option in zip(answer_key.question_nos, selected_options)
+            if option
+        }},
+    )
+    return created
+
+
+def process_batch(submissions):
+    """
+    Grade claimed submissions and commit them in one transaction.
+
+    Each submission runs in its own savepoint, so one failing submission is
+    marked as failed without rolling back the rest of the batch.
+
+    Args:
+        submissions (list of QueuedSubmission): Submissions claimed by this worker.
+
+    Returns:
+        tuple: The number of graded and failed submissions.
+    """
+    answer_keys = {}
+    graded = failed = 0
+    with transaction.atomic():
+        for submission in submissions:
+            participant = submission.participant
+            try:
+                with transaction.atomic():
+                    if participant.quiz_id not in answer_keys:
+                        answer_keys[participant.quiz_id] = answer_key_for(participant.quiz_id)
+                    answer_key = answer_keys[participant.quiz_id]
+                    selected_options = [submission.answers.get(str(no)) for no in answer_key.question_nos]
+                    record_submission(participant, answer_key, selected_options, finished_at=submission.submitted_at)
+                    submission.delete()
+                graded += 1
+            except Exception as error:
+                logger.exception("Grading queued submission %s failed", submission.pk)
+                QueuedSubmission.objects.filter(pk=submission.pk).update(
+                    status=QueuedSubmission.FAILED, error=str(error)
+                )
+                failed += 1
+    return graded, failed
+
+
+def finalize_session(session, answer_keys=None):
+    """
+    Record a session whose time ran out as a submission without answers.
+
+    Deleting the session is the claim: a concurrent submission or sweeper that
+    deleted it first wins, and nothing is recorded here. Must run inside a
+    transaction.
+
+    Args:
+        session (QuizSession): The overdue session.
+        answer_keys (dict, optional): Answer keys by quiz id, shared across a batch.
+
+    Returns:
+        bool: Whether this call finalized the session.
+    """
+    deleted, _ = QuizSession.objects.filter(pk=session.pk).delete()
+    if not deleted:
+        return False
+    participant, created = Participant.objects.get_or_create(
+        user_id=session.user_id, quiz_id=session.quiz_id, defaults={'start_time': session.started_at}
+    )
+    if not created:
+        return False  # already submitted or queued
+    answer_keys = {} if answer_keys is None else answer_keys
+    if session.quiz_id not in answer_keys:
+        answer_keys[session.quiz_id] = answer_key_for(session.quiz_id)
+    answer_key = answer_keys[session.quiz_id]
+    record_submission(participant, answer_key, [None] * len(answer_key.question_nos), finished_at=session.deadline)
+    return True
+
+
+def expire_sessions(before, batch_size, after=None):
+    """
+    Finalize up to ``batch_size`` sessions whose deadline passed before ``before``, in one transaction.
+
+    Each session runs in its own savepoint, so one failing session is logged
+    and left for the next sweep without rolling back the rest of the batch.
+    Sessions are taken in ``(deadline, id)`` order after the ``after`` cursor,
+    so within a sweep, sessions that keep failing do not hold back the ones
+    behind them.
+
+    Args:
+        before (datetime): Sessions with an earlier deadline are finalized.
+        batch_size (int): The maximum number of sessions to finalize.
+        after (tuple, optional): The cursor returned for the previous batch of the sweep.
+
+    Returns:
+        tuple: The number of finalized and failed sessions, and the cursor of the
+        next batch, or None once the sweep reached the last overdue session.
+    """
+    sessions = QuizSession.objects.filter(deadline__lt=before)
+    if after is not None:
+        deadline, session_id = after
+        sessions = sessions.filter(Q(deadline__gt=deadline) | Q(deadline=deadline, id__gt=session_id))
+    sessions = list(sessions.order_by('deadline', 'id')[:batch_size])
+    answer_keys = {}
+    finalized = failed = 0
+    with transaction.atomic():
+        for session in sessions:
+            try:
+                with transaction.atomic():
+                    finalized += finalize_session(session, answer_keys)
+            except Exception:
+                logger.exception("Finalizing quiz session %s failed", session.pk)
+                failed += 1
+    cursor = (sessions[-1].deadline, sessions[-1].id) if len(sessions) == batch_size else None
+    return finalized, failed, cursor
@@ -1,10 +1,24 @@
-from django.test import TestCase
+from unittest import mock
+from django.conf import settings
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
 from django.contrib.auth import get_user_model
 from datetime import timedelta
 from django.utils.timezone import now
-from quiz.models import Quiz, Question
-from participation.models import Participant, Response
+from quiz.models import Quiz, Question, QuizStats
+from participation.models import Participant, QueuedSubmission, QuizSession, Response
+from participation.submissions import finalize_session
+from participation import grading
+from participation.grading import AnswerKey, encode_answers
+from participation.regrade import regrade_quiz
+from participation.packing import count_correct, pack_answers, unpack_answers
+from leaderboard.models import LeaderboardEntry, LeaderboardScore
+from django.core.management import call_command
+from io import StringIO
 from core.models import Tag
+from User_Profile.models import UserScore
+from Quiz_Portal.testing import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -122,3 +136,438 @@ class ParticipantResponseModelTest(TestCase):
             f"Response: {self.participant.user.username} - {self.question1.text[:30]}"
         )
         
+
+
+class SubmitQuizViewTest(TestCase):
+    """
+    Test case for submitting a quiz through the participate view.
+    """
+    def setUp(self):
+        """
+        Sets up a logged-in user and a quiz with two questions.
+        """
+        self.user = User.objects.create_user(
+            username="submitter",
+            email="submitter@example.com",
+            password="password123"
+        )
+        self.client.login(email="submitter@example.com", password="password123")
+
+        self.quiz = Quiz.objects.create(
+            title="Submission Quiz",
+            quiz_type=Quiz.PUBLIC,
+            duration=timedelta(minutes=30),
+            created_by=self.user
+        )
+        for no, correct in enumerate(["B", "A"], start=1):
+            Question.objects.create(
+                quiz=self.quiz, question_no=no, text=f"Question {no}",
+                option_a="a", option_b="b", option_c="c", option_d="d",
+                correct_option=correct
+            )
+
+    def test_submit_quiz_grades_and_updates_stats(self):
+        """Test that a submission is graded, stored and folded into the quiz stats."""
+        self.client.get(reverse('participate', args=[self.quiz.quiz_id]))
+        response = self.client.post(
+            reverse('participate', args=[self.quiz.quiz_id]),
+            {"selected_option_1": "B", "selected_option_2": "C"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'participation/result.html')
+        self.assertEqual(response.context['raw_score'], 1)
+
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(participant.score, 50.0)
+        self.assertIsNotNone(participant.end_time)
+        self.assertEqual(participant.responses.count(), 2)
+
+        stats = QuizStats.objects.get(quiz=self.quiz)
+        self.assertEqual(stats.total_participants, 1)
+        self.assertEqual(stats.highest_score, 50.0)
+        self.assertEqual(stats.average_score, 50.0)
+        self.assertEqual(UserScore.stats_for(self.user)['total_score'], 50.0)
+
+
+class GradingEngineTest(SimpleTestCase):
+    """
+    Test case for the byte-array grading engine.
+    """
+    def setUp(self):
+        self.answer_key = AnswerKey("ABCDABCDA", range(1, 10))
+
+    def test_grade_single_submission(self):
+        """Test raw score, percentage and the packed correctness bitmap of one submission."""
+        result = self.answer_key.grade(encode_answers(["A", "C", "C", None, "A", "B", "X", "D", "A"]))
+        self.assertEqual(result.raw_score, 6)
+        self.assertAlmostEqual(result.percentage, 600 / 9)
+        self.assertEqual(result.bitmap, bytes([0b10101101, 0b10000000]))
+        self.assertEqual(result.correctness(), [True, False, True, False, True, True, False, True, True])
+
+    def test_answers_from_post(self):
+        """Test that form answers are read in question order."""
+        answers = self.answer_key.answers_from_post({"selected_option_2": "B", "selected_option_1": "D"})
+        self.assertEqual(answers[:3], ["D", "B", None])
+
+    def test_grade_rejects_wrong_length(self):
+        """Test that a submission with a missing answer slot is rejected."""
+        with self.assertRaises(ValueError):
+            self.answer_key.grade(b"ABC")
+
+    def test_grade_batch_matches_single_grades(self):
+        """Test that batch grading agrees with single grading, with and without NumPy."""
+        submissions = [encode_answers(options) for options in ("ABCDABCDA", "DCBADCBAD", "AAAAAAAAA", "---------")]
+        expected = [self.answer_key.grade(answers) for answers in submissions]
+        self.assertEqual([result.raw_score for result in expected], [9, 0, 3, 0])
+        self.assertEqual(self.answer_key.grade_batch(submissions), expected)
+        with mock.patch.object(grading, 'numpy', None):
+            self.assertEqual(self.answer_key.grade_batch(submissions), expected)
+
+
+class RegradeQuizTest(TestCase):
+    """
+    Test case for re-grading submissions after an answer-key correction.
+    """
+    def setUp(self):
+        """
+        Sets up a two-question quiz submitted by three users through the participate view.
+        """
+        self.quiz = Quiz.objects.create(
+            title="Regrade Quiz", duration=timedelta(minutes=30),
+            created_by=User.objects.create(username="author", email="author@example.com")
+        )
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz, question_no=no, text=f"Question {no}",
+                option_a="a", option_b="b", option_c="c", option_d="d", correct_option=correct
+            )
+            for no, correct in enumerate(["A", "B"], start=1)
+        ]
+        self.users = {}
+        for name, answers in (("alice", "AB"), ("bob", "AC"), ("carol", "CC")):
+            user = User.objects.create_user(username=name, email=f"{name}@example.com", password="password123")
+            self.client.force_login(user)
+            self.client.get(reverse('participate', args=[self.quiz.quiz_id]))
+            self.client.post(reverse('participate', args=[self.quiz.quiz_id]), {
+                f"selected_option_{no}": option for no, option in enumerate(answers, start=1)
+            })
+            self.users[name] = user
+
+    def score_of(self, name):
+        return Participant.objects.get(user=self.users[name], quiz=self.quiz).score
+
+    def test_regrade_after_correction(self):
+        """Test that responses, scores, stats, leaderboard and user totals follow the corrected key."""
+        self.assertEqual([self.score_of(name) for name in ("alice", "bob", "carol")], [100.0, 50.0, 0.0])
+        self.questions[1].correct_option = "C"
+        self.questions[1].save()
+
+        summary = regrade_quiz(self.quiz, chunk_size=2)  # one participant per transaction
+
+        self.assertEqual(summary.participants, 3)
+        self.assertEqual(summary.responses_changed, 3)
+        self.assertEqual(summary.scores_changed, 3)
+        self.assertEqual([self.score_of(name) for name in ("alice", "bob", "carol")], [50.0, 100.0, 50.0])
+        self.assertEqual(Response.objects.filter(participant__quiz=self.quiz, is_correct=True).count(), 4)
+
+        stats = QuizStats.objects.get(quiz=self.quiz)
+        self.assertEqual(stats.highest_score, 100.0)
+        self.assertEqual(stats.lowest_score, 50.0)
+        self.assertAlmostEqual(stats.average_score, 200 / 3)
+
+        entry = LeaderboardEntry.objects.get(user=self.users["bob"])
+        self.assertEqual((entry.score, entry.quiz_rank), (100.0, 1))
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.users["carol"]).quiz_rank, 2)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.users["carol"]).global_rank, 2)
+        for scope in (self.quiz, None):
+            self.assertCountEqual(
+                LeaderboardScore.objects.filter(quiz=scope).values_list('score', 'entries'), [(100.0, 1), (50.0, 2)]
+            )
+        self.assertEqual(UserScore.stats_for(self.users["alice"])['total_score'], 50.0)
+        self.assertEqual(UserScore.stats_for(self.users["carol"])['total_score'], 50.0)
+
+    def test_regrade_without_changes_writes_nothing(self):
+        """Test that re-grading an unchanged answer key leaves every row alone."""
+        summary = regrade_quiz(self.quiz)
+        self.assertEqual((summary.responses_changed, summary.scores_changed), (0, 0))
+
+    def test_regrade_command(self):
+        """Test the regrade_quiz management command."""
+        self.questions[0].correct_option = "C"
+        self.questions[0].save()
+        out = StringIO()
+        call_command('regrade_quiz', str(self.quiz.quiz_id), stdout=out)
+        self.assertIn("3 participant(s)", out.getvalue())
+        self.assertEqual(self.score_of("carol"), 50.0)
+
+
+class PackedResponsesTest(TestCase):
+    """
+    Test case for the compact packed response storage.
+    """
+    def setUp(self):
+        """
+        Sets up a logged-in user and a three-question quiz.
+        """
+        self.user = User.objects.create_user(username="packer", email="packer@example.com", password="password123")
+        self.client.force_login(self.user)
+        self.quiz = Quiz.objects.create(title="Packed Quiz", duration=timedelta(minutes=30), created_by=self.user)
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz, question_no=no, text=f"Question {no}",
+                option_a="a", option_b="b", option_c="c", option_d="d", correct_option=correct
+            )
+            for no, correct in enumerate(["D", "B", "A"], start=1)
+        ]
+
+    def submit(self):
+        self.client.get(reverse('participate', args=[self.quiz.quiz_id]))
+        self.client.post(reverse('participate', args=[self.quiz.quiz_id]), {
+            "selected_option_1": "D", "selected_option_2": "C",
+        })
+        return Participant.objects.get(user=self.user, quiz=self.quiz)
+
+    def test_pack_round_trip(self):
+        """Test that answers, unanswered questions and numbering gaps survive packing."""
+        packed = pack_answers([(1, "D", True), (2, None, False), (4, "B", True), (5, "A", False)])
+        self.assertEqual(len(packed), 2 + 2 + 1 + 1)
+        self.assertEqual(
+            [(a.question_no, a.selected_option, a.is_correct) for a in unpack_answers(packed)],
+            [(1, "D", True), (2, None, False), (3, None, False), (4, "B", True), (5, "A", False)],
+        )
+        self.assertEqual(count_correct(packed), 2)
+
+    @override_settings(PARTICIPATION_PACKED_RESPONSES=True)
+    def test_submit_packed(self):
+        """Test that a packed submission stores no rows and reads back through the same accessors."""
+        participant = self.submit()
+        self.assertFalse(Response.objects.filter(participant=participant).exists())
+        self.assertAlmostEqual(participant.score, 100 / 3)
+        self.assertEqual(
+            [(a.question_id, a.selected_option, a.is_correct) for a in participant.get_answers()],
+            [(self.questions[0].question_id, "D", True), (self.questions[1].question_id, "C", False),
+             (self.questions[2].question_id, None, False)],
+        )
+        participant.calculate_score()
+        self.assertAlmostEqual(participant.score, 100 / 3)
+
+    def test_pack_responses_command_and_regrade(self):
+        """Test the backfill command and that re-grading updates packed answers."""
+        self.client.get(reverse('participate', args=[self.quiz.quiz_id]))
+        self.client.post(reverse('participate', args=[self.quiz.quiz_id]), {
+            "selected_option_1": "D", "selected_option_2": "C", "selected_option_3": "B",
+        })
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        before = participant.get_answers()
+
+        call_command('pack_responses', '--delete-rows', stdout=StringIO())
+        participant.refresh_from_db()
+        self.assertIsNotNone(participant.packed_responses)
+        self.assertFalse(Response.objects.filter(participant=participant).exists())
+        self.assertEqual(participant.get_answers(), before)
+
+        self.questions[1].correct_option = "C"
+        self.questions[1].save()
+        summary = regrade_quiz(self.quiz)
+        self.assertEqual((summary.responses_changed, summary.scores_changed), (1, 1))
+        participant.refresh_from_db()
+        self.assertAlmostEqual(participant.score, 200 / 3)
+        self.assertEqual([a.is_correct for a in participant.get_answers()], [True, True, False])
+
+
+@override_settings(PARTICIPATION_ASYNC_SUBMISSIONS=True)
+class QueuedSubmissionTest(TestCase):
+    """
+    Test case for queued submissions graded by the process_submissions worker.
+    """
+    def setUp(self):
+        """
+        Sets up a logged-in user and a two-question quiz.
+        """
+        self.user = User.objects.create_user(username="queued", email="queued@example.com", password="password123")
+        self.client.force_login(self.user)
+        self.quiz = Quiz.objects.create(title="Queued Quiz", duration=timedelta(minutes=30), created_by=self.user)
+        for no, correct in enumerate(["A", "B"], start=1):
+            Question.objects.create(
+                quiz=self.quiz, question_no=no, text=f"Question {no}",
+                option_a="a", option_b="b", option_c="c", option_d="d", correct_option=correct
+            )
+
+    def test_submission_is_queued_then_graded(self):
+        """Test that the POST only queues the answers and the worker grades them."""
+        self.client.get(reverse('participate', args=[self.quiz.quiz_id]))
+        response = self.client.post(reverse('participate', args=[self.quiz.quiz_id]), {"selected_option_1": "A"})
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        result_url = reverse('submission_result', args=[participant.participant_id])
+        self.assertRedirects(response, result_url)
+        self.assertIsNone(participant.end_time)
+        self.assertEqual(QueuedSubmission.objects.get().answers, {"1": "A"})
+        self.assertEqual(self.client.get(result_url, {"format": "json"}).json(), {"status": "pending"})
+        self.assertTemplateUsed(self.client.get(result_url), 'participation/submission_pending.html')
+
+        call_command('process_submissions', '--once', stdout=StringIO())
+
+        self.assertFalse(QueuedSubmission.objects.exists())
+        participant.refresh_from_db()
+        self.assertEqual(participant.score, 50.0)
+        self.assertIsNotNone(participant.end_time)
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).total_participants, 1)
+        self.assertEqual(self.client.get(result_url, {"format": "json"}).json(), {"status": "done"})
+        response = self.client.get(result_url)
+        self.assertTemplateUsed(response, 'participation/result.html')
+        self.assertEqual((response.context['raw_score'], response.context['total_questions']), (1, 2))
+
+    def test_claims_are_exclusive_and_stale_claims_requeued(self):
+        """Test that a claimed submission is not claimed twice until its claim goes stale."""
+        self.client.get(reverse('participate', args=[self.quiz.quiz_id]))
+        self.client.post(reverse('participate', args=[self.quiz.quiz_id]), {"selected_option_1": "A"})
+        self.assertEqual(len(QueuedSubmission.claim("first", 10)), 1)
+        self.assertEqual(QueuedSubmission.claim("second", 10), [])
+        self.assertEqual(QueuedSubmission.requeue_stale(now() + timedelta(seconds=1)), 1)
+        self.assertEqual(len(QueuedSubmission.claim("second", 10)), 1)
+
+
+class QuizSessionTest(TestCase):
+    """
+    Test case for the server-side quiz timer and the expire_sessions sweeper.
+    """
+    def setUp(self):
+        """
+        Sets up a logged-in user and a two-question, ten-minute quiz.
+        """
+        self.user = User.objects.create_user(username="timed", email="timed@example.com", password="password123")
+        self.client.force_login(self.user)
+        self.quiz = Quiz.objects.create(title="Timed Quiz", duration=timedelta(minutes=10), created_by=self.user)
+        for no, correct in enumerate(["A", "B"], start=1):
+            Question.objects.create(
+                quiz=self.quiz, question_no=no, text=f"Question {no}",
+                option_a="a", option_b="b", option_c="c", option_d="d", correct_option=correct
+            )
+        self.url = reverse('participate', args=[self.quiz.quiz_id])
+
+    def expire(self, seconds_ago):
+        """Move the session's deadline to the given number of seconds in the past."""
+        QuizSession.objects.filter(user=self.user).update(deadline=now() - timedelta(seconds=seconds_ago))
+
+    def test_rendering_the_quiz_starts_one_session(self):
+        """Test that the first render starts the clock and a reload keeps the deadline."""
+        response = self.client.get(self.url)
+        session = QuizSession.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(session.deadline - session.started_at, timedelta(minutes=10))
+        self.assertAlmostEqual(response.context['seconds_left'], 600, delta=2)
+
+        QuizSession.objects.filter(pk=session.pk).update(deadline=now() + timedelta(minutes=4))
+        response = self.client.get(self.url)
+        self.assertEqual(QuizSession.objects.count(), 1)
+        self.assertAlmostEqual(response.context['seconds_left'], 240, delta=2)
+
+    def test_submission_in_time_closes_the_session(self):
+        """Test that a submission within the grace period is graded from the session's start."""
+        self.client.get(self.url)
+        session = QuizSession.objects.get()
+        self.expire(seconds_ago=5)
+        response = self.client.post(self.url, {"selected_option_1": "A", "selected_option_2": "B"})
+        self.assertTemplateUsed(response, 'participation/result.html')
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(participant.score, 100.0)
+        self.assertEqual(participant.start_time, session.started_at)
+        self.assertFalse(QuizSession.objects.exists())
+
+    def test_overdue_submission_is_not_graded(self):
+        """Test that answers arriving after the grace period are discarded and the attempt finalized."""
+        self.client.get(self.url)
+        self.expire(seconds_ago=settings.PARTICIPATION_SUBMIT_GRACE + 5)
+        response = self.client.post(self.url, {"selected_option_1": "A", "selected_option_2": "B"})
+        self.assertRedirects(response, reverse('quiz_home'))
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(participant.score, 0.0)
+        self.assertFalse(participant.responses.exists())
+        self.assertFalse(QuizSession.objects.exists())
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).total_participants, 1)
+
+    def test_sweeper_finalizes_only_overdue_sessions(self):
+        """Test that expire_sessions finalizes overdue sessions at their deadline and keeps running ones."""
+        self.client.get(self.url)
+        other = User.objects.create_user(username="running", email="running@example.com", password="password123")
+        QuizSession.start(other, self.quiz)
+        self.expire(seconds_ago=settings.PARTICIPATION_SUBMIT_GRACE + 5)
+        deadline = QuizSession.objects.get(user=self.user).deadline
+
+        call_command('expire_sessions', '--once', stdout=StringIO())
+
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual((participant.score, participant.end_time), (0.0, deadline))
+        self.assertEqual(list(QuizSession.objects.values_list('user', flat=True)), [other.pk])
+        self.assertEqual(self.client.get(self.url).status_code, 302)  # already participated
+
+    def test_sweeper_skips_sessions_that_keep_failing(self):
+        """Test that a session failing on every sweep does not keep later sessions from expiring."""
+        other = User.objects.create_user(username="later", email="later@example.com", password="password123")
+        failing = QuizSession.start(self.user, self.quiz)
+        later = QuizSession.start(other, self.quiz)
+        QuizSession.objects.filter(pk=failing.pk).update(deadline=now() - timedelta(hours=1))
+        QuizSession.objects.filter(pk=later.pk).update(deadline=now() - timedelta(minutes=30))
+
+        def finalize(session, answer_keys=None):
+            if session.pk == failing.pk:
+                raise RuntimeError("broken session")
+            return finalize_session(session, answer_keys)
+
+        out = StringIO()
+        with mock.patch('participation.submissions.finalize_session', side_effect=finalize), \
+                self.assertLogs('participation.submissions', 'ERROR'):
+            call_command('expire_sessions', '--once', '--batch-size', '1', stdout=out)
+
+        self.assertIn("finalized 0, failed 1", out.getvalue())
+        self.assertIn("finalized 1, failed 0", out.getvalue())
+        self.assertEqual(list(Participant.objects.values_list('user', flat=True)), [other.pk])
+        self.assertEqual(list(QuizSession.objects.values_list('pk', flat=True)), [failing.pk])
+
+    def test_submission_without_session_is_not_graded(self):
+        """Test that answers posted before the questions were sent start the quiz instead."""
+        response = self.client.post(self.url, {"selected_option_1": "A", "selected_option_2": "B"})
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertFalse(Participant.objects.exists())
+
+    def test_finalize_session_loses_to_a_submission(self):
+        """Test that a session already submitted is not finalized again."""
+        self.client.get(self.url)
+        session = QuizSession.objects.get()
+        self.client.post(self.url, {"selected_option_1": "A"})
+        with transaction.atomic():
+            self.assertFalse(finalize_session(session))
+        self.assertEqual(Participant.objects.get().score, 50.0)
+
+
+class ParticipationQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    Showing and submitting a quiz are O(1) in the number of questions.
+    """
+
+    def setUp(self):
+        self.quiz = Quiz.objects.create(title="Budget Quiz", quiz_type=Quiz.PUBLIC, duration=timedelta(minutes=10))
+        self.users = 0
+
+    def grow(self, size):
+        for no in range(self.quiz.questions.count() + 1, size + 1):
+            Question.objects.create(quiz=self.quiz, question_no=no, text=f"Question {no}", option_a="a",
+                                    option_b="b", option_c="c", option_d="d", correct_option='A')
+        # every request comes from a user who has not taken the quiz yet
+        self.users += 1
+        self.client.force_login(User.objects.create_user(
+            username=f'taker{self.users}', email=f'taker{self.users}@example.com', password='pass'
+        ))
+
+    def test_participate(self):
+        url = reverse('participate', args=[self.quiz.quiz_id])
+        self.assertQueryBudget(lambda: self.client.get(url), budget=9, grow=self.grow)  # 4 start the session
+
+    def test_submit_quiz(self):
+        url = reverse('participate', args=[self.quiz.quiz_id])
+        answers = {f'selected_option_{no}': 'A' for no in range(1, max(self.budget_sizes) + 1)}
+
+        def grow(size):
+            self.grow(size)
+            self.client.get(url)  # submissions need a started session
+
+        self.assertQueryBudget(lambda: self.client.post(url, answers), budget=35, grow=grow)
@@ -13,6 +13,10 @@ URL Patterns:
 2. `<uuid:quiz_id>/quiz_info/`:
     - View: `quiz_info`
     - Purpose: Displays detailed information about a specific quiz, such as its description, duration, and quiz statistics.
+
+3. `result/<uuid:participant_id>/`:
+    - View: `submission_result`
+    - Purpose: Displays the result of a queued submission, or a waiting page polling its status until it is graded.
 """
 from django.urls import path
 from . import views
@@ -20,5 +24,6 @@ from . import views
 urlpatterns = [
     path('<uuid:quiz_id>/participate/', views.participate, name='participate'),
     path('<uuid:quiz_id>/quiz_info/', views.quiz_info, name='quiz_info'),  # Quiz info URL
+    path('result/<uuid:participant_id>/', views.submission_result, name='submission_result'),
     
 ]
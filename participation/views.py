@@ -2,8 +2,13 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils.timezone import now
-from quiz.models import Quiz, Question, QuizStats
-from .models import Participant, Response
+from django.db import transaction
+from django.conf import settings
+from django.http import JsonResponse
+from quiz.models import Quiz, QuizStats
+from quiz.question_sets import get_question_set
+from .models import Participant, QueuedSubmission, QuizSession
+from .submissions import answer_key_for, enqueue_submission, finalize_session, record_submission
 
 @login_required
 def participate(request, quiz_id):
@@ -24,7 +29,10 @@ def participate(request, quiz_id):
 
     # Ensure the quiz is active
     if not quiz.is_active():
-        messages.error(request, "This quiz has expired.")
+        if quiz.current_status() == Quiz.SCHEDULED:
+            messages.error(request, "This quiz has not started yet.")
+        else:
+            messages.error(request, "This quiz has expired.")
         return redirect('quiz_home')
 
     # Check if the user has already participated
@@ -49,13 +57,21 @@ def participate(request, quiz_id):
     if request.method == 'POST' and 'password' not in request.POST:
         return submit_quiz(request, quiz)
 
-    questions = quiz.questions.all()
-    duration_in_seconds = int(quiz.duration.total_seconds())
+    # The clock starts when the questions are sent; reloading the page keeps the deadline
+    session = QuizSession.start(request.user, quiz)
+    if session.is_overdue():
+        with transaction.atomic():
+            finalize_session(session)
+        messages.error(request, "Your time for this quiz has run out.")
+        return redirect('quiz_home')
+
+    question_set = get_question_set(quiz.quiz_id)
 
     return render(request, 'participation/participate.html', {
         'quiz': quiz,
-        'questions': questions,
-        'duration_in_seconds': duration_in_seconds,
+        'question_set': question_set,
+        'seconds_left': session.seconds_left(),
+        'submit_jitter': settings.PARTICIPATION_SUBMIT_JITTER,
     })
 
 
@@ -66,6 +82,12 @@ def submit_quiz(request, quiz):
     a participant record, saves the responses, calculates the raw and percentage score, and updates
     quiz statistics.
 
+    The submission is checked against the deadline of the user's quiz session with one
+    indexed lookup. An overdue submission is not graded; the session is finalized without
+    answers instead, as the ``expire_sessions`` sweeper would. A submission without a
+    session is not graded either: the questions were never sent, or the attempt is already
+    over, so the user is sent back to the participation page, which starts the clock.
+
     Args:
         request: The HTTP request object.
         quiz: The quiz object that the user is participating in.
@@ -75,56 +97,96 @@ def submit_quiz(request, quiz):
         and quiz statistics.
     """
     user = request.user
-    participant, created = Participant.objects.get_or_create(
-        user=user, quiz=quiz, defaults={"start_time": now()}
-    )
-
-    # Prevent duplicate submissions
-    if not created and participant.end_time:
-        messages.error(request, "You have already submitted this quiz.")
+    submitted_at = now()
+    session = QuizSession.objects.filter(user=user, quiz=quiz).first()
+    if session is None:
+        messages.error(request, "Your quiz attempt has not started; please start the quiz again.")
+        return redirect('participate', quiz_id=quiz.quiz_id)
+    if session.is_overdue(submitted_at):
+        with transaction.atomic():
+            finalize_session(session)
+        messages.error(request, "Your time for this quiz ran out before the answers arrived.")
         return redirect('quiz_home')
 
-    # Calculate raw score and responses
-    questions = quiz.questions.all()
-    total_questions = questions.count()
-    raw_score = 0
-    responses = []
-
-    for question in questions:
-        selected_option = request.POST.get(f"selected_option_{question.question_no}")
-        is_correct = selected_option == question.correct_option
-        if is_correct:
-            raw_score += 1  # Increment raw score for correct answers
-        responses.append(Response(
-            participant=participant,
-            question=question,
-            selected_option=selected_option,
-            is_correct=is_correct
-        ))
-
-    # Save responses and update participant score
-    Response.objects.bulk_create(responses)
-    percentage_score = (raw_score / total_questions) * 100  # Calculate score as a percentage
-    participant.score = percentage_score
-    participant.end_time = now()
-    participant.save()
-
-    # Update quiz stats
-    quiz_stats, _ = QuizStats.objects.get_or_create(quiz=quiz)
-    all_scores = quiz.participants.values_list('score', flat=True)
-    quiz_stats.update_stats(all_scores)
+    with transaction.atomic():
+        participant, created = Participant.objects.get_or_create(
+            user=user, quiz=quiz, defaults={"start_time": session.started_at}
+        )
+
+        # Prevent duplicate submissions
+        if not created and participant.end_time:
+            messages.error(request, "You have already submitted this quiz.")
+            return redirect('quiz_home')
+
+        # The attempt is over either way; a concurrent sweep cannot finalize it any more
+        session.delete()
+
+        answer_key = answer_key_for(quiz.quiz_id)
+        selected_options = answer_key.answers_from_post(request.POST)
+
+        # In queued mode only store the answers; a process_submissions worker grades them
+        if settings.PARTICIPATION_ASYNC_SUBMISSIONS:
+            if not enqueue_submission(participant, answer_key, selected_options):
+                messages.error(request, "You have already submitted this quiz.")
+                return redirect('quiz_home')
+            return redirect('submission_result', participant_id=participant.participant_id)
+
+        # Grade the submission against the cached answer key and save it
+        grade, quiz_stats = record_submission(participant, answer_key, selected_options, finished_at=submitted_at)
 
     # Render the result page
     return render(request, 'participation/result.html', {
         "quiz": quiz,
-        "raw_score": raw_score,  # Raw score
-        "percentage_score": percentage_score,  # Percentage score
-        "total_questions": total_questions,
+        "raw_score": grade.raw_score,  # Raw score
+        "percentage_score": grade.percentage,  # Percentage score
+        "total_questions": grade.total_questions,
         "participant": participant,
         "quiz_stats": quiz_stats,
     })
 
 
+@login_required
+def submission_result(request, participant_id):
+    """
+    Shows the result of a queued submission once a worker has graded it.
+
+    Until then a waiting page is rendered that polls this view with ``?format=json``,
+    which answers with the submission's status.
+
+    Args:
+        request: The HTTP request object.
+        participant_id: The unique identifier of the submitting participant.
+
+    Returns:
+        The result page, the waiting page, or a JSON status of ``pending``, ``failed`` or ``done``.
+    """
+    participant = get_object_or_404(
+        Participant.objects.select_related('quiz'), participant_id=participant_id, user=request.user
+    )
+    if participant.end_time:
+        status = 'done'
+    else:
+        queued = QueuedSubmission.objects.filter(participant=participant).values_list('status', flat=True).first()
+        status = 'failed' if queued == QueuedSubmission.FAILED else 'pending'
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'status': status})
+    if status != 'done':
+        return render(request, 'participation/submission_pending.html', {
+            'quiz': participant.quiz,
+            'status': status,
+        })
+
+    return render(request, 'participation/result.html', {
+        "quiz": participant.quiz,
+        "raw_score": participant.correct_count(),
+        "percentage_score": participant.score,
+        "total_questions": len(get_question_set(participant.quiz_id)),
+        "participant": participant,
+        "quiz_stats": QuizStats.objects.filter(quiz=participant.quiz).first(),
+    })
+
+
 @login_required
 def quiz_info(request, quiz_id):
     """
@@ -1,7 +1,30 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import Quiz, Question, QuizStats
 
+
+@admin.register(Quiz)
+class QuizAdmin(admin.ModelAdmin):
+    actions = ['regrade']
+    list_filter = ['status', 'quiz_type']
+    readonly_fields = ['status']  # set from the start and expiry dates
+
+    @admin.action(description="Re-grade submissions of the selected quizzes")
+    def regrade(self, request, queryset):
+        """
+        Grades the stored responses of the selected quizzes again after an answer-key correction.
+        """
+        from participation.regrade import regrade_quiz  # avoid circular import
+
+        for quiz in queryset:
+            summary = regrade_quiz(quiz)
+            self.message_user(
+                request,
+                f"{quiz.title}: re-graded {summary.participants} participant(s), "
+                f"{summary.scores_changed} score(s) changed.",
+                messages.SUCCESS,
+            )
+
+
 # register models
-admin.site.register(Quiz)
 admin.site.register(Question)
 admin.site.register(QuizStats)
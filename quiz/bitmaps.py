@@ -0,0 +1,187 @@
+"""
+Compressed bitmaps of quiz numbers for the tag index.
+
+A ``Bitmap`` splits the numbers it holds into chunks of 65536 by their high
+bits, in the manner of Roaring bitmaps. A chunk with few members keeps their
+low bits as a sorted ``array('H')``, two bytes per member; a chunk with more
+than ``ARRAY_LIMIT`` members becomes a 65536-bit Python ``int``. Set operations
+work chunk by chunk and only on the chunks both sides have, so a rare tag costs
+little memory and little time however many quizzes there are in total.
+"""
+import bisect
+from array import array
+from collections import defaultdict
+
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+ARRAY_LIMIT = 1024  # members of a chunk above which it is stored as a bitmap
+BIT_TEST_LIMIT = 8  # array members tested one by one against a bitmap rather than converted
+
+
+def _int(container):
+    if isinstance(container, int):
+        return container
+    if not container:
+        return 0
+    bits = bytearray(max(container) // 8 + 1)
+    for low in container:
+        bits[low >> 3] |= 1 << (low & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _compact(lows):
+    """
+    Return the container of a chunk's low bits: a sorted array or, past ``ARRAY_LIMIT``, a bitmap.
+    """
+    lows = sorted(lows)
+    return array('H', lows) if len(lows) <= ARRAY_LIMIT else _int(lows)
+
+
+def _intersect(x, y):
+    if isinstance(x, int) and isinstance(y, int):
+        return x & y
+    if isinstance(x, int):
+        x, y = y, x
+    if isinstance(y, int):
+        if len(x) <= BIT_TEST_LIMIT:
+            return array('H', [low for low in x if y >> low & 1])
+        return _int(x) & y
+    return array('H', sorted(set(x).intersection(y)))
+
+
+def _union(x, y):
+    if isinstance(x, int) or isinstance(y, int):
+        return _int(x) | _int(y)
+    return _compact(set(x).union(y))
+
+
+def _difference(x, y):
+    if isinstance(x, int):
+        return x & ~_int(y)
+    if isinstance(y, int):
+        if len(x) <= BIT_TEST_LIMIT:
+            return array('H', [low for low in x if not y >> low & 1])
+        return _int(x) & ~y
+    return array('H', sorted(set(x).difference(y)))
+
+
+class Bitmap:
+    """
+    A compressed set of non-negative integers.
+
+    Supports ``&``, ``|`` and ``-`` between bitmaps, which return new bitmaps,
+    and ``add`` and ``discard``, which change the bitmap in place.
+
+    Attributes:
+        chunks (dict): The container of each chunk number with members.
+    """
+    __slots__ = ('chunks',)
+
+    def __init__(self, chunks=None):
+        self.chunks = chunks if chunks is not None else {}
+
+    @classmethod
+    def of(cls, numbers):
+        """
+        Return the bitmap of an iterable of numbers.
+        """
+        lows = defaultdict(list)
+        for number in numbers:
+            lows[number >> CHUNK_BITS].append(number & CHUNK_MASK)
+        return cls({chunk: _compact(members) for chunk, members in lows.items()})
+
+    @classmethod
+    def first(cls, count):
+        """
+        Return the bitmap of the numbers from 0 up to, but excluding, ``count``.
+        """
+        full, rest = divmod(count, 1 << CHUNK_BITS)
+        chunks = {chunk: (1 << (1 << CHUNK_BITS)) - 1 for chunk in range(full)}
+        if rest:
+            chunks[full] = (1 << rest) - 1
+        return cls(chunks)
+
+    def __bool__(self):
+        return bool(self.chunks)
+
+    def __len__(self):
+        return sum(
+            container.bit_count() if isinstance(container, int) else len(container)
+            for container in self.chunks.values()
+        )
+
+    def __contains__(self, number):
+        container = self.chunks.get(number >> CHUNK_BITS)
+        if container is None:
+            return False
+        low = number & CHUNK_MASK
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        position = bisect.bisect_left(container, low)
+        return position < len(container) and container[position] == low
+
+    def _combine(self, other, chunk_numbers, operation):
+        chunks = {}
+        for chunk in chunk_numbers:
+            x, y = self.chunks.get(chunk), other.chunks.get(chunk)
+            container = x if y is None else y if x is None else operation(x, y)
+            if container:
+                chunks[chunk] = container
+        return Bitmap(chunks)
+
+    def __and__(self, other):
+        return self._combine(other, self.chunks.keys() & other.chunks.keys(), _intersect)
+
+    def __or__(self, other):
+        return self._combine(other, self.chunks.keys() | other.chunks.keys(), _union)
+
+    def __sub__(self, other):
+        return self._combine(other, self.chunks.keys(), _difference)
+
+    def add(self, number):
+        chunk, low = number >> CHUNK_BITS, number & CHUNK_MASK
+        container = self.chunks.get(chunk)
+        if container is None:
+            self.chunks[chunk] = array('H', [low])
+        elif isinstance(container, int):
+            self.chunks[chunk] = container | 1 << low
+        elif number not in self:
+            bisect.insort(container, low)
+            if len(container) > ARRAY_LIMIT:
+                self.chunks[chunk] = _int(container)
+
+    def discard(self, number):
+        chunk, low = number >> CHUNK_BITS, number & CHUNK_MASK
+        container = self.chunks.get(chunk)
+        if container is None or number not in self:
+            return
+        if isinstance(container, int):
+            container &= ~(1 << low)
+        else:
+            del container[bisect.bisect_left(container, low)]
+        if container:
+            self.chunks[chunk] = container
+        else:
+            del self.chunks[chunk]
+
+    def descending(self, below=None):
+        """
+        Yield the members from the largest down, only those less than ``below`` if given.
+        """
+        for chunk in sorted(self.chunks, reverse=True):
+            base = chunk << CHUNK_BITS
+            if below is not None and base >= below:
+                continue
+            container = self.chunks[chunk]
+            limit = below - base if below is not None and below - base <= CHUNK_MASK else None
+            if isinstance(container, int):
+                if limit is not None:
+                    container &= (1 << limit) - 1
+                while container:
+                    top = container.bit_length() - 1
+                    yield base + top
+                    container ^= 1 << top
+            else:
+                end = len(container) if limit is None else bisect.bisect_left(container, limit)
+                for position in range(end - 1, -1, -1):
+                    yield base + container[position]
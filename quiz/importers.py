@@ -0,0 +1,225 @@
+"""
+Bulk ingestion of quiz questions.
+
+Questions are validated as a batch and written with ``bulk_create`` so that a
+question bank costs a handful of INSERTs instead of one round-trip per question.
+CSV and JSON sources are parsed incrementally, one row at a time, and written in
+fixed-size chunks so that large files are never held in memory as a whole.
+"""
+import csv
+import io
+import json
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from .models import Question
+from .question_sets import invalidate_question_set
+
+QUESTION_FIELDS = ('text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_option')
+OPTION_MAX_LENGTH = Question._meta.get_field('option_a').max_length
+CORRECT_OPTIONS = ('A', 'B', 'C', 'D')
+DEFAULT_CHUNK_SIZE = 500
+JSON_READ_SIZE = 64 * 1024
+JSON_MAX_OBJECT_SIZE = 1024 * 1024
+
+
+def clean_question_row(row, row_no):
+    """
+    Validate one question row and return its cleaned field values.
+
+    Args:
+        row (dict): Raw values keyed by the names in ``QUESTION_FIELDS``.
+        row_no (int): Position of the row in its source, used in error messages.
+
+    Returns:
+        dict: The stripped field values with an upper-cased ``correct_option``.
+
+    Raises:
+        ValidationError: If a field is missing, empty, too long or invalid.
+    """
+    if not isinstance(row, dict):
+        raise ValidationError(f"Row {row_no}: expected an object with the question fields.")
+    cleaned = {}
+    for field in QUESTION_FIELDS:
+        value = row.get(field)
+        value = '' if value is None else str(value).strip()
+        if not value:
+            raise ValidationError(f"Row {row_no}: '{field}' is required.")
+        if field.startswith('option_') and len(value) > OPTION_MAX_LENGTH:
+            raise ValidationError(f"Row {row_no}: '{field}' is longer than {OPTION_MAX_LENGTH} characters.")
+        cleaned[field] = value
+    cleaned['correct_option'] = cleaned['correct_option'].upper()
+    if cleaned['correct_option'] not in CORRECT_OPTIONS:
+        raise ValidationError(f"Row {row_no}: 'correct_option' must be one of A, B, C or D.")
+    return cleaned
+
+
+def next_question_no(quiz):
+    """
+    Return the number the next question appended to ``quiz`` should get.
+    """
+    return (quiz.questions.aggregate(last=Max('question_no'))['last'] or 0) + 1
+
+
+def bulk_create_questions(quiz, rows, start_no=None, first_row_no=1):
+    """
+    Validate a whole batch of question rows, then insert it with one ``bulk_create``.
+
+    Nothing is written if any row is invalid.
+
+    Args:
+        quiz (Quiz): The quiz the questions belong to.
+        rows (iterable of dict): Raw question rows.
+        start_no (int, optional): Number of the first question. Defaults to appending
+            after the quiz's current last question.
+        first_row_no (int): Row number of the first row, used in error messages.
+
+    Returns:
+        list of Question: The created questions.
+
+    Raises:
+        ValidationError: With one message per invalid row.
+    """
+    cleaned, errors = [], []
+    for row_no, row in enumerate(rows, start=first_row_no):
+        try:
+            cleaned.append(clean_question_row(row, row_no))
+        except ValidationError as error:
+            errors.extend(error.messages)
+    if errors:
+        raise ValidationError(errors)
+
+    from search.indexing import index_objects  # avoid circular import
+
+    with transaction.atomic():
+        if start_no is None:
+            start_no = next_question_no(quiz)
+        questions = Question.objects.bulk_create([
+            Question(quiz=quiz, question_no=start_no + offset, **values)
+            for offset, values in enumerate(cleaned)
+        ])
+        # bulk_create sends no post_save signals
+        invalidate_question_set(quiz.quiz_id)
+        index_objects(questions)
+    return questions
+
+
+def iter_csv_rows(stream):
+    """
+    Yield question rows from a CSV text stream with a header line.
+
+    Args:
+        stream (file): A text stream, read one line at a time.
+    """
+    reader = csv.DictReader(stream)
+    try:
+        missing = set(QUESTION_FIELDS) - set(reader.fieldnames or ())
+        if missing:
+            raise ValidationError(f"CSV header is missing: {', '.join(sorted(missing))}.")
+        yield from reader
+    except csv.Error as error:
+        raise ValidationError(f"The CSV file is malformed: {error}.")
+
+
+def iter_json_rows(stream, read_size=JSON_READ_SIZE):
+    """
+    Yield question objects from a JSON text stream without loading it whole.
+
+    Accepts a top-level array of objects as well as JSON Lines (one object per
+    line). The stream is read in ``read_size`` blocks and each object is decoded as
+    soon as it is complete.
+
+    Args:
+        stream (file): A text stream.
+        read_size (int): Number of characters read per block.
+
+    Raises:
+        ValidationError: If the stream is not valid JSON.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    in_array = None
+    while True:
+        # Skip separators between values
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if in_array is None and position < len(buffer):
+            in_array = buffer[position] == '['
+            if in_array:
+                position += 1
+                continue
+        if in_array and position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise ValidationError("The JSON file is malformed or truncated.")
+                if in_array:
+                    raise ValidationError("The JSON array is not closed.")
+                return
+            if len(buffer) - position > JSON_MAX_OBJECT_SIZE:
+                raise ValidationError("A JSON row is malformed or larger than 1 MiB.")
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        # A number at the end of the buffer may continue in the next block
+        if end == len(buffer) and not eof and not isinstance(value, (dict, list)):
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        yield value
+
+
+def open_text(fileobj):
+    """
+    Wrap a binary upload or file in a UTF-8 text stream (a leading BOM is ignored).
+    """
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+
+
+def import_questions(quiz, fileobj, file_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream question rows from a CSV or JSON file into ``quiz``.
+
+    Rows are parsed incrementally and inserted ``chunk_size`` at a time. The whole
+    import runs in one transaction, so an invalid row anywhere in the file leaves
+    the quiz unchanged.
+
+    Args:
+        quiz (Quiz): The quiz the questions are appended to.
+        fileobj (file): A binary or text file object.
+        file_format (str): ``'csv'``, ``'json'`` or ``'jsonl'``.
+        chunk_size (int): Number of rows validated and inserted per ``bulk_create``.
+
+    Returns:
+        int: The number of imported questions.
+
+    Raises:
+        ValidationError: If the format is unknown or a row is invalid.
+    """
+    parsers = {'csv': iter_csv_rows, 'json': iter_json_rows, 'jsonl': iter_json_rows}
+    if file_format not in parsers:
+        raise ValidationError(f"Unsupported import format '{file_format}'. Use csv or json.")
+    rows = parsers[file_format](open_text(fileobj))
+
+    imported = 0
+    with transaction.atomic():
+        question_no = next_question_no(quiz)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            bulk_create_questions(quiz, chunk, start_no=question_no, first_row_no=imported + 1)
+            question_no += len(chunk)
+            imported += len(chunk)
+    return imported
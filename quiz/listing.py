@@ -0,0 +1,139 @@
+"""
+Paginated, cached quiz listing for the quiz home page.
+
+The quiz list is read one keyset page at a time with its tags and creator loaded
+up front, and the rendered fragment of every filter combination is cached. All
+cached fragments share a version number that is bumped whenever a quiz, its
+status or a tag changes, which invalidates them at once without having to
+enumerate their keys.
+"""
+import hashlib
+import uuid
+from datetime import datetime
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from core.models import Tag
+from .models import Quiz
+from .schedule import quiz_statuses_changed
+
+QUIZ_PAGE_SIZE = 20
+QUIZ_LIST_CACHE_TIMEOUT = 300  # seconds
+VERSION_KEY = 'quiz_list:version'
+
+
+def listing_version():
+    """
+    Return the current version of the cached quiz listing.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def invalidate_listing():
+    """
+    Invalidate every cached quiz list fragment.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def fragment_cache_key(*parts):
+    """
+    Build the cache key of a quiz list fragment for a filter combination.
+
+    The parts are hashed, since free-text filters may contain characters that
+    are not valid in memcached keys.
+    """
+    filters = ':'.join(str(part or '') for part in parts)
+    return f"quiz_list:{listing_version()}:{hashlib.md5(filters.encode()).hexdigest()}"
+
+
+def encode_cursor(quiz):
+    return f"{quiz.created_at.isoformat()}_{quiz.quiz_id}"
+
+
+def decode_cursor(cursor):
+    """
+    Split a page cursor into its ``created_at`` and ``quiz_id`` parts.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    created_at, quiz_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(created_at), uuid.UUID(quiz_id)
+
+
+class QuizPage:
+    """
+    A lazily evaluated keyset page of quizzes ordered newest first.
+
+    Nothing is queried until the page is iterated or its cursor is requested, so
+    the page can be passed to a template whose output may come from the cache.
+
+    Attributes:
+        queryset (QuerySet): The filtered quizzes.
+        cursor (str, optional): The cursor of the previous page's last quiz.
+        size (int): The number of quizzes per page.
+    """
+
+    def __init__(self, queryset, cursor=None, size=QUIZ_PAGE_SIZE):
+        if cursor:
+            created_at, quiz_id = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, quiz_id__lt=quiz_id)
+            )
+        self.queryset = (
+            queryset.order_by('-created_at', '-quiz_id')
+            .select_related('created_by')
+            .prefetch_related('tags')
+        )
+        self.cursor = cursor
+        self.size = size
+        self._quizzes = None
+
+    def _load(self):
+        # One extra row tells whether a next page exists
+        if self._quizzes is None:
+            self._quizzes = list(self.queryset[:self.size + 1])
+        return self._quizzes
+
+    @property
+    def quizzes(self):
+        return self._load()[:self.size]
+
+    def __iter__(self):
+        return iter(self.quizzes)
+
+    def __len__(self):
+        return len(self.quizzes)
+
+    def __contains__(self, quiz):
+        return quiz in self.quizzes
+
+    @property
+    def has_next(self):
+        return len(self._load()) > self.size
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.quizzes[-1]) if self.has_next else None
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Quiz.tags.through)
+@receiver(quiz_statuses_changed, sender=Quiz)
+def invalidate_listing_on_change(sender, **kwargs):
+    """
+    Invalidates the cached quiz listing whenever a quiz, its status, a tag or a quiz's tags change.
+    """
+    invalidate_listing()
@@ -0,0 +1,42 @@
+"""
+Scheduler that moves quizzes between their statuses at their start and expiry dates.
+
+Quizzes due to start or expire are moved in batches, one transaction per batch.
+Between batches the command sleeps until the next start or expiry date, or for
+at most ``--interval`` seconds, so that quizzes created or edited in the
+meantime are picked up.
+
+Usage:
+    python manage.py advance_quiz_status [--batch-size 500] [--interval 60] [--once]
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from quiz.schedule import advance_quiz_statuses, next_status_change
+
+
+class Command(BaseCommand):
+    help = "Move quizzes to the scheduled, active or expired status at their start and expiry dates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Quizzes moved per transaction.")
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help="Most seconds to wait for the next start or expiry date.")
+        parser.add_argument('--once', action='store_true', help="Exit once no quiz is due.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                moved = advance_quiz_statuses(batch_size=options['batch_size'])
+                for status, quiz_ids in moved.items():
+                    self.stdout.write(f"{status} {len(quiz_ids)}")
+                if all(len(quiz_ids) < options['batch_size'] for quiz_ids in moved.values()):
+                    if options['once']:
+                        break
+                    wait = options['interval']
+                    upcoming = next_status_change()
+                    if upcoming is not None:
+                        wait = min(wait, max((upcoming - now()).total_seconds(), 0.0))
+                    time.sleep(wait)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,41 @@
+"""
+Management command that streams questions from a CSV or JSON file into a quiz.
+
+CSV files need a header with the columns text, option_a, option_b, option_c,
+option_d and correct_option. JSON files hold either an array of objects with
+those keys or one object per line.
+
+Usage:
+    python manage.py import_questions <quiz_id> <path> [--format csv|json] [--chunk-size 500]
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from quiz.importers import DEFAULT_CHUNK_SIZE, import_questions
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Import questions for a quiz from a CSV or JSON file, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', help="The quiz the questions are appended to.")
+        parser.add_argument('path', help="Path of the CSV or JSON file.")
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows inserted per batch.")
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(quiz_id=options['quiz_id'])
+        except (Quiz.DoesNotExist, ValidationError):
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist.")
+
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                imported = import_questions(quiz, fileobj, file_format, chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except ValidationError as e:
+            raise CommandError("\n".join(e.messages))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} questions into \"{quiz.title}\"."))
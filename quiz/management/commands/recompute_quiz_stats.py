@@ -0,0 +1,34 @@
+"""
+Management command that rebuilds the running ``QuizStats`` aggregates from the
+``Participant`` rows.
+
+Usage:
+    python manage.py recompute_quiz_stats              # every quiz
+    python manage.py recompute_quiz_stats <quiz_id>... # selected quizzes
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from quiz.models import Quiz, QuizStats
+
+
+class Command(BaseCommand):
+    help = "Rebuild quiz statistics from participant scores when the running aggregates drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', help="Only rebuild the stats of these quizzes.")
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.all()
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(quiz_id__in=options['quiz_ids'])
+            if quizzes.count() != len(set(options['quiz_ids'])):
+                raise CommandError("One or more quiz ids do not exist.")
+
+        rebuilt = 0
+        for quiz_id in quizzes.values_list('quiz_id', flat=True).iterator():
+            with transaction.atomic():
+                stats, _ = QuizStats.objects.get_or_create(quiz_id=quiz_id)
+                stats.rebuild()
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {rebuilt} quiz(zes)."))
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import Count, ExpressionWrapper, F, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.conf import settings
 import uuid
+from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.contrib.auth.hashers import make_password, check_password
 from datetime import timedelta
@@ -20,14 +23,19 @@ class Quiz(models.Model):
         quiz_type (str): Type of quiz, either 'public' or 'private'.
         password (str, optional): Password required to access the quiz if it's private.
         duration (timedelta): Duration of the quiz in HH:MM:SS format.
+        start_date (datetime, optional): The date and time the quiz opens.
         expiry_date (datetime, optional): The expiry date and time of the quiz.
+        status (str): 'scheduled', 'active' or 'expired'; set on save and moved
+            at the start and expiry dates by the ``advance_quiz_status`` command.
         can_view_score_immediately (bool): Whether users can view their score immediately after completing the quiz.
         created_at (datetime): Timestamp when the quiz was created.
 
     Methods:
         save: Overridden save method to hash the password for private quizzes.
         check_password: Checks the given raw password against the hashed password for private quizzes.
-        is_active: Returns whether the quiz is active based on the expiry date.
+        current_status: Returns the status the quiz has at a given time.
+        is_active: Returns whether the quiz is active based on its start and expiry dates.
+        formatted_duration: The duration as an ``HH:MM:SS`` string, computed once per instance.
         __str__: Returns the title of the quiz when represented as a string.
     """
     
@@ -38,6 +46,16 @@ class Quiz(models.Model):
         (PUBLIC, 'Public'),
         (PRIVATE, 'Private'),
     ]
+
+    SCHEDULED = 'scheduled'
+    ACTIVE = 'active'
+    EXPIRED = 'expired'
+
+    STATUS_CHOICES = [
+        (SCHEDULED, 'Scheduled'),
+        (ACTIVE, 'Active'),
+        (EXPIRED, 'Expired'),
+    ]
     
     quiz_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="authored_quizzes", null=True)
@@ -49,19 +67,29 @@ class Quiz(models.Model):
     )
     password = models.CharField(max_length=50, blank=True, null=True)
     duration = models.DurationField(help_text="Duration in HH:MM:SS format")
+    start_date = models.DateTimeField(help_text="Quiz opening date and time", null=True, blank=True)
     expiry_date = models.DateTimeField(help_text="Quiz expiration date and time", null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=ACTIVE)
     can_view_score_immediately = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at'] # Order quizzes by creation date (latest first)
+        indexes = [
+            # Serve the quiz list filtered by type or by status ("available only") in its keyset order
+            models.Index(fields=['quiz_type', '-created_at', '-quiz_id'], name='quiz_type_listing_idx'),
+            models.Index(fields=['status', '-created_at', '-quiz_id'], name='quiz_status_listing_idx'),
+            # Find the quizzes due to start or expire without scanning the expired ones
+            models.Index(fields=['status', 'start_date'], name='quiz_status_start_idx'),
+            models.Index(fields=['status', 'expiry_date'], name='quiz_status_expiry_idx'),
+        ]
         
     def save(self, *args, **kwargs):
         """
         Overrides the default save method to hash the password for private quizzes.
 
         If the quiz is private and a password is provided, the password is hashed
-        before saving the model.
+        before saving the model. The status is set from the start and expiry dates.
 
         Args:
             ``*args``: Variable length argument list.
@@ -74,6 +102,8 @@ class Quiz(models.Model):
         # Hash password if it's private and password is set
         if self.quiz_type == Quiz.PRIVATE and self.password:
             self.password = make_password(self.password)
+
+        self.status = self.current_status()
         
         super().save(*args, **kwargs)  # Call the parent save method
 
@@ -90,15 +120,43 @@ class Quiz(models.Model):
         """     
         return check_password(raw_password, self.password)  # Check hashed password
         
+    def current_status(self, when=None):
+        """Return the status of the quiz at a given time from its start and expiry dates.
+
+        Args:
+            when (datetime, optional): The time; defaults to now.
+
+        Returns:
+            str: ``Quiz.SCHEDULED``, ``Quiz.ACTIVE`` or ``Quiz.EXPIRED``.
+        """
+        when = when or now()
+        if self.expiry_date is not None and when >= self.expiry_date:
+            return self.EXPIRED
+        if self.start_date is not None and when < self.start_date:
+            return self.SCHEDULED
+        return self.ACTIVE  # No dates set means always active
+
     def is_active(self):
-        """Check if the quiz is active (not expired).
+        """Check if the quiz is active (started and not expired).
+
+        Unlike the stored ``status``, which the scheduler moves periodically,
+        this is exact to the moment it is called.
         
         Returns:
-            bool: True if the quiz is active, False if expired. 
+            bool: True if the quiz is active, False if it has not started or has expired. 
         """
-        if self.expiry_date is None:
-            return True  # If no expiry date is set, the quiz is always active
-        return now() < self.expiry_date
+        return self.current_status() == self.ACTIVE
+
+    @cached_property
+    def formatted_duration(self):
+        """The duration of the quiz formatted as ``HH:MM:SS``.
+
+        Returns:
+            str: The formatted duration.
+        """
+        hours, remainder = divmod(int(self.duration.total_seconds()), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return f"{hours:02}:{minutes:02}:{seconds:02}"
     
     def __str__(self):
         """
@@ -144,6 +202,10 @@ class Question(models.Model):
 
     class Meta:
         ordering = ['question_no']
+        constraints = [
+            # Also the index the question set is read through, in question order
+            models.UniqueConstraint(fields=['quiz', 'question_no'], name='unique_question_no'),
+        ]
     
     def get_correct_option(self):
         """
@@ -161,23 +223,108 @@ class QuizStats(models.Model):
     """
     Stores statistics for a quiz, such as total participants, highest score, and average score.
 
+    The statistics are kept as running aggregates so that recording a new score is
+    a constant-time ``UPDATE`` instead of a rescan of every participant's score.
+
     Attributes:
         stats_id (UUID): Unique identifier for the stats entry.
         quiz (Quiz): The quiz this stats entry belongs to.
         total_participants (int): Total number of participants who attempted the quiz.
+        total_score (float): Sum of all recorded scores.
+        total_score_squared (float): Sum of the squares of all recorded scores.
         highest_score (float): The highest score achieved in the quiz.
+        lowest_score (float): The lowest score achieved in the quiz.
         average_score (float): The average score across all participants.
 
     Methods:
-        update_stats: Updates the statistics based on new participant scores.
+        record_score: Atomically folds a single new score into the running aggregates.
+        rebuild: Recomputes the aggregates from the quiz's finished participants.
+        update_stats: Updates the statistics based on a full list of participant scores.
         __str__: Returns a string representation of the quiz stats.
     """
     stats_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name="stats")
     total_participants = models.IntegerField(default=0)
+    total_score = models.FloatField(default=0.0)
+    total_score_squared = models.FloatField(default=0.0)
     highest_score = models.FloatField(null=True, blank=True)
+    lowest_score = models.FloatField(null=True, blank=True)
     average_score = models.FloatField(null=True, blank=True)
 
+    @property
+    def score_std_dev(self):
+        """
+        Population standard deviation of the recorded scores.
+
+        Returns:
+            float or None: The standard deviation, or None if no scores were recorded.
+        """
+        if not self.total_participants:
+            return None
+        mean = self.total_score / self.total_participants
+        variance = self.total_score_squared / self.total_participants - mean * mean
+        return max(variance, 0.0) ** 0.5
+
+    @classmethod
+    def record_score(cls, quiz, score):
+        """
+        Fold a newly submitted score into the quiz's running aggregates.
+
+        The aggregates are updated with a single ``F()`` expression ``UPDATE`` so
+        concurrent submissions never read-modify-write stale values. Call this
+        inside the submission transaction.
+
+        Args:
+            quiz (Quiz): The quiz the score belongs to.
+            score (float): The participant's percentage score.
+
+        Returns:
+            QuizStats: The refreshed stats entry.
+        """
+        stats, _ = cls.objects.get_or_create(quiz=quiz)
+        score = float(score)
+        cls.objects.filter(pk=stats.pk).update(
+            total_participants=F('total_participants') + 1,
+            total_score=F('total_score') + score,
+            total_score_squared=F('total_score_squared') + score * score,
+            highest_score=Greatest(Coalesce('highest_score', Value(score)), Value(score)),
+            lowest_score=Least(Coalesce('lowest_score', Value(score)), Value(score)),
+            average_score=ExpressionWrapper(
+                (F('total_score') + score) / (F('total_participants') + 1),
+                output_field=models.FloatField(),
+            ),
+        )
+        stats.refresh_from_db()
+        return stats
+
+    def rebuild(self):
+        """
+        Recompute the aggregates from the quiz's finished participants.
+
+        Used to repair the running aggregates if they drift from the
+        ``Participant`` rows (e.g. after manual edits or deletions).
+        """
+        from participation.models import Participant  # avoid circular import
+
+        aggregates = Participant.objects.filter(
+            quiz_id=self.quiz_id, end_time__isnull=False
+        ).aggregate(
+            count=Count('pk'),
+            total=Sum('score'),
+            total_squared=Sum(F('score') * F('score')),
+            highest=Max('score'),
+            lowest=Min('score'),
+        )
+        self.total_participants = aggregates['count']
+        self.total_score = aggregates['total'] or 0.0
+        self.total_score_squared = aggregates['total_squared'] or 0.0
+        self.highest_score = aggregates['highest']
+        self.lowest_score = aggregates['lowest']
+        self.average_score = (
+            self.total_score / self.total_participants if self.total_participants else None
+        )
+        self.save()
+
     def update_stats(self, scores):
         """
         Update stats based on new scores.
@@ -185,12 +332,16 @@ class QuizStats(models.Model):
         Args:
             scores (list of float): List of scores achieved by participants.
         """
+        scores = list(scores)
+        self.total_participants = len(scores)
+        self.total_score = sum(scores)
+        self.total_score_squared = sum(score * score for score in scores)
         if scores:
-            self.total_participants = len(scores)
             self.highest_score = max(scores)
-            self.average_score = sum(scores) / len(scores)
+            self.lowest_score = min(scores)
+            self.average_score = self.total_score / len(scores)
         else:
-            self.highest_score = self.average_score = None
+            self.highest_score = self.lowest_score = self.average_score = None
         self.save()
 
     def __str__(self):
@@ -201,4 +352,3 @@ class QuizStats(models.Model):
             str: A string representation of the quiz stats (e.g., "Stats for Quiz 1").
         """
         return f"Stats for {self.quiz.title}"
-    
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Versioned, immutable question-set cache for the quiz participation hot path.
+
+Starting and submitting a quiz both need the quiz's questions. Instead of
+reloading them from the database on every request, a ``QuestionSet`` is built
+once per quiz version and shared across worker processes through Django's cache
+framework, with a small LRU in front of it inside each process.
+
+Each quiz has a version token in the shared cache. Saving or deleting one of its
+questions (or bulk-creating questions through ``quiz.importers``) replaces the
+token, so every process stops using the old set on its next lookup.
+"""
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from .models import Question
+
+QUESTION_SET_TIMEOUT = 60 * 60  # seconds in the shared cache
+LOCAL_CACHE_SIZE = 128  # question sets kept per process
+
+AnswerKeyEntry = namedtuple('AnswerKeyEntry', ['question_no', 'question_id', 'correct_option'])
+
+
+class QuestionSet(namedtuple('QuestionSet', ['quiz_id', 'version', 'answer_key', 'html'])):
+    """
+    An immutable snapshot of a quiz's questions.
+
+    Attributes:
+        quiz_id (UUID): The quiz the questions belong to.
+        version (str): The version token the snapshot was built for.
+        answer_key (tuple of AnswerKeyEntry): ``(question_no, question_id, correct_option)``
+            per question, ordered by question number.
+        html (str): The rendered question list of the participation form.
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.answer_key)
+
+
+class _LRU:
+    """A small thread-safe LRU mapping used as the per-process cache."""
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+_local = _LRU(LOCAL_CACHE_SIZE)
+
+
+def _version_key(quiz_id):
+    return f'question_set:version:{quiz_id}'
+
+
+def current_version(quiz_id):
+    """
+    Return the version token of a quiz's question set, creating one if missing.
+    """
+    version = cache.get(_version_key(quiz_id))
+    if version is None:
+        cache.add(_version_key(quiz_id), uuid.uuid4().hex, timeout=None)
+        version = cache.get(_version_key(quiz_id))
+    return version
+
+
+def invalidate_question_set(quiz_id):
+    """
+    Retire the cached question set of a quiz in every process.
+
+    The version is replaced right away and again once the surrounding transaction
+    commits, so a set another process rebuilt from the not-yet-committed state is
+    retired as well.
+    """
+    def bump():
+        cache.set(_version_key(quiz_id), uuid.uuid4().hex, timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def build_question_set(quiz_id, version):
+    """
+    Load a quiz's questions from the database and snapshot them.
+    """
+    questions = list(Question.objects.filter(quiz_id=quiz_id).order_by('question_no'))
+    answer_key = tuple(
+        AnswerKeyEntry(question.question_no, question.question_id, question.correct_option)
+        for question in questions
+    )
+    html = render_to_string('quiz/question_list.html', {'questions': questions})
+    return QuestionSet(quiz_id, version, answer_key, html)
+
+
+def get_question_set(quiz_id):
+    """
+    Return the question set of a quiz, from the process LRU, the shared cache or the database.
+
+    Args:
+        quiz_id (UUID): The quiz whose questions are needed.
+
+    Returns:
+        QuestionSet: The current snapshot of the quiz's questions.
+    """
+    version = current_version(quiz_id)
+    local_key = (str(quiz_id), version)
+    question_set = _local.get(local_key)
+    if question_set is not None:
+        return question_set
+
+    shared_key = f'question_set:{quiz_id}:{version}'
+    question_set = cache.get(shared_key)
+    if question_set is None:
+        question_set = build_question_set(quiz_id, version)
+        cache.set(shared_key, question_set, QUESTION_SET_TIMEOUT)
+    _local.put(local_key, question_set)
+    return question_set
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_on_question_change(sender, instance, **kwargs):
+    """
+    Retires the quiz's cached question set whenever one of its questions changes.
+    """
+    invalidate_question_set(instance.quiz_id)
@@ -0,0 +1,63 @@
+"""
+Moving quizzes between their statuses at their start and expiry dates.
+
+A quiz's ``status`` is set when it is saved and then moved by
+``advance_quiz_statuses`` once its start or expiry date passes, which the
+``advance_quiz_status`` management command calls at every boundary. Listing
+the quizzes of a status is then an equality lookup on an index rather than a
+date comparison on every row.
+
+``UPDATE`` queries send no ``post_save`` signals, so every batch of moved
+quizzes is announced with the ``quiz_statuses_changed`` signal, on which the
+cached listings and the tag index are updated.
+"""
+from django.db import transaction
+from django.db.models import Min, Q
+from django.dispatch import Signal
+from django.utils.timezone import now
+from .models import Quiz
+
+# Sent with sender=Quiz, quiz_ids=[UUID, ...] and status after quizzes were moved to that status
+quiz_statuses_changed = Signal()
+
+
+def advance_quiz_statuses(when=None, batch_size=500):
+    """
+    Move up to ``batch_size`` quizzes of each kind whose start or expiry date passed, in one transaction.
+
+    Args:
+        when (datetime, optional): The time to move the quizzes to; defaults to now.
+        batch_size (int): The maximum number of quizzes started and of quizzes expired.
+
+    Returns:
+        dict: The ids of the moved quizzes by their new status.
+    """
+    when = when or now()
+    due = {
+        Quiz.EXPIRED: Quiz.objects.filter(status__in=[Quiz.SCHEDULED, Quiz.ACTIVE], expiry_date__lte=when),
+        # A quiz past both dates goes straight to expired
+        Quiz.ACTIVE: Quiz.objects.filter(status=Quiz.SCHEDULED, start_date__lte=when).filter(
+            Q(expiry_date__isnull=True) | Q(expiry_date__gt=when)
+        ),
+    }
+    moved = {}
+    with transaction.atomic():
+        for status, queryset in due.items():
+            quiz_ids = list(queryset.values_list('quiz_id', flat=True)[:batch_size])
+            if quiz_ids:
+                Quiz.objects.filter(quiz_id__in=quiz_ids).update(status=status)
+                quiz_statuses_changed.send(sender=Quiz, quiz_ids=quiz_ids, status=status)
+                moved[status] = quiz_ids
+    return moved
+
+
+def next_status_change():
+    """
+    Return the earliest start or expiry date still ahead of a quiz's status, or None.
+    """
+    dates = [
+        Quiz.objects.filter(status=Quiz.SCHEDULED).aggregate(date=Min('start_date'))['date'],
+        Quiz.objects.filter(status__in=[Quiz.SCHEDULED, Quiz.ACTIVE]).aggregate(date=Min('expiry_date'))['date'],
+    ]
+    dates = [date for date in dates if date is not None]
+    return min(dates) if dates else None
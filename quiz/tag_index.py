@@ -0,0 +1,505 @@
+"""
+In-memory bitmap index of quizzes by tag, quiz type and status.
+
+The quiz home filters ("python AND beginner NOT is:private") are evaluated
+without touching the database. Every process keeps a ``TagIndex``: quizzes are
+numbered in listing order, oldest first, and each tag, each quiz type and each
+quiz status is a compressed ``Bitmap`` over those numbers, so an
+expression is a few set operations. Reading the members of the result from the
+highest down yields the matching quizzes newest first, which is exactly one
+keyset page of the listing.
+
+The index also keeps a ``TagTrie`` of the tag names ranked by their quiz
+counts, which answers the tag autocompletion of the forms.
+
+Changes to quizzes, tags and quiz tags are applied to the index of the process
+that made them once their transaction commits, through the signal receivers
+below. A version number in the shared cache tells the other processes that
+their index is behind; they rebuild it on their next lookup. Writes that bypass
+the signals, such as ``bulk_create``, call ``invalidate_tag_index``. The status
+partitions follow the ``status`` column, which ``quiz.schedule`` moves.
+"""
+import bisect
+import functools
+import itertools
+import random
+import re
+import threading
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from core.models import Tag
+from core.tags import tags_created
+from .bitmaps import Bitmap
+from .listing import decode_cursor
+from .models import Quiz
+from .schedule import quiz_statuses_changed
+from .tag_trie import TOP_SIZE, TagTrie
+
+VERSION_KEY = 'tag_index:version'
+MAX_EXPRESSION_TOKENS = 64
+
+TOKEN_RE = re.compile(r'\(|\)|"[^"]*"|[^\s()"]+')
+OPERATORS = {'AND', 'OR', 'NOT'}
+# is:<name> terms of an expression, besides the quiz types
+PARTITIONS = {status for status, _ in Quiz.STATUS_CHOICES}
+
+
+def parse_expression(text):
+    """
+    Parse a boolean tag expression into a tree of tuples.
+
+    Terms are tag names, matched case-insensitively and quoted when they contain
+    spaces, or ``is:public``, ``is:private``, ``is:scheduled``, ``is:active`` and
+    ``is:expired``.
+    ``NOT`` binds tightest, then ``AND``, then ``OR``; terms written side by side
+    are ANDed, and parentheses group.
+
+    Args:
+        text (str): The expression, e.g. ``python AND beginner NOT is:private``.
+
+    Returns:
+        tuple: ``('tag', name)``, ``('is', name)``, ``('not', node)``,
+        ``('and', left, right)`` or ``('or', left, right)``.
+
+    Raises:
+        ValueError: If the expression is empty, too long or malformed.
+    """
+    return _parse(text.strip())
+
+
+@functools.lru_cache(maxsize=512)
+def _parse(text):
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        raise ValueError("Empty tag expression.")
+    if len(tokens) > MAX_EXPRESSION_TOKENS:
+        raise ValueError("Tag expression too long.")
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.position != len(tokens):
+        raise ValueError(f"Unexpected {tokens[parser.position]!r} in tag expression.")
+    return node
+
+
+class _Parser:
+    """A recursive-descent parser over the tokens of one expression."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Tag expression ends unexpectedly.")
+        self.position += 1
+        return token
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == 'OR':
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() not in (None, 'OR', ')'):
+            if self.peek() == 'AND':
+                self.take()
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() == 'NOT':
+            self.take()
+            return ('not', self.parse_not())
+        return self.parse_term()
+
+    def parse_term(self):
+        token = self.take()
+        if token == '(':
+            node = self.parse_or()
+            if self.take() != ')':
+                raise ValueError("Unbalanced parentheses in tag expression.")
+            return node
+        if token == ')' or token in OPERATORS:
+            raise ValueError(f"Unexpected {token!r} in tag expression.")
+        if token.startswith('"'):
+            return ('tag', token[1:-1].strip().lower())
+        if token.startswith('is:'):
+            name = token[3:].lower()
+            if name not in PARTITIONS and name not in dict(Quiz.QUIZ_TYPE_CHOICES):
+                raise ValueError(f"Unknown filter {token!r} in tag expression.")
+            return ('is', name)
+        return ('tag', token.lower())
+
+
+class TagIndex:
+    """
+    Bitmaps of quiz ordinals per tag, per quiz type and per quiz status.
+
+    Attributes:
+        version (int): The shared version the index is current with.
+        keys (list): ``(created_at, quiz_id)`` of every ordinal, ascending; the
+            entries of deleted quizzes stay behind so the order is kept.
+        ordinals (dict): The ordinal of each existing quiz id.
+        live (Bitmap): The existing quizzes.
+        tags (dict): Bitmap of the quizzes of each tag id.
+        types (dict): Bitmap of the quizzes of each quiz type.
+        statuses (dict): Bitmap of the quizzes of each status.
+        names (dict): The tag ids of each lower-cased tag name.
+        tag_names (dict): The lower-cased name of each tag id.
+        quiz_tags (dict): The tag ids of each ordinal, to clear its bits on change.
+        trie (TagTrie): The tag names by prefix, ranked by quiz count.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.keys = []
+        self.ordinals = {}
+        self.live = Bitmap()
+        self.tags = {}
+        self.types = {}
+        self.statuses = {}
+        self.names = defaultdict(set)
+        self.tag_names = {}
+        self.quiz_tags = defaultdict(set)
+        self.trie = TagTrie()
+
+    @classmethod
+    def build(cls, version):
+        """
+        Load the index from the database in three queries.
+        """
+        index = cls(version)
+        types, statuses = defaultdict(list), defaultdict(list)
+        quizzes = Quiz.objects.order_by('created_at', 'quiz_id').values_list(
+            'quiz_id', 'created_at', 'quiz_type', 'status'
+        )
+        for ordinal, (quiz_id, created_at, quiz_type, status) in enumerate(quizzes.iterator(chunk_size=10000)):
+            index.keys.append((created_at, quiz_id))
+            index.ordinals[quiz_id] = ordinal
+            types[quiz_type].append(ordinal)
+            statuses[status].append(ordinal)
+        index.live = Bitmap.first(len(index.keys))
+        index.types = {quiz_type: Bitmap.of(ordinals) for quiz_type, ordinals in types.items()}
+        index.statuses = {status: Bitmap.of(ordinals) for status, ordinals in statuses.items()}
+
+        tags = defaultdict(list)
+        links = Quiz.tags.through.objects.values_list('quiz_id', 'tag_id')
+        for quiz_id, tag_id in links.iterator(chunk_size=10000):
+            ordinal = index.ordinals.get(quiz_id)
+            if ordinal is not None:  # created after the quizzes were read
+                tags[tag_id].append(ordinal)
+                index.quiz_tags[ordinal].add(tag_id)
+        index.tags = {tag_id: Bitmap.of(ordinals) for tag_id, ordinals in tags.items()}
+        for tag_id, name in Tag.objects.values_list('id', 'name'):
+            index.put_tag(tag_id, name)
+        index.trie.complete('')  # rank every prefix now rather than on the first lookups
+        return index
+
+    def evaluate(self, node):
+        """
+        Return the bitmap of the quizzes matching a parsed expression.
+        """
+        op = node[0]
+        if op == 'and':
+            return self.evaluate(node[1]) & self.evaluate(node[2])
+        if op == 'or':
+            return self.evaluate(node[1]) | self.evaluate(node[2])
+        if op == 'not':
+            return self.live - self.evaluate(node[1])
+        if op == 'tag':
+            bitmap = Bitmap()
+            for tag_id in self.names.get(node[1], ()):
+                bitmap |= self.tags.get(tag_id, Bitmap())
+            return bitmap
+        if op == 'id':
+            return self.tags.get(node[1], Bitmap())
+        # 'is'
+        if node[1] in PARTITIONS:
+            return self.statuses.get(node[1], Bitmap())
+        return self.types.get(node[1], Bitmap())
+
+    def select(self, node, cursor=None, limit=21):
+        """
+        Return the ids of the first ``limit`` matching quizzes, newest first.
+
+        Args:
+            node (tuple): A parsed expression.
+            cursor (str, optional): A listing page cursor; only quizzes listed after it match.
+            limit (int): The maximum number of quiz ids.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        below = bisect.bisect_left(self.keys, decode_cursor(cursor)) if cursor else None
+        ordinals = self.evaluate(node).descending(below)
+        return [self.keys[ordinal][1] for ordinal in itertools.islice(ordinals, limit)]
+
+    def _recount(self, tag_ids):
+        for tag_id in tag_ids:
+            self.trie.set_count(tag_id, len(self.tags.get(tag_id, Bitmap())))
+
+    def _clear(self, ordinal):
+        tag_ids = self.quiz_tags.pop(ordinal, ())
+        for tag_id in tag_ids:
+            if tag_id in self.tags:
+                self.tags[tag_id].discard(ordinal)
+        self._recount(tag_ids)
+        for bitmap in itertools.chain(self.types.values(), self.statuses.values()):
+            bitmap.discard(ordinal)
+        self.live.discard(ordinal)
+
+    def put_quiz(self, quiz_id, created_at, quiz_type, status):
+        """
+        Add a quiz or update its type and status, keeping its tags.
+
+        Returns:
+            bool: False if the quiz sorts before the newest indexed quiz and the
+            index has to be rebuilt to number it.
+        """
+        ordinal = self.ordinals.get(quiz_id)
+        if ordinal is None:
+            key = (created_at, quiz_id)
+            if self.keys and key < self.keys[-1]:
+                return False
+            ordinal = len(self.keys)
+            self.keys.append(key)
+            self.ordinals[quiz_id] = ordinal
+        tag_ids = self.quiz_tags.get(ordinal, set())
+        self._clear(ordinal)
+        self.live.add(ordinal)
+        self.types.setdefault(quiz_type, Bitmap()).add(ordinal)
+        self.statuses.setdefault(status, Bitmap()).add(ordinal)
+        if tag_ids:
+            self.tag_quizzes([quiz_id], tag_ids)
+        return True
+
+    def set_status(self, quiz_ids, status):
+        """
+        Move quizzes to a status.
+        """
+        for quiz_id in quiz_ids:
+            ordinal = self.ordinals.get(quiz_id)
+            if ordinal is not None:  # deleted since
+                for bitmap in self.statuses.values():
+                    bitmap.discard(ordinal)
+                self.statuses.setdefault(status, Bitmap()).add(ordinal)
+        return True
+
+    def remove_quiz(self, quiz_id):
+        ordinal = self.ordinals.pop(quiz_id, None)
+        if ordinal is not None:
+            self._clear(ordinal)
+        return True
+
+    def tag_quizzes(self, quiz_ids, tag_ids, add=True):
+        """
+        Add tags to quizzes or remove them from them.
+        """
+        # Quizzes deleted since are skipped
+        ordinals = [self.ordinals[quiz_id] for quiz_id in quiz_ids if quiz_id in self.ordinals]
+        for tag_id in tag_ids:
+            bitmap = self.tags.setdefault(tag_id, Bitmap())
+            for ordinal in ordinals:
+                if add:
+                    bitmap.add(ordinal)
+                    self.quiz_tags[ordinal].add(tag_id)
+                else:
+                    bitmap.discard(ordinal)
+                    self.quiz_tags[ordinal].discard(tag_id)
+        self._recount(tag_ids)
+        return True
+
+    def clear_quiz_tags(self, quiz_id):
+        ordinal = self.ordinals.get(quiz_id)
+        if ordinal is not None:
+            self.tag_quizzes([quiz_id], set(self.quiz_tags.get(ordinal, ())), add=False)
+        return True
+
+    def clear_tag(self, tag_id):
+        """
+        Untag every quiz of a tag; the quizzes keep stale ids in ``quiz_tags``, which clearing ignores.
+        """
+        self.tags.pop(tag_id, None)
+        self.trie.set_count(tag_id, 0)
+        return True
+
+    def put_tag(self, tag_id, name):
+        old_name = self.tag_names.get(tag_id)
+        if old_name is not None:
+            self.names[old_name].discard(tag_id)
+        self.tag_names[tag_id] = name.lower()
+        self.names[name.lower()].add(tag_id)
+        self.trie.put(tag_id, name, len(self.tags.get(tag_id, Bitmap())))
+        return True
+
+    def put_tags(self, tags):
+        for tag_id, name in tags:
+            self.put_tag(tag_id, name)
+        return True
+
+    def remove_tag(self, tag_id):
+        self.clear_tag(tag_id)
+        old_name = self.tag_names.pop(tag_id, None)
+        if old_name is not None:
+            self.names[old_name].discard(tag_id)
+        self.trie.remove(tag_id)
+        return True
+
+
+_index = None
+_lock = threading.RLock()
+
+
+def current_version():
+    """
+    Return the shared version of the tag index.
+
+    A missing version starts at a random number, so that after a cache flush no
+    process mistakes its old index for a current one.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, random.getrandbits(48), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_tag_index():
+    """
+    Make every process rebuild its tag index on its next lookup.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        current_version()
+
+
+def get_tag_index():
+    """
+    Return this process's tag index, rebuilding it if another process changed the data.
+    """
+    global _index
+    version = current_version()
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = TagIndex.build(version)
+        return _index
+
+
+def select_quizzes(node, cursor=None, limit=21):
+    """
+    Return the ids of the first ``limit`` quizzes matching a parsed expression, newest first.
+
+    See ``TagIndex.select``.
+    """
+    with _lock:
+        return get_tag_index().select(node, cursor, limit)
+
+
+def complete_tags(prefix, limit=TOP_SIZE):
+    """
+    Return the tags most used by quizzes whose name starts with a prefix.
+
+    See ``TagTrie.complete``.
+    """
+    with _lock:
+        return get_tag_index().trie.complete(prefix, limit)
+
+
+def _apply(method, *args):
+    """
+    Apply one committed change to this process's index and publish a new version.
+
+    The index stays current if no other process published a change since it was
+    last in step; otherwise it is rebuilt on the next lookup.
+    """
+    global _index
+    with _lock:
+        previous = cache.get(VERSION_KEY)
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            version = current_version()
+        index = _index
+        if index is not None and index.version == previous == version - 1 and getattr(index, method)(*args):
+            index.version = version
+        else:
+            _index = None
+
+
+def _on_commit(method, *args):
+    transaction.on_commit(functools.partial(_apply, method, *args))
+
+
+@receiver(post_save, sender=Quiz)
+def index_quiz(sender, instance, **kwargs):
+    """
+    Adds a saved quiz to the tag index, or updates its type and status.
+    """
+    _on_commit('put_quiz', instance.quiz_id, instance.created_at, instance.quiz_type, instance.status)
+
+
+@receiver(quiz_statuses_changed, sender=Quiz)
+def index_quiz_statuses(sender, quiz_ids, status, **kwargs):
+    """
+    Moves the quizzes the scheduler moved to their new status.
+    """
+    _on_commit('set_status', list(quiz_ids), status)
+
+
+@receiver(post_delete, sender=Quiz)
+def unindex_quiz(sender, instance, **kwargs):
+    """
+    Removes a deleted quiz from the tag index.
+    """
+    _on_commit('remove_quiz', instance.quiz_id)
+
+
+@receiver(m2m_changed, sender=Quiz.tags.through)
+def index_quiz_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Applies tags added to or removed from quizzes, from either side of the relation.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    add = action == 'post_add'
+    if action == 'post_clear':
+        _on_commit('clear_tag' if reverse else 'clear_quiz_tags', instance.pk)
+    elif reverse:
+        _on_commit('tag_quizzes', set(pk_set), {instance.pk}, add)
+    else:
+        _on_commit('tag_quizzes', [instance.pk], set(pk_set), add)
+
+
+@receiver(post_save, sender=Tag)
+def index_tag(sender, instance, **kwargs):
+    """
+    Updates the name under which a tag is found in expressions.
+    """
+    _on_commit('put_tag', instance.pk, instance.name)
+
+
+@receiver(tags_created, sender=Tag)
+def index_created_tags(sender, tags, **kwargs):
+    """
+    Adds the names of tags inserted in bulk by ``core.tags.resolve_tags``.
+    """
+    _on_commit('put_tags', [(tag.pk, tag.name) for tag in tags])
+
+
+@receiver(post_delete, sender=Tag)
+def unindex_tag(sender, instance, **kwargs):
+    """
+    Removes a deleted tag, and with it its links to quizzes, from the tag index.
+    """
+    _on_commit('remove_tag', instance.pk)
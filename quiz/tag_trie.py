@@ -0,0 +1,163 @@
+"""
+Prefix trie of tag names ranked by quiz count, for tag autocompletion.
+
+The trie is a radix tree over lower-cased tag names: each node holds the part of
+the name its edge adds, the tags whose name ends there, and the ``TOP_SIZE``
+best tags of its whole subtree, most quizzes first and then by name. Completing
+a prefix walks at most one node per edge of the prefix and returns the cached
+ranking of the node it ends in, so a lookup does not depend on how many tags
+share the prefix.
+
+A change to a tag discards the cached rankings along its path that it may
+affect; they are recomputed on the next lookup from the rankings of the
+children, which are still cached.
+"""
+import heapq
+
+TOP_SIZE = 10  # tags ranked at every node, the most a completion returns
+
+
+class _Node:
+    __slots__ = ('label', 'children', 'entries', 'top')
+
+    def __init__(self, label=''):
+        self.label = label
+        self.children = {}  # first character of the child's label -> child
+        self.entries = {}  # tag id -> entry, for the tags whose name ends here
+        self.top = None  # best entries of the subtree, None until computed
+
+
+def _ranking(node):
+    if node.top is None:
+        candidates = list(node.entries.values())
+        for child in node.children.values():
+            candidates.extend(_ranking(child))
+        node.top = heapq.nsmallest(TOP_SIZE, candidates)
+    return node.top
+
+
+class TagTrie:
+    """
+    Tag names by prefix, ranked by the number of quizzes of each tag.
+
+    Entries are ``(-count, name, tag_id)`` tuples, so that the natural order of
+    the tuples is the ranking.
+
+    Attributes:
+        entries (dict): The entry of each tag id.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _path(self, key, create=False):
+        """
+        Return the nodes from the root to the node of ``key``, or None if it has none.
+        """
+        node, path, rest = self._root, [self._root], key
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[rest[0]] = _Node(rest)
+            if not rest.startswith(child.label):
+                if not create:
+                    return None
+                # Split the edge where the key leaves it
+                common = 1
+                while common < len(rest) and child.label[common] == rest[common]:
+                    common += 1
+                middle = node.children[rest[0]] = _Node(child.label[:common])
+                child.label = child.label[common:]
+                middle.children[child.label[0]] = child
+                child = middle
+            node, rest = child, rest[len(child.label):]
+            path.append(node)
+        return path
+
+    def _replace(self, path, old, new):
+        node = path[-1]
+        tag_id = (old or new)[2]
+        if new is None:
+            del node.entries[tag_id]
+        else:
+            node.entries[tag_id] = new
+        # Keep the rankings the change cannot affect
+        for node in path:
+            top = node.top
+            if top is None:
+                continue
+            if old in top or (new is not None and (len(top) < TOP_SIZE or new < top[-1])):
+                node.top = None
+
+    def _prune(self, path):
+        # Drop the nodes left without tags and merge a node into its only child
+        for parent, node in zip(path[-2::-1], path[:0:-1]):
+            if node.entries or node.children:
+                if not node.entries and len(node.children) == 1:
+                    (child,) = node.children.values()
+                    node.label += child.label
+                    node.children, node.entries, node.top = child.children, child.entries, child.top
+                break
+            del parent.children[node.label[0]]
+
+    def put(self, tag_id, name, count=None):
+        """
+        Add a tag or rename it, keeping its count unless one is given.
+        """
+        old = self.entries.get(tag_id)
+        if count is None:
+            count = -old[0] if old else 0
+        new = (-count, name, tag_id)
+        if old is not None:
+            if old[1].lower() == name.lower():
+                self._replace(self._path(name.lower()), old, new)
+                self.entries[tag_id] = new
+                return
+            self.remove(tag_id)
+        self._replace(self._path(name.lower(), create=True), None, new)
+        self.entries[tag_id] = new
+
+    def set_count(self, tag_id, count):
+        """
+        Change the quiz count of a tag; unknown tags are ignored.
+        """
+        old = self.entries.get(tag_id)
+        if old is not None and -old[0] != count:
+            self.put(tag_id, old[1], count)
+
+    def remove(self, tag_id):
+        old = self.entries.pop(tag_id, None)
+        if old is not None:
+            path = self._path(old[1].lower())
+            self._replace(path, old, None)
+            self._prune(path)
+
+    def complete(self, prefix, limit=TOP_SIZE):
+        """
+        Return the best ranked tags whose name starts with a prefix, ignoring case.
+
+        Args:
+            prefix (str): The start of the name; an empty prefix matches every tag.
+            limit (int): The maximum number of tags, at most ``TOP_SIZE``.
+
+        Returns:
+            list: ``(tag_id, name, count)`` tuples, most quizzes first.
+        """
+        node, rest = self._root, prefix.lower()
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None:
+                return []
+            if child.label.startswith(rest):
+                node = child
+                break
+            if not rest.startswith(child.label):
+                return []
+            node, rest = child, rest[len(child.label):]
+        return [(tag_id, name, -count) for count, name, tag_id in _ranking(node)[:limit]]
@@ -1,11 +1,32 @@
+import json
+import os
+import random
+import tempfile
+from io import StringIO
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from .models import Quiz, Tag, Question
+from .models import Quiz, Tag, Question, QuizStats
 from datetime import timedelta, datetime
 from django.utils.timezone import make_aware, now
 from django.core.exceptions import ValidationError
 from core.models import User
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from .importers import import_questions, iter_json_rows
+from .listing import QUIZ_PAGE_SIZE
+from .question_sets import get_question_set
+from .bitmaps import ARRAY_LIMIT, Bitmap
+from .tag_trie import TOP_SIZE, TagTrie
+from .tag_index import get_tag_index, invalidate_tag_index, parse_expression
+from .schedule import advance_quiz_statuses, next_status_change
+from .importers import bulk_create_questions
+from participation.models import Participant
+from feedback.models import Feedback
+from Quiz_Portal.testing import QueryBudgetMixin
 
 class QuizModelTest(TestCase):
     """
@@ -180,7 +201,9 @@ class QuizViewTest(TestCase):
         response = self.client.get(reverse('create_quiz'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'quiz/create_quiz.html')
-        self.assertIn('tags', response.context)
+        # Tags are suggested by the autocomplete endpoint, not embedded in the form
+        self.assertNotContains(response, self.tag.name)
+        self.assertContains(response, reverse('tag_autocomplete'))
 
     def test_create_quiz_post(self):
         """Test creating a quiz via POST."""
@@ -218,6 +241,35 @@ class QuizViewTest(TestCase):
         response = self.client.post(reverse('create_quiz'), data)
         self.assertEqual(response.status_code, 302)
 
+    def test_create_quiz_tags_cost_constant_queries(self):
+        """Test that selected and new tags are attached with the same number of queries however many there are."""
+        def create(title, tag_ids, new_tags):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('create_quiz'), {
+                    'title': title, 'quiz_type': 'public', 'duration_minutes': 10,
+                    'tags': tag_ids + ['add_new'], 'new_tags': new_tags,
+                })
+            self.assertEqual(response.status_code, 302)
+            return len(queries)
+
+        few = create('Few tags', [self.tag.id], "alpha, beta")
+        existing = [Tag.objects.create(name=f"existing {i}").id for i in range(15)]
+        many = create('Many tags', [self.tag.id] + existing, ", ".join(f"fresh {i}" for i in range(15)))
+        self.assertEqual(many, few)
+        quiz = Quiz.objects.get(title='Many tags')
+        self.assertEqual(quiz.tags.count(), 31)
+        self.assertEqual(
+            sorted(Quiz.objects.get(title='Few tags').tags.values_list('name', flat=True)),
+            sorted(['alpha', 'beta', self.tag.name]),
+        )
+
+    def test_create_private_quiz_password_checks(self):
+        """Test that the password of a quiz created through the form is hashed once."""
+        self.client.post(reverse('create_quiz'), {
+            'title': 'Locked', 'quiz_type': 'private', 'password': 'sesame', 'duration_minutes': 10,
+        })
+        self.assertTrue(Quiz.objects.get(title='Locked').check_password('sesame'))
+
     def test_create_private_quiz_without_password(self):
         """Test that a private quiz cannot be created without a password."""
         data = {
@@ -284,3 +336,715 @@ class QuizViewTest(TestCase):
 
         # Incorrect password should return False
         self.assertFalse(private_quiz.check_password("wrongpassword"))
+
+
+class QuizStatsTest(TestCase):
+    """
+    Test case for the running aggregates kept by the QuizStats model.
+    """
+    def setUp(self):
+        """
+        Sets up a quiz and three users that finish it with different scores.
+        """
+        self.quiz = Quiz.objects.create(title="Stats Quiz", duration=timedelta(minutes=10))
+        self.users = [
+            User.objects.create_user(username=f"statsuser{i}", email=f"statsuser{i}@example.com", password="password123")
+            for i in range(3)
+        ]
+        self.scores = [50.0, 100.0, 75.0]
+
+    def _finish(self, user, score):
+        Participant.objects.create(user=user, quiz=self.quiz, score=score, end_time=now())
+        return QuizStats.record_score(self.quiz, score)
+
+    def test_record_score_keeps_running_aggregates(self):
+        """Test that each recorded score updates count, sum, extremes and average."""
+        for user, score in zip(self.users, self.scores):
+            stats = self._finish(user, score)
+
+        self.assertEqual(stats.total_participants, 3)
+        self.assertEqual(stats.total_score, 225.0)
+        self.assertEqual(stats.total_score_squared, 50.0 ** 2 + 100.0 ** 2 + 75.0 ** 2)
+        self.assertEqual(stats.highest_score, 100.0)
+        self.assertEqual(stats.lowest_score, 50.0)
+        self.assertEqual(stats.average_score, 75.0)
+        self.assertAlmostEqual(stats.score_std_dev, (1250 / 3) ** 0.5)
+
+    def test_rebuild_repairs_drifted_stats(self):
+        """Test that rebuild() and the management command recompute stats from participants."""
+        for user, score in zip(self.users, self.scores):
+            self._finish(user, score)
+        QuizStats.objects.filter(quiz=self.quiz).update(total_participants=99, highest_score=0.0)
+
+        call_command('recompute_quiz_stats', str(self.quiz.quiz_id), stdout=StringIO())
+
+        stats = QuizStats.objects.get(quiz=self.quiz)
+        self.assertEqual(stats.total_participants, 3)
+        self.assertEqual(stats.highest_score, 100.0)
+        self.assertEqual(stats.lowest_score, 50.0)
+        self.assertEqual(stats.average_score, 75.0)
+
+
+class QuestionImportTest(TestCase):
+    """
+    Test case for bulk question ingestion through set_questions, file import and the management command.
+    """
+    def setUp(self):
+        """
+        Sets up a logged-in quiz author and an empty quiz.
+        """
+        self.user = get_user_model().objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='testpassword'
+        )
+        self.client.login(email='author@example.com', password='testpassword')
+        self.quiz = Quiz.objects.create(title="Import Quiz", duration=timedelta(minutes=10), created_by=self.user)
+
+    def _rows(self, count):
+        return [
+            {'text': f"Question {i}", 'option_a': 'a', 'option_b': 'b',
+             'option_c': 'c', 'option_d': 'd', 'correct_option': 'ABCD'[i % 4]}
+            for i in range(count)
+        ]
+
+    def test_set_questions_uses_one_insert(self):
+        """Test that a large batch is written with a constant number of queries."""
+        rows = self._rows(100)
+        data = {f"{field}[]": [row[field] for row in rows] for field in rows[0]}
+        data['question_text[]'] = data.pop('text[]')
+        # session, user, quiz, savepoint, max(question_no), insert, and indexing: savepoint, existing
+        # documents, insert documents, insert full-text rows (one executemany), release; release
+        with self.assertNumQueries(12):
+            response = self.client.post(reverse('set_questions', kwargs={'quiz_id': self.quiz.quiz_id}), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(self.quiz.questions.values_list('question_no', flat=True)),
+            list(range(1, 101))
+        )
+
+    def test_set_questions_rejects_invalid_batch(self):
+        """Test that one invalid question rejects the whole batch."""
+        data = {
+            'question_text[]': ['Valid question', 'Invalid question'],
+            'option_a[]': ['1', '1'],
+            'option_b[]': ['2', '2'],
+            'option_c[]': ['3', '3'],
+            'option_d[]': ['4', '4'],
+            'correct_option[]': ['A', 'E'],
+        }
+        response = self.client.post(reverse('set_questions', kwargs={'quiz_id': self.quiz.quiz_id}), data)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.quiz.questions.exists())
+
+    def test_import_csv_upload(self):
+        """Test importing a CSV file through the upload endpoint."""
+        lines = ["text,option_a,option_b,option_c,option_d,correct_option"]
+        lines += [f"Q{i},a,b,c,d,b" for i in range(1, 6)]
+        upload = SimpleUploadedFile("bank.csv", "\n".join(lines).encode(), content_type="text/csv")
+        response = self.client.post(reverse('import_questions', kwargs={'quiz_id': self.quiz.quiz_id}), {'file': upload})
+        self.assertRedirects(response, reverse('set_questions', kwargs={'quiz_id': self.quiz.quiz_id}))
+        self.assertEqual(self.quiz.questions.count(), 5)
+        self.assertEqual(self.quiz.questions.last().correct_option, 'B')
+
+    def test_import_json_streams_in_chunks(self):
+        """Test that a JSON array is parsed across read blocks and inserted in chunks."""
+        payload = json.dumps(self._rows(25))
+        rows = list(iter_json_rows(StringIO(payload), read_size=16))
+        self.assertEqual(len(rows), 25)
+
+        imported = import_questions(self.quiz, StringIO(payload), 'json', chunk_size=10)
+        self.assertEqual(imported, 25)
+        self.assertEqual(self.quiz.questions.order_by('question_no').last().question_no, 25)
+
+    def test_import_rolls_back_on_invalid_row(self):
+        """Test that an invalid row in a later chunk leaves the quiz unchanged."""
+        rows = self._rows(15)
+        rows[12]['correct_option'] = 'Z'
+        lines = "\n".join(json.dumps(row) for row in rows)
+        with self.assertRaises(ValidationError) as context:
+            import_questions(self.quiz, StringIO(lines), 'jsonl', chunk_size=5)
+        self.assertIn("Row 13", context.exception.messages[0])
+        self.assertFalse(self.quiz.questions.exists())
+
+    def test_import_questions_command(self):
+        """Test the import_questions management command."""
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump(self._rows(3), handle)
+        self.addCleanup(os.remove, handle.name)
+        call_command('import_questions', str(self.quiz.quiz_id), handle.name, stdout=StringIO())
+        self.assertEqual(self.quiz.questions.count(), 3)
+
+
+class QuizHomeListingTest(TestCase):
+    """
+    Test case for the paginated, cached quiz listing on the quiz home page.
+    """
+    def setUp(self):
+        """
+        Sets up a logged-in user and more quizzes than fit on one page, each with two tags.
+        """
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='lister',
+            email='lister@example.com',
+            password='testpassword'
+        )
+        self.client.login(email='lister@example.com', password='testpassword')
+        self.tags = [Tag.objects.create(name=f"tag{i}") for i in range(2)]
+        for i in range(QUIZ_PAGE_SIZE + 3):
+            quiz = Quiz.objects.create(
+                title=f"Quiz {i}", duration=timedelta(minutes=90, seconds=5), created_by=self.user
+            )
+            quiz.tags.add(*self.tags)
+
+    def test_quiz_home_query_count_is_constant(self):
+        """Test that a page costs a fixed number of queries and a cache hit skips the listing."""
+        # session, user, quizzes + creators, prefetched tags, participant
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('quiz_home'))
+        self.assertContains(response, "01:30:05")
+        self.assertContains(response, "tag0, tag1")
+        with self.assertNumQueries(3):  # session, user, participant
+            self.client.get(reverse('quiz_home'))
+
+    def test_quiz_home_keyset_pagination(self):
+        """Test that following the next-page cursor lists every quiz once."""
+        first = self.client.get(reverse('quiz_home'))
+        page = first.context['quizzes']
+        self.assertEqual(len(page), QUIZ_PAGE_SIZE)
+        second = self.client.get(reverse('quiz_home'), {'after': page.next_cursor})
+        titles = [quiz.title for quiz in page] + [quiz.title for quiz in second.context['quizzes']]
+        self.assertEqual(sorted(titles), sorted(f"Quiz {i}" for i in range(QUIZ_PAGE_SIZE + 3)))
+        self.assertFalse(second.context['quizzes'].has_next)
+
+    def test_quiz_home_next_link_carries_only_filters(self):
+        """Test that other query parameters in a cached fragment's next-page link do not reach other users."""
+        self.client.get(reverse('quiz_home'), {'quiz_type': Quiz.PUBLIC, 'ref': 'attacker'})
+        other = get_user_model().objects.create_user(
+            username='other', email='other@example.com', password='testpassword'
+        )
+        self.client.force_login(other)
+        response = self.client.get(reverse('quiz_home'), {'quiz_type': Quiz.PUBLIC})
+        self.assertNotContains(response, 'attacker')
+        self.assertContains(response, 'quiz_type=public&amp;after=')
+
+    def test_quiz_home_cache_invalidated_on_change(self):
+        """Test that creating a quiz or renaming a tag invalidates the cached fragment."""
+        self.client.get(reverse('quiz_home'))
+        Quiz.objects.create(title="Fresh Quiz", duration=timedelta(minutes=5), created_by=self.user)
+        self.assertContains(self.client.get(reverse('quiz_home')), "Fresh Quiz")
+
+        self.tags[0].name = "renamed"
+        self.tags[0].save()
+        self.assertContains(self.client.get(reverse('quiz_home')), "renamed")
+
+
+class QuestionSetCacheTest(TestCase):
+    """
+    Test case for the versioned question-set cache used when participating in a quiz.
+    """
+    def setUp(self):
+        """
+        Sets up a quiz with two questions and an empty cache.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="player", email="player@example.com", password="password123"
+        )
+        self.quiz = Quiz.objects.create(
+            title="Cached Quiz", duration=timedelta(minutes=10), created_by=self.user
+        )
+        for no, correct in enumerate(["C", "A"], start=1):
+            Question.objects.create(
+                quiz=self.quiz, question_no=no, text=f"Question {no}",
+                option_a="a", option_b="b", option_c="c", option_d="d", correct_option=correct
+            )
+
+    def test_question_set_is_cached(self):
+        """Test that the answer key and rendered questions are built once per version."""
+        with self.assertNumQueries(1):
+            question_set = get_question_set(self.quiz.quiz_id)
+        self.assertEqual([entry.correct_option for entry in question_set.answer_key], ["C", "A"])
+        self.assertEqual([entry.question_no for entry in question_set.answer_key], [1, 2])
+        self.assertIn('name="selected_option_2"', question_set.html)
+        with self.assertNumQueries(0):
+            self.assertIs(get_question_set(self.quiz.quiz_id), question_set)
+
+    def test_question_change_invalidates_set(self):
+        """Test that saving, deleting or bulk-creating questions retires the cached set."""
+        get_question_set(self.quiz.quiz_id)
+        question = self.quiz.questions.get(question_no=1)
+        question.correct_option = "D"
+        question.save()
+        self.assertEqual(get_question_set(self.quiz.quiz_id).answer_key[0].correct_option, "D")
+
+        question.delete()
+        self.assertEqual(len(get_question_set(self.quiz.quiz_id)), 1)
+
+        bulk_create_questions(self.quiz, [{
+            'text': "Bulk", 'option_a': "a", 'option_b': "b", 'option_c': "c", 'option_d': "d",
+            'correct_option': "B",
+        }])
+        self.assertEqual(len(get_question_set(self.quiz.quiz_id)), 2)
+
+    def test_participate_and_submit_use_cached_set(self):
+        """Test that starting and submitting a quiz read the questions from the cached set."""
+        self.client.login(email="player@example.com", password="password123")
+        response = self.client.get(reverse('participate', args=[self.quiz.quiz_id]))
+        self.assertContains(response, "Question 2")
+        self.assertContains(response, 'name="selected_option_2"', count=4)
+
+        # The submission grades against the cached key and never reloads the questions
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('participate', args=[self.quiz.quiz_id]),
+                {"selected_option_1": "C", "selected_option_2": "B"}
+            )
+        self.assertEqual(response.context['raw_score'], 1)
+        self.assertEqual(response.context['total_questions'], 2)
+        self.assertFalse([q for q in queries if 'FROM "quiz_question"' in q['sql']])
+
+
+class QueryPlanTest(TestCase):
+    """
+    Tests that the hot lookups are served by the declared indexes and constraints.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', email='planner@example.com', password='pass')
+        self.quiz = Quiz.objects.create(title="Plan Quiz", duration=timedelta(minutes=10), created_by=self.user)
+
+    def assertUsesIndex(self, queryset, index=None):
+        if connection.vendor != 'sqlite':
+            self.skipTest("The plan assertions are written for SQLite.")
+        plan = queryset.explain()
+        self.assertIn("USING INDEX", plan)
+        self.assertNotIn("SCAN", plan)
+        self.assertNotIn("TEMP B-TREE", plan)  # the ORDER BY is read from the index
+        if index:
+            self.assertIn(index, plan)
+
+    def test_quiz_listing_plans(self):
+        self.assertUsesIndex(
+            Quiz.objects.filter(quiz_type=Quiz.PUBLIC).order_by('-created_at', '-quiz_id'), 'quiz_type_listing_idx'
+        )
+        self.assertUsesIndex(
+            Quiz.objects.filter(status=Quiz.ACTIVE).order_by('-created_at', '-quiz_id'), 'quiz_status_listing_idx'
+        )
+
+    def test_status_schedule_plans(self):
+        self.assertUsesIndex(
+            Quiz.objects.filter(status__in=[Quiz.SCHEDULED, Quiz.ACTIVE], expiry_date__lte=now()).order_by(),
+            'quiz_status_expiry_idx',
+        )
+        self.assertUsesIndex(
+            Quiz.objects.filter(status=Quiz.SCHEDULED, start_date__lte=now()).order_by(), 'quiz_status_start_idx'
+        )
+
+    def test_question_order_plan(self):
+        self.assertUsesIndex(Question.objects.filter(quiz=self.quiz).order_by('question_no'))
+
+    def test_participant_plans(self):
+        self.assertUsesIndex(Participant.objects.filter(user=self.user, quiz=self.quiz))
+        self.assertUsesIndex(
+            Participant.objects.filter(quiz=self.quiz).order_by('-score'), 'participant_quiz_score_idx'
+        )
+
+    def test_feedback_plans(self):
+        participant = Participant.objects.create(user=self.user, quiz=self.quiz)
+        self.assertUsesIndex(Feedback.objects.filter(quiz=self.quiz, participant=participant))
+        self.assertUsesIndex(
+            Feedback.objects.filter(quiz=self.quiz).order_by('-created_at'), 'feedback_quiz_created_idx'
+        )
+
+    def test_unique_constraints(self):
+        Participant.objects.create(user=self.user, quiz=self.quiz)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Participant.objects.create(user=self.user, quiz=self.quiz)
+
+        Question.objects.create(quiz=self.quiz, question_no=1, text="Q", option_a="a", option_b="b",
+                                option_c="c", option_d="d", correct_option='A')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Question.objects.create(quiz=self.quiz, question_no=1, text="Q again", option_a="a", option_b="b",
+                                    option_c="c", option_d="d", correct_option='B')
+
+
+class QuizHomeQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    The quiz list runs a fixed number of queries however many quizzes, tags and authors there are.
+    """
+
+    def test_quiz_home(self):
+        user = User.objects.create_user(username='lister', email='lister@example.com', password='pass')
+        self.client.force_login(user)
+
+        def grow(size):
+            for i in range(Quiz.objects.count(), size):
+                author = User.objects.create_user(username=f'writer{i}', email=f'writer{i}@example.com', password='pass')
+                quiz = Quiz.objects.create(title=f"Quiz {i}", duration=timedelta(minutes=10), created_by=author)
+                quiz.tags.add(Tag.objects.create(name=f"tag{i}"))
+
+        self.assertQueryBudget(lambda: self.client.get(reverse('quiz_home')), budget=5, grow=grow)
+
+
+class BitmapTest(TestCase):
+    """
+    Tests the compressed bitmaps of the tag index against Python sets.
+    """
+
+    def test_operations_match_sets(self):
+        rng = random.Random(7)
+        # Sparse and dense chunks, on both sides of chunk boundaries
+        samples = [
+            set(rng.sample(range(300_000), 50)),
+            set(rng.sample(range(200_000), ARRAY_LIMIT * 3)),
+            set(range(60_000, 140_000, 3)),
+            set(),
+        ]
+        for a in samples:
+            for b in samples:
+                with self.subTest(a=len(a), b=len(b)):
+                    x, y = Bitmap.of(a), Bitmap.of(b)
+                    self.assertEqual(list((x & y).descending()), sorted(a & b, reverse=True))
+                    self.assertEqual(list((x | y).descending()), sorted(a | b, reverse=True))
+                    self.assertEqual(list((x - y).descending()), sorted(a - b, reverse=True))
+                    self.assertEqual(list(x.descending(70_000)), sorted((n for n in a if n < 70_000), reverse=True))
+
+    def test_add_and_discard(self):
+        bitmap, expected = Bitmap.first(70_000), set(range(70_000))
+        for number in [5, 65_535, 65_536, 69_999, 70_000, 500_000]:
+            bitmap.discard(number)
+            expected.discard(number)
+        for number in range(0, 140_000, 7):
+            bitmap.add(number)
+            expected.add(number)
+        self.assertEqual(len(bitmap), len(expected))
+        self.assertEqual(list(bitmap.descending()), sorted(expected, reverse=True))
+        self.assertIn(70_007, bitmap)
+        self.assertNotIn(65_535, bitmap)
+
+
+class TagTrieTest(TestCase):
+    """
+    Tests the tag autocompletion trie against sorting every matching tag.
+    """
+
+    def expected(self, tags, prefix):
+        matches = [(-count, name, tag_id) for tag_id, (name, count) in tags.items()
+                   if name.lower().startswith(prefix.lower())]
+        return [(tag_id, name, -count) for count, name, tag_id in sorted(matches)[:TOP_SIZE]]
+
+    def test_completions_follow_changes(self):
+        rng = random.Random(11)
+        trie, tags = TagTrie(), {}
+        words = ['py', 'python', 'Pythonic', 'pytest', 'pandas', 'java', 'javascript', 'go', 'golang', 'g']
+        prefixes = ['', 'p', 'PY', 'pyt', 'python', 'pythonx', 'ja', 'g', 'go', 'x']
+        for step in range(2000):
+            tag_id = rng.randrange(60)
+            action = rng.random()
+            if action < 0.5:
+                name = f"{rng.choice(words)}{rng.choice(['', '', str(tag_id)])}"
+                if any(other.lower() == name.lower() for other_id, (other, _) in tags.items() if other_id != tag_id):
+                    name = f"{name}-{tag_id}"
+                count = rng.randrange(5)
+                trie.put(tag_id, name, count)
+                tags[tag_id] = (name, count)
+            elif action < 0.85:
+                if tag_id in tags:
+                    count = rng.randrange(20)
+                    trie.set_count(tag_id, count)
+                    tags[tag_id] = (tags[tag_id][0], count)
+            else:
+                trie.remove(tag_id)
+                tags.pop(tag_id, None)
+            if step % 10 == 0:
+                for prefix in prefixes:
+                    with self.subTest(step=step, prefix=prefix):
+                        self.assertEqual(trie.complete(prefix), self.expected(tags, prefix))
+        self.assertEqual(len(trie), len(tags))
+
+    def test_rename_keeps_count_and_prunes(self):
+        trie = TagTrie()
+        trie.put(1, "Django", 3)
+        trie.put(2, "djangorestframework", 5)
+        self.assertEqual(trie.complete("dj"), [(2, "djangorestframework", 5), (1, "Django", 3)])
+        trie.put(2, "DRF")
+        self.assertEqual(trie.complete("d", limit=1), [(2, "DRF", 5)])
+        self.assertEqual(trie.complete("djangor"), [])
+        trie.remove(1)
+        trie.remove(2)
+        self.assertEqual(trie._root.children, {})
+
+
+class TagExpressionTest(TestCase):
+    """
+    Tests for parsing the boolean tag expressions of the quiz home filter.
+    """
+
+    def test_precedence(self):
+        self.assertEqual(
+            parse_expression('Python AND beginner NOT is:private'),
+            ('and', ('and', ('tag', 'python'), ('tag', 'beginner')), ('not', ('is', 'private'))),
+        )
+        self.assertEqual(
+            parse_expression('a b OR NOT c'),
+            ('or', ('and', ('tag', 'a'), ('tag', 'b')), ('not', ('tag', 'c'))),
+        )
+        self.assertEqual(
+            parse_expression('"Machine Learning" AND (a OR b)'),
+            ('and', ('tag', 'machine learning'), ('or', ('tag', 'a'), ('tag', 'b'))),
+        )
+
+    def test_invalid_expressions(self):
+        for text in ['', 'a AND', '(a OR b', 'a )', 'OR a', 'is:nothing', ' '.join(['a'] * 100)]:
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                parse_expression(text)
+
+
+class TagIndexTest(QueryBudgetMixin, TestCase):
+    """
+    Test case for the in-memory tag index behind the filtered quiz listing.
+    """
+
+    def setUp(self):
+        """
+        Sets up a logged-in user and quizzes with different tags, types and expiries.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='indexer', email='indexer@example.com', password='pass')
+        self.client.force_login(self.user)
+        self.python, self.beginner, self.advanced = [
+            Tag.objects.create(name=name) for name in ["Python", "beginner", "advanced"]
+        ]
+        self.quizzes = {}
+        for title, quiz_type, tags, expiry in [
+            ("Python 101", Quiz.PUBLIC, [self.python, self.beginner], None),
+            ("Python internals", Quiz.PUBLIC, [self.python, self.advanced], now() + timedelta(days=1)),
+            ("Secret Python", Quiz.PRIVATE, [self.python, self.beginner], None),
+            ("Old Python", Quiz.PUBLIC, [self.python, self.beginner], now() - timedelta(days=1)),
+            ("Untagged", Quiz.PUBLIC, [], None),
+        ]:
+            quiz = Quiz.objects.create(title=title, quiz_type=quiz_type, password="pw", expiry_date=expiry,
+                                       duration=timedelta(minutes=10), created_by=self.user)
+            quiz.tags.add(*tags)
+            self.quizzes[title] = quiz
+
+    def titles(self, **params):
+        response = self.client.get(reverse('quiz_home'), params)
+        self.assertEqual(response.status_code, 200)
+        return [quiz.title for quiz in response.context['quizzes']]
+
+    def test_expressions(self):
+        self.assertEqual(self.titles(tags='python AND beginner NOT is:private'), ["Old Python", "Python 101"])
+        self.assertEqual(self.titles(tags='advanced OR NOT python'), ["Untagged", "Python internals"])
+        self.assertEqual(self.titles(tags='beginner', quiz_type='private'), ["Secret Python"])
+        self.assertEqual(self.titles(tags='python', tag=self.advanced.id), ["Python internals"])
+        self.assertEqual(self.titles(tags='nosuchtag'), [])
+        self.assertEqual(self.client.get(reverse('quiz_home'), {'tags': 'python AND'}).status_code, 400)
+
+    def test_available_only_keeps_quizzes_without_expiry(self):
+        self.assertEqual(
+            self.titles(tags='python', available_only='1'), ["Secret Python", "Python internals", "Python 101"]
+        )
+        self.assertEqual(self.titles(tags='is:expired'), ["Old Python"])
+
+    def test_quizzes_expire_in_the_index(self):
+        index = get_tag_index()
+        self.assertIn("Python internals", self.titles(tags='is:active'))
+        with self.captureOnCommitCallbacks(execute=True):
+            advance_quiz_statuses(now() + timedelta(days=2))
+        self.assertIs(get_tag_index(), index)
+        self.assertEqual(index.select(('is', 'expired')), [
+            self.quizzes["Old Python"].quiz_id, self.quizzes["Python internals"].quiz_id,
+        ])
+        self.assertNotIn("Python internals", self.titles(tags='is:active'))
+
+    def test_keyset_pagination(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(QUIZ_PAGE_SIZE + 2):
+                quiz = Quiz.objects.create(title=f"Bulk {i}", duration=timedelta(minutes=5), created_by=self.user)
+                quiz.tags.add(self.advanced)
+        first = self.client.get(reverse('quiz_home'), {'tags': 'advanced'}).context['quizzes']
+        self.assertEqual(len(first), QUIZ_PAGE_SIZE)
+        second = self.client.get(reverse('quiz_home'), {'tags': 'advanced', 'after': first.next_cursor})
+        titles = [quiz.title for quiz in first] + [quiz.title for quiz in second.context['quizzes']]
+        self.assertEqual(len(titles), QUIZ_PAGE_SIZE + 3)
+        self.assertEqual(titles[-1], "Python internals")
+        self.assertFalse(second.context['quizzes'].has_next)
+
+    def test_committed_changes_are_applied_in_place(self):
+        index = get_tag_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quizzes["Untagged"].tags.add(self.beginner)
+            self.python.quizzes.remove(self.quizzes["Old Python"])
+            self.quizzes["Python 101"].delete()
+            self.advanced.name = "Expert"
+            self.advanced.save()
+            fresh = Quiz.objects.create(title="Fresh", duration=timedelta(minutes=5), created_by=self.user)
+            fresh.tags.add(self.python, self.advanced)
+        with self.assertNumQueries(0):
+            self.assertIs(get_tag_index(), index)
+            self.assertEqual(index.select(parse_expression('beginner NOT python')), [
+                self.quizzes["Untagged"].quiz_id, self.quizzes["Old Python"].quiz_id,
+            ])
+            self.assertEqual(index.select(parse_expression('expert')), [
+                fresh.quiz_id, self.quizzes["Python internals"].quiz_id,
+            ])
+            self.assertEqual(index.select(parse_expression('advanced')), [])
+
+    def test_bulk_created_tags_are_named_in_place(self):
+        index = get_tag_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create_quiz'), {
+                'title': "Rust basics", 'quiz_type': 'public', 'duration_minutes': 10,
+                'new_tags': "Rust, systems",
+            })
+        self.assertIs(get_tag_index(), index)
+        quiz = Quiz.objects.get(title="Rust basics")
+        self.assertEqual(index.select(parse_expression('rust AND systems')), [quiz.quiz_id])
+
+    def test_autocomplete_ranks_by_quiz_count(self):
+        url = reverse('tag_autocomplete')
+        get_tag_index()
+        with self.assertNumQueries(2):  # session and user
+            response = self.client.get(url, {'q': 'py'})
+        self.assertEqual(response.json(), {'tags': [{'id': self.python.id, 'name': "Python", 'quiz_count': 4}]})
+        names = [tag['name'] for tag in self.client.get(url).json()['tags']]
+        self.assertEqual(names, ["Python", "beginner", "advanced"])
+        self.assertEqual(len(self.client.get(url, {'limit': 1}).json()['tags']), 1)
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for title in ["Untagged", "Python 101", "Secret Python"]:
+                self.quizzes[title].tags.add(self.advanced)
+            self.quizzes["Old Python"].delete()
+        names = [tag['name'] for tag in self.client.get(url).json()['tags']]
+        self.assertEqual(names, ["advanced", "Python", "beginner"])
+
+    def test_rolled_back_changes_are_not_applied(self):
+        index = get_tag_index()
+        with self.captureOnCommitCallbacks(execute=False):
+            self.quizzes["Untagged"].tags.add(self.advanced)
+        self.assertIs(get_tag_index(), index)
+        self.assertNotIn(self.quizzes["Untagged"].quiz_id, index.select(('id', self.advanced.id)))
+
+    def test_rebuilt_after_invalidation(self):
+        index = get_tag_index()
+        invalidate_tag_index()  # another process bulk-loaded quizzes
+        with self.assertNumQueries(3):
+            rebuilt = get_tag_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(len(rebuilt.select(('tag', 'python'))), 4)
+
+    def test_filtered_listing_query_budget(self):
+        def grow(size):
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(Quiz.objects.count(), size):
+                    author = User.objects.create_user(username=f'writer{i}', email=f'writer{i}@example.com',
+                                                      password='pass')
+                    quiz = Quiz.objects.create(title=f"Quiz {i}", duration=timedelta(minutes=10), created_by=author)
+                    quiz.tags.add(self.python, Tag.objects.create(name=f"tag{i}"))
+
+        get_tag_index()
+        # session, user, quizzes + creators, prefetched tags, participant
+        self.assertQueryBudget(
+            lambda: self.client.get(reverse('quiz_home'), {'tags': 'python NOT is:private'}), budget=5, grow=grow
+        )
+
+
+class QuizStatusScheduleTest(TestCase):
+    """
+    Test case for the quiz statuses and the scheduler that moves them.
+    """
+
+    def setUp(self):
+        """
+        Sets up a logged-in user and a quiz of every status, besides one without dates.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='scheduler', email='scheduler@example.com', password='pass')
+        self.client.force_login(self.user)
+        self.quizzes = {}
+        for title, start_date, expiry_date in [
+            ("Always open", None, None),
+            ("Closing soon", None, now() + timedelta(hours=1)),
+            ("Opening soon", now() + timedelta(hours=1), now() + timedelta(hours=3)),
+            ("Closed", None, now() - timedelta(hours=1)),
+        ]:
+            self.quizzes[title] = Quiz.objects.create(
+                title=title, start_date=start_date, expiry_date=expiry_date,
+                duration=timedelta(minutes=10), created_by=self.user,
+            )
+
+    def statuses(self):
+        return dict(Quiz.objects.values_list('title', 'status'))
+
+    def available(self):
+        response = self.client.get(reverse('quiz_home'), {'available_only': '1'})
+        return [quiz.title for quiz in response.context['quizzes']]
+
+    def test_status_is_set_on_save(self):
+        self.assertEqual(self.statuses(), {
+            "Always open": Quiz.ACTIVE, "Closing soon": Quiz.ACTIVE,
+            "Opening soon": Quiz.SCHEDULED, "Closed": Quiz.EXPIRED,
+        })
+        self.assertFalse(self.quizzes["Opening soon"].is_active())
+        self.assertEqual(next_status_change(), self.quizzes["Closing soon"].expiry_date)
+
+    def test_quizzes_move_at_their_boundaries(self):
+        self.assertEqual(advance_quiz_statuses(), {})
+        self.assertEqual(advance_quiz_statuses(now() + timedelta(hours=2)), {
+            Quiz.EXPIRED: [self.quizzes["Closing soon"].quiz_id],
+            Quiz.ACTIVE: [self.quizzes["Opening soon"].quiz_id],
+        })
+        advance_quiz_statuses(now() + timedelta(hours=4))
+        self.assertEqual(self.statuses(), {
+            "Always open": Quiz.ACTIVE, "Closing soon": Quiz.EXPIRED,
+            "Opening soon": Quiz.EXPIRED, "Closed": Quiz.EXPIRED,
+        })
+        self.assertIsNone(next_status_change())
+
+    def test_batches(self):
+        for i in range(3):
+            Quiz.objects.create(title=f"Short {i}", expiry_date=now() + timedelta(seconds=1),
+                                duration=timedelta(minutes=10), created_by=self.user)
+        later = now() + timedelta(hours=2)
+        self.assertEqual(len(advance_quiz_statuses(later, batch_size=2)[Quiz.EXPIRED]), 2)
+        self.assertEqual(len(advance_quiz_statuses(later, batch_size=2)[Quiz.EXPIRED]), 2)
+        self.assertEqual(Quiz.objects.filter(status=Quiz.EXPIRED).count(), 5)
+
+    def test_available_only_lists_active_quizzes(self):
+        # Quizzes without an expiry date are available too
+        self.assertEqual(self.available(), ["Closing soon", "Always open"])
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(Quiz.objects.filter(status=Quiz.ACTIVE).values_list('title', flat=True)),
+                ["Closing soon", "Always open"],
+            )
+        advance_quiz_statuses(now() + timedelta(hours=2))
+        self.assertEqual(self.available(), ["Opening soon", "Always open"])
+
+    def test_command_moves_due_quizzes(self):
+        Quiz.objects.filter(pk=self.quizzes["Closing soon"].pk).update(expiry_date=now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('advance_quiz_status', '--once', stdout=out)
+        self.assertEqual(out.getvalue(), "expired 1\n")
+        self.assertEqual(self.statuses()["Closing soon"], Quiz.EXPIRED)
+
+    def test_scheduled_quiz_cannot_be_taken(self):
+        response = self.client.get(reverse('participate', args=[self.quizzes["Opening soon"].quiz_id]), follow=True)
+        self.assertRedirects(response, reverse('quiz_home'))
+        self.assertContains(response, "This quiz has not started yet.")
+
+    def test_create_quiz_with_start_date(self):
+        start = (now() + timedelta(days=1)).strftime("%Y-%m-%dT%H:%M")
+        self.client.post(reverse('create_quiz'), {
+            'title': "Tomorrow", 'quiz_type': 'public', 'duration_minutes': 10, 'start_date': start,
+        })
+        self.assertEqual(Quiz.objects.get(title="Tomorrow").status, Quiz.SCHEDULED)
+        response = self.client.post(reverse('create_quiz'), {
+            'title': "Backwards", 'quiz_type': 'public', 'duration_minutes': 10,
+            'start_date': start, 'expiry_date': (now() + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M"),
+        })
+        self.assertEqual(response.status_code, 400)
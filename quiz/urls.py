@@ -10,6 +10,8 @@ URLs:
 - `/`: Displays the homepage with a list of quizzes (via `quiz_home` view).
 - `/create_quiz/`: Allows the creation of a new quiz (via `create_quiz` view).
 - `/set_questions/<uuid:quiz_id>/`: Used to set the questions for a specific quiz (via `set_questions` view).
+- `/import_questions/<uuid:quiz_id>/`: Imports questions for a quiz from a CSV or JSON file (via `import_questions_file` view).
+- `/tags/autocomplete/`: Suggests tags by name prefix, most used first, as JSON (via `tag_autocomplete` view).
 """
 from django.urls import path
 from . import views
@@ -18,4 +20,6 @@ urlpatterns = [
     path('', views.quiz_home, name='quiz_home'),
     path('create_quiz/',views.create_quiz,name='create_quiz'),
     path('set_questions/<uuid:quiz_id>/', views.set_questions, name='set_questions'),
+    path('import_questions/<uuid:quiz_id>/', views.import_questions_file, name='import_questions'),
+    path('tags/autocomplete/', views.tag_autocomplete, name='tag_autocomplete'),
 ]
@@ -1,14 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils.timezone import now
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, QueryDict
+from django.core.cache import cache
+from django.template.loader import render_to_string
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.contrib.auth.hashers import check_password
 from datetime import timedelta, datetime
 from django.utils.timezone import make_aware
-from .models import Quiz, Question
-from core.models import Tag
+from .models import Quiz
+from .listing import QUIZ_LIST_CACHE_TIMEOUT, QUIZ_PAGE_SIZE, QuizPage, fragment_cache_key
+from .tag_index import complete_tags, parse_expression, select_quizzes
+from .tag_trie import TOP_SIZE
+from .importers import QUESTION_FIELDS, bulk_create_questions, import_questions
+from core.tags import resolve_tags, split_tag_names
 from participation.models import Participant
 
 @login_required
@@ -17,44 +23,90 @@ def quiz_home(request):
     Renders the quiz homepage, displaying available quizzes and tags, 
     and applying optional filters such as quiz type, tags, and availability.
 
+    Quizzes are listed one keyset page at a time (``after`` query parameter)
+    with their tags and creator loaded in bulk. The rendered quiz list of each
+    filter combination is cached until a quiz, its status or a tag changes.
+
+    Pages filtered by tags are selected in memory by the tag index, which also
+    evaluates boolean tag expressions (``tags`` query parameter, e.g.
+    ``python AND beginner NOT is:private``); only the page itself is then loaded.
+    Pages filtered only by quiz type or availability are read in order from the
+    type and status indexes; "available only" lists the quizzes whose ``status``
+    is active, which the ``advance_quiz_status`` scheduler keeps current.
+
     Args:
         request (HttpRequest): The HTTP request object.
 
     Returns:
         HttpResponse: The rendered template displaying quizzes.
     """
-    quizzes = Quiz.objects.all()
-    tags = Tag.objects.all()
     quiz_type = request.GET.get('quiz_type')
     tag = request.GET.get('tag')
+    tag_expression = request.GET.get('tags', '').strip()
     available_only = request.GET.get('available_only')
+    cursor = request.GET.get('after')
+
+    # Combine the filters present into one tag index expression, and into a queryset
+    # for when no tag filter needs the index
+    filters = []
+    queryset = Quiz.objects.all()
+    if tag_expression:
+        try:
+            filters.append(parse_expression(tag_expression))
+        except ValueError as e:
+            return HttpResponse(f"Invalid tag expression: {e}", status=400)
 
-    # Apply filters if present
-    if 'quiz_type' in request.GET and request.GET['quiz_type']:
-        quizzes = quizzes.filter(quiz_type=request.GET['quiz_type'])
+    if quiz_type:
+        filters.append(('is', quiz_type))
+        queryset = queryset.filter(quiz_type=quiz_type)
     
-    if 'tag' in request.GET and request.GET['tag']:
-        quizzes = quizzes.filter(tags__id=request.GET['tag'])
+    if tag:
+        if not tag.isdigit():
+            return HttpResponse("Invalid tag.", status=400)
+        filters.append(('id', int(tag)))
 
     if available_only:  # Check if the "available only" checkbox is checked
-        quizzes = quizzes.filter(expiry_date__gte=now())
-    
-    # Format duration into a readable format
-    for quiz in quizzes:
-        # Convert the duration (timedelta) to hours, minutes, seconds
-        duration_seconds = int(quiz.duration.total_seconds())
-        hours = duration_seconds // 3600
-        minutes = (duration_seconds % 3600) // 60
-        seconds = duration_seconds % 60
-        quiz.formatted_duration = f"{hours:02}:{minutes:02}:{seconds:02}"
+        filters.append(('is', Quiz.ACTIVE))
+        queryset = queryset.filter(status=Quiz.ACTIVE)
+
+    try:
+        if tag_expression or tag:
+            node = filters[0]
+            for other in filters[1:]:
+                node = ('and', node, other)
+            quiz_ids = select_quizzes(node, cursor, QUIZ_PAGE_SIZE + 1)
+            page = QuizPage(Quiz.objects.filter(quiz_id__in=quiz_ids))
+        else:
+            page = QuizPage(queryset, cursor)
+    except ValueError:
+        return HttpResponse("Invalid page cursor.", status=400)
+
+    cache_key = fragment_cache_key(quiz_type, tag, tag_expression, available_only, cursor)
+    quiz_list = cache.get(cache_key)
+    if quiz_list is None:
+        next_query = None
+        if page.next_cursor:
+            # The fragment is shared by everyone with these filters, so the link carries only them
+            params = QueryDict(mutable=True)
+            for name, value in (('quiz_type', quiz_type), ('tag', tag), ('tags', tag_expression),
+                                ('available_only', available_only)):
+                if value:
+                    params[name] = value
+            params['after'] = page.next_cursor
+            next_query = params.urlencode()
+        quiz_list = render_to_string('quiz/quiz_list.html', {
+            'quizzes': page,
+            'next_query': next_query,
+        }, request=request)
+        cache.set(cache_key, quiz_list, QUIZ_LIST_CACHE_TIMEOUT)
         
     # Najifa's part for feedback button
     participant = Participant.objects.filter(user=request.user).first()
     participant_id = participant.participant_id if participant else None
 
     return render(request, 'quiz/quiz_home.html', {
-        'quizzes': quizzes,
-        'tags': tags,
+        'quizzes': page,
+        'quiz_list': quiz_list,
         'participant_id': participant_id,  # Pass the participant_id safely
     })
 
@@ -65,9 +117,13 @@ def create_quiz(request):
 
     This view allows the user to provide details for the quiz such as 
     the title, description, type, password (if private), duration, 
-    expiry date, and associated tags. It validates the input and creates 
+    start and expiry dates, and associated tags. It validates the input and creates 
     the quiz object in the database.
 
+    Selected tags and new comma-separated tag names are resolved together by
+    ``core.tags.resolve_tags`` and attached with one ``add``, so the number of
+    queries does not grow with the number of tags.
+
     Args:
         request (HttpRequest): The HTTP request object.
 
@@ -82,9 +138,11 @@ def create_quiz(request):
         duration_hours = int(request.POST.get('duration_hours', 0))
         duration_minutes = int(request.POST.get('duration_minutes', 0))
         duration_seconds = int(request.POST.get('duration_seconds', 0))
+        start_date = request.POST.get('start_date')
         expiry_date = request.POST.get('expiry_date')
-        tags = request.POST.getlist('tags')
-        new_tags = request.POST.getlist('new_tags')
+        # Ids of existing tags, besides the names typed into the form
+        tag_ids = [int(tag_id) for tag_id in request.POST.getlist('tags') if tag_id.isdigit()]
+        new_tags = split_tag_names(request.POST.getlist('new_tags'))
         can_view_score = request.POST.get('can_view_score') == 'on'
 
         # Validate duration and expiry_date formats
@@ -93,6 +151,15 @@ def create_quiz(request):
         except ValueError:
             return HttpResponse("Invalid duration format.", status=400)
 
+        # Handle start_date (if empty, the quiz opens right away)
+        if start_date:
+            try:
+                start_date = make_aware(datetime.strptime(start_date, "%Y-%m-%dT%H:%M"))
+            except ValueError:
+                return HttpResponse("Invalid start date format.", status=400)
+        else:
+            start_date = None
+
         # Handle expiry_date (if empty, set to None)
         if expiry_date:
             try:
@@ -101,46 +168,62 @@ def create_quiz(request):
                 return HttpResponse("Invalid expiry date format.", status=400)
         else:
             expiry_date = None  # Set to None if not provided
+
+        if start_date and expiry_date and start_date >= expiry_date:
+            return HttpResponse("The start date must be before the expiry date.", status=400)
         try:
-            quiz = Quiz.objects.create(
-                title=title,
-                description=description,
-                quiz_type=quiz_type,
-                password=password,
-                duration=duration_timedelta,
-                expiry_date=expiry_date,
-                can_view_score_immediately=can_view_score,
-                created_by=request.user,  # Associate the quiz with the user
-            )
+            with transaction.atomic():
+                quiz = Quiz.objects.create(
+                    title=title,
+                    description=description,
+                    quiz_type=quiz_type,
+                    password=password,
+                    duration=duration_timedelta,
+                    start_date=start_date,
+                    expiry_date=expiry_date,
+                    can_view_score_immediately=can_view_score,
+                    created_by=request.user,  # Associate the quiz with the user
+                )
+                # Attach the selected and the new tags at once
+                tags = resolve_tags(new_tags, tag_ids)
+                if tags:
+                    quiz.tags.add(*tags)
         except ValidationError as e:
             return HttpResponse(e.message, status=400)
         
-        # Handle tag creation or selection
-        if new_tags:
-            # Ensure new_tags is a string before calling split
-            if isinstance(new_tags, str):
-                for tag_name in new_tags.split(','):
-                    tag_name = tag_name.strip()  # Clean up any extra spaces
-                    tag, created = Tag.objects.get_or_create(name=tag_name)
-                    quiz.tags.add(tag)
-            elif isinstance(new_tags, list):  # If it's already a list (multiple tags)
-                for tag_name in new_tags:
-                    tag_name = tag_name.strip()  # Clean up any extra spaces
-                    tag, created = Tag.objects.get_or_create(name=tag_name)
-                    quiz.tags.add(tag)
-        else:
-            # Add selected tags to the quiz
-            for tag_id in tags:
-                tag = Tag.objects.get(id=tag_id)
-                quiz.tags.add(tag)
-
-        quiz.save()
-        
         messages.success(request, f'Quiz "{quiz.title}" created successfully. Now, you can set questions.')
         return redirect('set_questions', quiz_id=quiz.quiz_id)
     
-    tags = Tag.objects.all()  # Fetch all tags
-    return render(request, 'quiz/create_quiz.html', {'tags': tags})
+    return render(request, 'quiz/create_quiz.html')
+
+
+@login_required
+def tag_autocomplete(request):
+    """
+    Returns the tags whose name starts with the ``q`` query parameter, most used first.
+
+    The tags are ranked by their number of quizzes and looked up in the tag
+    index's prefix trie, without querying the database. An empty ``q`` returns
+    the most popular tags. The ``limit`` query parameter caps the number of tags,
+    at most ``TOP_SIZE``.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: ``tags``, a list of ``id``, ``name`` and ``quiz_count`` objects.
+    """
+    try:
+        limit = min(int(request.GET.get('limit', TOP_SIZE)), TOP_SIZE)
+        if limit < 1:
+            raise ValueError(limit)
+    except ValueError:
+        return HttpResponse("Invalid 'limit' parameter.", status=400)
+
+    tags = complete_tags(request.GET.get('q', '').strip(), limit)
+    return JsonResponse({
+        'tags': [{'id': tag_id, 'name': name, 'quiz_count': count} for tag_id, name, count in tags],
+    })
 
 @login_required
 def set_questions(request, quiz_id):
@@ -148,8 +231,9 @@ def set_questions(request, quiz_id):
     Handles the creation of questions for a quiz.
 
     This view allows the user to submit a list of questions, options, and 
-    correct answers for the quiz. It validates the input and creates the 
-    associated Question objects in the database.
+    correct answers for the quiz. The whole batch is validated up front and
+    the associated Question objects are written with a single ``bulk_create``
+    inside one transaction.
 
     Args:
         request (HttpRequest): The HTTP request object.
@@ -168,20 +252,57 @@ def set_questions(request, quiz_id):
         options_d = request.POST.getlist('option_d[]')
         correct_options = request.POST.getlist('correct_option[]')
 
-        num_questions = len(question_texts)
-        for i in range(num_questions):
-            Question.objects.create(
-                quiz=quiz,
-                question_no=i + 1,
-                text=question_texts[i],
-                option_a=options_a[i],
-                option_b=options_b[i],
-                option_c=options_c[i],
-                option_d=options_d[i],
-                correct_option=correct_options[i],
-            )
+        fields = (question_texts, options_a, options_b, options_c, options_d, correct_options)
+        if len({len(values) for values in fields}) != 1:
+            messages.error(request, "Every question needs a text, four options and a correct option.")
+            return render(request, 'quiz/set_questions.html', {'quiz': quiz}, status=400)
+
+        rows = [dict(zip(QUESTION_FIELDS, values)) for values in zip(*fields)]
+        try:
+            bulk_create_questions(quiz, rows)
+        except ValidationError as e:
+            for error in e.messages:
+                messages.error(request, error)
+            return render(request, 'quiz/set_questions.html', {'quiz': quiz}, status=400)
         
         messages.success(request, "Quiz questions created successfully!")
         return redirect('quiz_home') 
 
     return render(request, 'quiz/set_questions.html', {'quiz': quiz})
+
+
+@login_required
+def import_questions_file(request, quiz_id):
+    """
+    Imports questions for a quiz from an uploaded CSV or JSON file.
+
+    The upload is parsed row by row and written in chunks, so large question
+    banks are never loaded into memory at once. Only the quiz's creator may
+    import questions. The file format is taken from the ``format`` field or,
+    if absent, from the file extension.
+
+    Args:
+        request (HttpRequest): The HTTP request object carrying the ``file`` upload.
+        quiz_id (UUID): The unique identifier for the quiz.
+
+    Returns:
+        HttpResponse: Redirects to the set questions page with a success or error message.
+    """
+    quiz = get_object_or_404(Quiz, quiz_id=quiz_id)
+    if quiz.created_by_id != request.user.pk:
+        return HttpResponse("Only the quiz creator can import questions.", status=403)
+    if request.method != 'POST' or 'file' not in request.FILES:
+        messages.error(request, "Choose a CSV or JSON file to import.")
+        return redirect('set_questions', quiz_id=quiz.quiz_id)
+
+    upload = request.FILES['file']
+    file_format = request.POST.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+    try:
+        imported = import_questions(quiz, upload.file, file_format)
+    except ValidationError as e:
+        for error in e.messages[:10]:
+            messages.error(request, error)
+        return redirect('set_questions', quiz_id=quiz.quiz_id)
+
+    messages.success(request, f"Imported {imported} questions.")
+    return redirect('set_questions', quiz_id=quiz.quiz_id)
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import indexing  # noqa: F401  (connect the index update signals)
+        from .backends import install_fts
+
+        # migrate and the test runner create the tables; the FTS5 virtual table is no model
+        post_migrate.connect(install_fts, sender=self, dispatch_uid='search_install_fts')
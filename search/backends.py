@@ -0,0 +1,404 @@
+"""
+Search backends: SQLite FTS5, or an inverted index ranked with BM25.
+
+Both backends index ``Document`` tuples (a kind, an object id, a title and a
+body) and answer queries with ``Hit`` tuples ordered by relevance. Every query
+token must occur in a hit, and title tokens weigh ``TITLE_WEIGHT`` times as
+much as body tokens.
+
+Every indexed object has a ``SearchDocument`` row. On SQLite builds with FTS5
+its id is the row id of the document's text in the ``search_fts`` virtual
+table, which ranks matches with its built-in ``bm25()``. Elsewhere the text is
+tokenized here and stored as ``SearchTerm`` and ``SearchPosting`` rows; a query
+reads the postings of its terms through their index and sums the BM25 score of
+each document in SQL, so only the best ``limit`` hits leave the database.
+Documents are replaced in place, so saving an object re-indexes just that
+object.
+
+``SEARCH_BACKEND`` picks the backend: ``auto`` (FTS5 when available),
+``fts5`` or ``inverted``.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter, namedtuple
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, Sum
+from .models import SearchCorpus, SearchDocument, SearchPosting, SearchTerm
+
+FTS_TABLE = 'search_fts'
+TITLE_WEIGHT = 3
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 100
+CHUNK_SIZE = 500  # parameters per IN (...) list
+K1 = 1.2  # BM25 term frequency saturation
+B = 0.75  # BM25 length normalization
+
+Document = namedtuple('Document', ['kind', 'object_id', 'title', 'body'])
+Hit = namedtuple('Hit', ['kind', 'object_id', 'score'])
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+_fts5_available = {}
+
+
+def tokenize(text):
+    """
+    Split text into lowercase tokens without diacritics, like FTS5's ``unicode61`` tokenizer.
+    """
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = text.lower()
+    return [token for token in TOKEN_RE.findall(text) if len(token) <= MAX_TERM_LENGTH]
+
+
+def query_terms(query):
+    """
+    Return the distinct tokens of a query, at most ``MAX_QUERY_TERMS`` of them.
+    """
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def fts5_available(using=DEFAULT_DB_ALIAS):
+    """
+    Return whether the database is SQLite compiled with FTS5.
+    """
+    if using not in _fts5_available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA compile_options")
+                available = any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+        _fts5_available[using] = available
+    return _fts5_available[using]
+
+
+def install_fts(sender=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Create the FTS5 table where FTS5 is available; also the ``post_migrate`` receiver.
+    """
+    if not fts5_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    """
+    Return the backend selected by ``SEARCH_BACKEND``.
+
+    Raises:
+        ImproperlyConfigured: If the setting is unknown, or ``fts5`` is not available.
+    """
+    name = settings.SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if fts5_available(using) else 'inverted'
+    if name == 'fts5' and not fts5_available(using):
+        raise ImproperlyConfigured("SEARCH_BACKEND is 'fts5', but the database has no FTS5.")
+    if name not in BACKENDS:
+        raise ImproperlyConfigured(f"Unknown SEARCH_BACKEND {name!r}; use 'auto', 'fts5' or 'inverted'.")
+    return BACKENDS[name](using)
+
+
+class SearchBackend:
+    """
+    Index maintenance shared by the backends, around the ``SearchDocument`` rows.
+
+    Subclasses store the text of documents in ``_add``, drop it in ``_discard``
+    and answer queries in ``search``.
+
+    Attributes:
+        name (str): The ``SEARCH_BACKEND`` value selecting the backend.
+        using (str): The database alias.
+    """
+    name = None
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    def _existing(self, keys):
+        """
+        Return the ids of the indexed documents among ``(kind, object_id)`` keys.
+        """
+        by_kind = {}
+        for kind, object_id in keys:
+            by_kind.setdefault(kind, []).append(object_id)
+        existing = {}
+        for kind, object_ids in by_kind.items():
+            for chunk in _chunks(object_ids):
+                rows = SearchDocument.objects.using(self.using).filter(kind=kind, object_id__in=chunk)
+                existing.update(((kind, object_id), pk) for object_id, pk in rows.values_list('object_id', 'id'))
+        return existing
+
+    def prepare(self, document):
+        """
+        Return the length of a document and whatever ``_add`` needs to store it.
+        """
+        return 0, None
+
+    def index(self, documents):
+        """
+        Add documents to the index, replacing those indexed before.
+
+        Args:
+            documents (iterable of Document): The documents.
+        """
+        documents = {(document.kind, str(document.object_id)): document for document in documents}
+        if not documents:
+            return
+        prepared = {key: self.prepare(document) for key, document in documents.items()}
+        try:
+            self._index(documents, prepared)
+        except Exception:
+            self._forget()  # rows written by the failed transaction are gone
+            raise
+
+    def _index(self, documents, prepared):
+        with transaction.atomic(using=self.using):
+            ids = self._existing(documents)
+            if ids:
+                self._discard(list(ids.values()))
+                for key, pk in ids.items():
+                    SearchDocument.objects.using(self.using).filter(pk=pk).update(length=prepared[key][0])
+            created = SearchDocument.objects.using(self.using).bulk_create([
+                SearchDocument(kind=kind, object_id=object_id, length=prepared[kind, object_id][0])
+                for kind, object_id in documents if (kind, object_id) not in ids
+            ])
+            ids.update(((row.kind, row.object_id), row.pk) for row in created)
+            self._add([(ids[key], documents[key], *prepared[key]) for key in documents])
+
+    def remove(self, keys):
+        """
+        Remove documents from the index.
+
+        Args:
+            keys (iterable of tuple): ``(kind, object_id)`` of each document.
+        """
+        keys = [(kind, str(object_id)) for kind, object_id in keys]
+        with transaction.atomic(using=self.using):
+            ids = list(self._existing(keys).values())
+            if ids:
+                self._discard(ids)
+                for chunk in _chunks(ids):
+                    SearchDocument.objects.using(self.using).filter(pk__in=chunk).delete()
+
+    def clear(self):
+        """
+        Remove every document from the index.
+        """
+        with transaction.atomic(using=self.using), connections[self.using].cursor() as cursor:
+            for model in (SearchPosting, SearchTerm, SearchCorpus, SearchDocument):
+                cursor.execute(f"DELETE FROM {connections[self.using].ops.quote_name(model._meta.db_table)}")
+            self._clear(cursor)
+        self._forget()
+
+    def _clear(self, cursor):
+        pass
+
+    def _forget(self):
+        """
+        Drop whatever the backend remembers about the index, after a rollback or a clear.
+        """
+
+    def _add(self, rows):
+        raise NotImplementedError
+
+    def _discard(self, ids):
+        raise NotImplementedError
+
+    def search(self, query, kinds=None, limit=20):
+        """
+        Return the documents matching every token of the query, best first.
+
+        Args:
+            query (str): The search text.
+            kinds (iterable of str, optional): Only return documents of these kinds.
+            limit (int): The maximum number of hits.
+
+        Returns:
+            list of Hit: ``(kind, object_id, score)``, a higher score ranking first.
+        """
+        raise NotImplementedError
+
+
+class FTS5Backend(SearchBackend):
+    """
+    SQLite's FTS5 full-text index, ranked by its ``bm25()`` function.
+    """
+    name = 'fts5'
+
+    def _add(self, rows):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                [(pk, document.title or '', document.body or '') for pk, document, _, _ in rows],
+            )
+
+    def _discard(self, ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in ids])
+
+    def _clear(self, cursor):
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def search(self, query, kinds=None, limit=20):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        # Quoted tokens are matched literally, whatever FTS5 syntax the query contains
+        params = [' '.join(f'"{term}"' for term in terms)]
+        kind_filter = ''
+        if kinds:
+            kinds = list(kinds)
+            kind_filter = f"AND document.kind IN ({', '.join(['%s'] * len(kinds))})"
+            params.extend(kinds)
+        params.append(limit)
+        connection = connections[self.using]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT document.kind, document.object_id, bm25({FTS_TABLE}, {TITLE_WEIGHT}.0, 1.0) AS score "
+                f"FROM {FTS_TABLE} JOIN {connection.ops.quote_name(SearchDocument._meta.db_table)} AS document "
+                f"ON document.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s {kind_filter} ORDER BY score LIMIT %s",
+                params,
+            )
+            # bm25() is lower for better matches
+            return [Hit(kind, object_id, -score) for kind, object_id, score in cursor.fetchall()]
+
+
+class InvertedIndexBackend(SearchBackend):
+    """
+    Terms and postings in ordinary tables, ranked with BM25 computed in SQL.
+    """
+    name = 'inverted'
+
+    def prepare(self, document):
+        frequencies = Counter(tokenize(document.body))
+        for term in tokenize(document.title):
+            frequencies[term] += TITLE_WEIGHT
+        return sum(frequencies.values()), frequencies
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        super().__init__(using)
+        # Term ids this instance has seen; instances live for one save or one bulk load, which
+        # then looks up each term once
+        self._term_cache = {}
+
+    def _term_ids(self, terms):
+        """
+        Return the ids of terms, creating the missing ones.
+        """
+        terms = set(terms)
+        term_ids = {term: self._term_cache[term] for term in terms if term in self._term_cache}
+        missing = terms - term_ids.keys()
+        if missing:
+            SearchTerm.objects.using(self.using).bulk_create(
+                [SearchTerm(term=term) for term in missing], ignore_conflicts=True
+            )
+            for chunk in _chunks(missing):
+                term_ids.update(SearchTerm.objects.using(self.using).filter(term__in=chunk).values_list('term', 'id'))
+            self._term_cache.update(term_ids)
+        return term_ids
+
+    def _count_documents(self, counts, sign):
+        """
+        Move the document counts of terms by ``sign`` times the given amounts.
+        """
+        connection = connections[self.using]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {connection.ops.quote_name(SearchTerm._meta.db_table)} "
+                "SET document_count = document_count + %s WHERE id = %s",
+                [(sign * amount, term_id) for term_id, amount in counts.items()],
+            )
+
+    def _add(self, rows):
+        term_ids = self._term_ids(term for _, _, _, frequencies in rows for term in frequencies)
+        # In index order, so each batch lands in neighbouring index pages
+        postings = sorted(
+            (term_ids[term], pk, frequency)
+            for pk, _, _, frequencies in rows for term, frequency in frequencies.items()
+        )
+        connection = connections[self.using]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {connection.ops.quote_name(SearchPosting._meta.db_table)} "
+                "(term_id, document_id, frequency) VALUES (%s, %s, %s)",
+                postings,
+            )
+        self._count_documents(Counter(term_id for term_id, _, _ in postings), 1)
+        SearchCorpus.add(len(rows), sum(length for _, _, length, _ in rows), using=self.using)
+
+    def _forget(self):
+        self._term_cache.clear()
+
+    def _discard(self, ids):
+        counts = Counter()
+        length = 0
+        for chunk in _chunks(ids):
+            postings = SearchPosting.objects.using(self.using).filter(document_id__in=chunk)
+            counts.update(dict(postings.values('term_id').annotate(n=Count('id')).values_list('term_id', 'n')))
+            postings.delete()
+            length += SearchDocument.objects.using(self.using).filter(pk__in=chunk).aggregate(
+                length=Sum('length')
+            )['length'] or 0
+        self._count_documents(counts, -1)
+        SearchCorpus.add(-len(ids), -length, using=self.using)
+
+    def search(self, query, kinds=None, limit=20):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        idf = {}
+        documents, average_length = SearchCorpus.totals(self.using)
+        for term_id, count in SearchTerm.objects.using(self.using).filter(
+            term__in=terms, document_count__gt=0
+        ).values_list('id', 'document_count'):
+            count = min(count, documents)
+            idf[term_id] = math.log(1 + (documents - count + 0.5) / (count + 0.5))
+        if len(idf) < len(terms):
+            return []  # a token no document contains
+
+        connection = connections[self.using]
+        quote = connection.ops.quote_name
+        weight = ' '.join('WHEN %s THEN %s' for _ in idf)
+        params = [value for term_id, score in idf.items() for value in (term_id, score)]
+        params += [K1 + 1, K1 * (1 - B), K1 * B / average_length]
+        params += list(idf)
+        kind_filter = ''
+        if kinds:
+            kinds = list(kinds)
+            kind_filter = f"AND document.kind IN ({', '.join(['%s'] * len(kinds))})"
+            params.extend(kinds)
+        params += [len(idf), limit]
+        with connection.cursor() as cursor:
+            # BM25: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average length)), summed per document
+            cursor.execute(
+                f"SELECT document.kind, document.object_id, "
+                f"SUM((CASE posting.term_id {weight} END) * posting.frequency * %s "
+                f"/ (posting.frequency + %s + %s * document.length)) AS score "
+                f"FROM {quote(SearchPosting._meta.db_table)} AS posting "
+                f"JOIN {quote(SearchDocument._meta.db_table)} AS document ON document.id = posting.document_id "
+                f"WHERE posting.term_id IN ({', '.join(['%s'] * len(idf))}) {kind_filter} "
+                f"GROUP BY document.id, document.kind, document.object_id HAVING COUNT(*) = %s "
+                f"ORDER BY score DESC, document.id LIMIT %s",
+                params,
+            )
+            return [Hit(kind, object_id, score) for kind, object_id, score in cursor.fetchall()]
+
+
+BACKENDS = {backend.name: backend for backend in (FTS5Backend, InvertedIndexBackend)}
@@ -0,0 +1,73 @@
+"""
+What is searchable, and keeping the index in step with it.
+
+Quizzes (title and description), questions (text) and blog posts (title and
+content) are indexed as ``Document`` tuples. Saving or deleting one of them
+re-indexes or removes just that object in the same transaction, through the
+signal receivers below; questions written with ``bulk_create`` by
+``quiz.importers`` are indexed there with ``index_objects``. ``iter_documents``
+feeds the ``rebuild_search_index`` command.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from blog.models import Blog
+from quiz.models import Question, Quiz
+from .backends import Document, get_backend
+
+
+def quiz_document(quiz):
+    return Document('quiz', str(quiz.quiz_id), quiz.title, quiz.description or '')
+
+
+def question_document(question):
+    return Document('question', str(question.question_id), '', question.text)
+
+
+def blog_document(blog):
+    return Document('blog', str(blog.pk), blog.title, blog.content)
+
+
+# kind: (model, document builder, fields the builder reads)
+SOURCES = {
+    'quiz': (Quiz, quiz_document, ['quiz_id', 'title', 'description']),
+    'question': (Question, question_document, ['question_id', 'text']),
+    'blog': (Blog, blog_document, ['id', 'title', 'content']),
+}
+KINDS = {model: kind for kind, (model, _, _) in SOURCES.items()}
+
+
+def index_objects(objects):
+    """
+    Index or re-index model instances of the searchable kinds.
+    """
+    get_backend().index(SOURCES[KINDS[type(obj)]][1](obj) for obj in objects)
+
+
+def iter_documents(kind, chunk_size=2000):
+    """
+    Yield the document of every object of a kind, reading only the indexed fields.
+    """
+    model, build, fields = SOURCES[kind]
+    for obj in model.objects.only(*fields).order_by().iterator(chunk_size=chunk_size):
+        yield build(obj)
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=Blog)
+def index_on_save(sender, instance, raw=False, **kwargs):
+    """
+    Re-indexes a quiz, question or blog post whenever it is saved.
+    """
+    if not raw:  # loaddata; rebuild the index afterwards
+        index_objects([instance])
+
+
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=Blog)
+def remove_on_delete(sender, instance, **kwargs):
+    """
+    Removes a deleted quiz, question or blog post from the index.
+    """
+    get_backend().remove([(KINDS[sender], instance.pk)])
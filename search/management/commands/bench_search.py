@@ -0,0 +1,124 @@
+"""
+Benchmark search query latency against a large synthetic corpus.
+
+The command creates a throwaway test database and, for each backend, indexes
+``--documents`` synthetic documents whose words follow a Zipf distribution
+like natural text: a few words occur in most documents, most words in very
+few. It then runs ``--queries`` searches of each query class (a rare word, a
+common word, two and three words of mixed frequency) and prints the latency
+percentiles, the indexing throughput and the size of the result sets.
+
+Usage:
+    python manage.py bench_search [--documents 1000000] [--queries 100] [--backend fts5 inverted]
+        [--vocabulary 50000] [--seed 0] [--batch-size 5000] [--output bench-search.json]
+"""
+import itertools
+import json
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from core.management.commands.bench import percentile
+from search.backends import BACKENDS, Document, fts5_available
+
+KINDS = ('question',) * 8 + ('quiz', 'blog')
+ZIPF_EXPONENT = 1.07
+
+
+class Corpus:
+    """
+    Seeded synthetic documents and queries over a Zipf-distributed vocabulary.
+    """
+
+    def __init__(self, vocabulary, seed):
+        self.rng = random.Random(seed)
+        # Word i is the i-th most frequent; two letters and a number keep the tokens distinct
+        self.words = [f"{chr(97 + i % 26)}{chr(97 + i // 26 % 26)}{i}" for i in range(vocabulary)]
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** ZIPF_EXPONENT) for rank in range(1, vocabulary + 1)))
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choices(self.words, cum_weights=self.cum_weights, k=self.rng.randint(low, high)))
+
+    def documents(self, count):
+        for i in range(count):
+            yield Document(self.rng.choice(KINDS), str(i), self.text(3, 8), self.text(10, 40))
+
+    def word(self, low, high):
+        return self.words[self.rng.randrange(low, min(high, len(self.words)))]
+
+    def queries(self, count):
+        """
+        Return ``{query class: [query, ...]}``.
+        """
+        return {
+            'rare word': [self.word(5000, 50000) for _ in range(count)],
+            'common word': [self.word(0, 20) for _ in range(count)],
+            'two words': [f"{self.word(20, 200)} {self.word(200, 2000)}" for _ in range(count)],
+            'three words': [f"{self.word(0, 20)} {self.word(20, 200)} {self.word(20, 200)}" for _ in range(count)],
+        }
+
+
+class Command(BaseCommand):
+    help = "Measure search indexing throughput and query latency of each backend on a synthetic corpus."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=100, help="Queries per query class.")
+        parser.add_argument('--backend', nargs='+', choices=BACKENDS, help="Defaults to every available backend.")
+        parser.add_argument('--vocabulary', type=int, default=50_000, help="Distinct words of the corpus.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000, help="Documents indexed per transaction.")
+        parser.add_argument('--output', help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            names = options['backend'] or [name for name in BACKENDS if name != 'fts5' or fts5_available()]
+            if 'fts5' in names and not fts5_available():
+                raise CommandError("The database has no FTS5.")
+            report = {name: self._run(BACKENDS[name](), options) for name in names}
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'documents': options['documents'], 'backends': report}, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _run(self, backend, options):
+        backend.clear()
+        corpus = Corpus(options['vocabulary'], options['seed'])
+        documents = corpus.documents(options['documents'])
+        started = time.perf_counter()
+        for batch in iter(lambda: list(itertools.islice(documents, options['batch_size'])), []):
+            backend.index(batch)
+        indexing = time.perf_counter() - started
+        self.stdout.write(
+            f"{backend.name}: indexed {options['documents']} documents in {indexing:.1f}s "
+            f"({options['documents'] / indexing:,.0f} documents/s)"
+        )
+
+        results = {'indexing_seconds': round(indexing, 2), 'queries': {}}
+        self.stdout.write(f"  {'query':<14}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'hits p50':>10}")
+        for name, queries in corpus.queries(options['queries']).items():
+            latencies, hits = [], []
+            for query in queries:
+                started = time.perf_counter()
+                hits.append(len(backend.search(query)))
+                latencies.append((time.perf_counter() - started) * 1000)
+            result = {
+                'p50_ms': round(percentile(latencies, 0.5), 2),
+                'p90_ms': round(percentile(latencies, 0.9), 2),
+                'p99_ms': round(percentile(latencies, 0.99), 2),
+                'max_ms': round(max(latencies), 2),
+                'hits_p50': percentile(hits, 0.5),
+            }
+            results['queries'][name] = result
+            self.stdout.write(
+                f"  {name:<14}{result['p50_ms']:>9.1f}{result['p90_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                f"{result['max_ms']:>9.1f}{result['hits_p50']:>10}"
+            )
+        backend.clear()
+        return results
@@ -0,0 +1,48 @@
+"""
+Rebuild the full-text search index from the database.
+
+Empties the index of the configured backend (``SEARCH_BACKEND``) and indexes
+every quiz, question and blog post again, in batches of ``--batch-size``
+documents per transaction. Needed after ``loaddata``, after rows were written
+without signals, or after switching the backend; saves and deletes keep the
+index up to date otherwise.
+
+Usage:
+    python manage.py rebuild_search_index [--kind quiz question blog] [--batch-size 2000]
+"""
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand
+from search.backends import get_backend, install_fts
+from search.indexing import SOURCES, iter_documents
+from search.models import SearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of quizzes, questions and blog posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', nargs='+', choices=SOURCES, default=list(SOURCES),
+                            help="Only reindex these kinds of documents (the rest stays indexed).")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Documents indexed per transaction.")
+
+    def handle(self, *args, **options):
+        install_fts()
+        backend = get_backend()
+        started = time.perf_counter()
+        if set(options['kind']) == set(SOURCES):
+            backend.clear()
+        for kind in options['kind']:
+            # Also drops the documents of objects deleted without signals
+            indexed = SearchDocument.objects.filter(kind=kind).values_list('object_id', flat=True)
+            backend.remove((kind, object_id) for object_id in list(indexed))
+
+            documents = iter_documents(kind, chunk_size=options['batch_size'])
+            count = 0
+            for batch in iter(lambda: list(islice(documents, options['batch_size'])), []):
+                backend.index(batch)
+                count += len(batch)
+            self.stdout.write(f"Indexed {count} {kind} documents")
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the {backend.name} search index in {time.perf_counter() - started:.1f}s"
+        ))
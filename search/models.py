@@ -0,0 +1,97 @@
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models import F
+
+
+class SearchDocument(models.Model):
+    """
+    One indexed object: a quiz, a question or a blog post.
+
+    Its ``id`` is the row id of the document in the FTS5 table, and the document
+    the postings of the inverted index belong to.
+
+    Attributes:
+        kind: The kind of object, ``quiz``, ``question`` or ``blog``.
+        object_id: The primary key of the object, as a string.
+        length: The number of indexed tokens, title tokens counted with their weight.
+    """
+    kind = models.CharField(max_length=16)
+    object_id = models.CharField(max_length=36)
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class SearchTerm(models.Model):
+    """
+    A token of the inverted index and the number of documents containing it.
+
+    Attributes:
+        term: The normalized token.
+        document_count: The number of documents with at least one posting of the term.
+    """
+    term = models.CharField(max_length=100, unique=True)
+    document_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.term
+
+
+class SearchPosting(models.Model):
+    """
+    The occurrences of one term in one document.
+
+    Attributes:
+        term: The term.
+        document: The document containing it.
+        frequency: The weighted number of occurrences.
+    """
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name="postings", db_index=False)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name="postings")
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            # Also the index a term's postings are read through
+            models.UniqueConstraint(fields=['term', 'document'], name='unique_search_posting'),
+        ]
+
+
+class SearchCorpus(models.Model):
+    """
+    Running totals of the inverted index that BM25 needs on every query.
+
+    A single row, kept up to date with constant-time ``UPDATE`` statements, so
+    a query never counts the documents.
+
+    Attributes:
+        documents: The number of indexed documents.
+        total_length: The sum of their lengths.
+    """
+    documents = models.PositiveIntegerField(default=0)
+    total_length = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def add(cls, documents, length, using=DEFAULT_DB_ALIAS):
+        """
+        Adds (or, with negative numbers, removes) documents and their length to the totals.
+        """
+        if not cls.objects.using(using).filter(pk=1).update(
+            documents=F('documents') + documents, total_length=F('total_length') + length
+        ):
+            cls.objects.using(using).create(pk=1, documents=max(0, documents), total_length=max(0, length))
+
+    @classmethod
+    def totals(cls, using=DEFAULT_DB_ALIAS):
+        """
+        Returns ``(documents, average length)`` of the indexed documents.
+        """
+        corpus = cls.objects.using(using).filter(pk=1).first()
+        if corpus is None or not corpus.documents:
+            return 0, 0.0
+        return corpus.documents, corpus.total_length / corpus.documents
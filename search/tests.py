@@ -0,0 +1,160 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from blog.models import Blog
+from quiz.importers import bulk_create_questions
+from quiz.models import Question, Quiz
+from Quiz_Portal.testing import QueryBudgetMixin
+from .backends import FTS5Backend, InvertedIndexBackend, fts5_available, get_backend, query_terms, tokenize
+from .models import SearchCorpus, SearchDocument, SearchTerm
+
+User = get_user_model()
+
+
+class TokenizeTest(SimpleTestCase):
+    """
+    Tests for the tokenizer shared by indexing and queries.
+    """
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Café au_lait, NAÏVE résumé 42!"), ['cafe', 'au', 'lait', 'naive', 'resume', '42'])
+
+    def test_query_terms_are_distinct_and_capped(self):
+        self.assertEqual(query_terms("Django django DJANGO orm"), ['django', 'orm'])
+        self.assertEqual(len(query_terms(' '.join(f"word{i}" for i in range(20)))), 8)
+
+
+class BackendTestMixin:
+    """
+    Tests run against each search backend, through the model signals.
+    """
+    backend_class = None
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="searcher", email="searcher@example.com", password="password123")
+        self.python = Quiz.objects.create(
+            title="Python basics", description="Variables, loops and functions.",
+            duration=timedelta(minutes=10), created_by=self.user,
+        )
+        self.history = Quiz.objects.create(
+            title="World history", description="Empires and revolutions, with a little python trivia.",
+            duration=timedelta(minutes=10), created_by=self.user,
+        )
+        self.question = Question.objects.create(
+            quiz=self.history, question_no=1, text="Which emperor crossed the Alps with elephants?",
+            option_a="Hannibal", option_b="Caesar", option_c="Napoleon", option_d="Attila", correct_option='A',
+        )
+        self.blog = Blog.objects.create(title="Learning loops", content="For loops in Python.", author=self.user)
+
+    def keys(self, query, **kwargs):
+        return [(hit.kind, hit.object_id) for hit in get_backend().search(query, **kwargs)]
+
+    def test_backend_is_selected(self):
+        self.assertIsInstance(get_backend(), self.backend_class)
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.keys("python"), [
+            ('quiz', str(self.python.quiz_id)), ('blog', str(self.blog.pk)), ('quiz', str(self.history.quiz_id)),
+        ])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.keys("python loops"), [('blog', str(self.blog.pk)), ('quiz', str(self.python.quiz_id))])
+        self.assertEqual(self.keys("python elephants"), [])
+        self.assertEqual(self.keys("ELEPHANTS"), [('question', str(self.question.question_id))])
+        self.assertEqual(self.keys("nothing-like-this"), [])
+        self.assertEqual(self.keys("  ...  "), [])
+
+    def test_kinds_filter(self):
+        self.assertEqual(self.keys("python", kinds=['blog']), [('blog', str(self.blog.pk))])
+
+    def test_saving_reindexes(self):
+        self.python.title = "Ruby basics"
+        self.python.save()
+        self.assertNotIn(('quiz', str(self.python.quiz_id)), self.keys("basics python"))
+        self.assertEqual(self.keys("ruby"), [('quiz', str(self.python.quiz_id))])
+        self.assertEqual(SearchDocument.objects.filter(kind='quiz').count(), 2)
+
+    def test_deleting_removes(self):
+        self.history.delete()  # and its question
+        self.assertEqual(self.keys("elephants"), [])
+        self.assertEqual(set(SearchDocument.objects.values_list('kind', flat=True)), {'quiz', 'blog'})
+
+    def test_bulk_created_questions_are_indexed(self):
+        bulk_create_questions(self.python, [{
+            'text': "What does a generator expression yield?", 'option_a': "a", 'option_b': "b",
+            'option_c': "c", 'option_d': "d", 'correct_option': 'A',
+        }])
+        self.assertEqual(len(self.keys("generator")), 1)
+
+    def test_rebuild(self):
+        get_backend().clear()
+        self.assertEqual(self.keys("python"), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.keys("python")), 3)
+        self.assertEqual(SearchDocument.objects.count(), 4)
+
+
+@override_settings(SEARCH_BACKEND='inverted')
+class InvertedIndexBackendTest(BackendTestMixin, TestCase):
+    backend_class = InvertedIndexBackend
+
+    def test_statistics_follow_changes(self):
+        self.assertEqual(SearchCorpus.totals()[0], 4)
+        self.assertEqual(SearchTerm.objects.get(term='python').document_count, 3)
+        self.blog.delete()
+        self.assertEqual(SearchCorpus.totals()[0], 3)
+        self.assertEqual(SearchTerm.objects.get(term='python').document_count, 2)
+        self.assertEqual(SearchTerm.objects.get(term='loops').document_count, 1)
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FTS5BackendTest(BackendTestMixin, TestCase):
+    backend_class = FTS5Backend
+
+    def setUp(self):
+        if not fts5_available():
+            self.skipTest("SQLite without FTS5")
+        super().setUp()
+
+
+class SearchViewTest(QueryBudgetMixin, TestCase):
+    """
+    Tests for the search page.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", email="reader@example.com", password="password123")
+        self.client.force_login(self.user)
+        self.url = reverse('search')
+
+    def grow(self, size):
+        for i in range(Quiz.objects.count(), size):
+            quiz = Quiz.objects.create(title=f"Algebra drill {i}", duration=timedelta(minutes=5), created_by=self.user)
+            Question.objects.create(quiz=quiz, question_no=1, text="Solve for x in algebra", option_a="1",
+                                    option_b="2", option_c="3", option_d="4", correct_option='A')
+            Blog.objects.create(title=f"Algebra notes {i}", content="Notes.", author=self.user)
+
+    def test_results_group_questions_under_their_quiz(self):
+        self.grow(2)
+        response = self.client.get(self.url, {'q': 'algebra'})
+        self.assertTemplateUsed(response, 'search/results.html')
+        kinds = [result['kind'] for result in response.context['results']]
+        self.assertEqual(sorted(kinds), ['blog', 'blog', 'quiz', 'quiz'])
+        response = self.client.get(self.url, {'q': 'solve', 'in': 'quizzes'})
+        self.assertEqual([result['question_match'] for result in response.context['results']], [True, True])
+        self.assertContains(response, 'a question matches')
+
+    def test_empty_query_shows_the_form(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['results'], [])
+        self.assertNotContains(response, 'Results for')
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url, {'q': 'algebra'}).status_code, 302)
+
+    def test_search_query_budget(self):
+        self.assertQueryBudget(lambda: self.client.get(self.url, {'q': 'algebra'}), budget=6, grow=self.grow)
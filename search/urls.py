@@ -0,0 +1,15 @@
+"""
+URL patterns for the search app.
+
+URL Patterns:
+---------------
+1. `` (empty path):
+    - View: `search`
+    - Purpose: Full-text search over quizzes, their questions and blog posts (``?q=...&in=quizzes|blogs``).
+"""
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.search, name='search'),
+]
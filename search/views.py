@@ -0,0 +1,82 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+from blog.models import Blog
+from quiz.models import Question, Quiz
+from .backends import get_backend
+
+RESULTS_PER_PAGE = 20
+# the "in" parameter of the search form: which kinds of documents it searches
+SCOPES = {
+    'quizzes': ('quiz', 'question'),
+    'blogs': ('blog',),
+}
+
+
+def load_results(hits, limit=RESULTS_PER_PAGE):
+    """
+    Turns search hits into the objects they refer to, best first.
+
+    A quiz is listed once, at the rank of its best hit, whether the quiz itself or
+    one of its questions matched. Hits of objects that no longer exist are skipped.
+
+    Args:
+        hits (list of Hit): The backend's hits, best first.
+        limit (int): The maximum number of results.
+
+    Returns:
+        list of dict: ``kind`` (``quiz`` or ``blog``), ``object`` and, for quizzes,
+        ``question_match`` (True when only a question matched).
+    """
+    question_quizzes = {
+        str(question_id): str(quiz_id) for question_id, quiz_id in
+        Question.objects.filter(question_id__in=[hit.object_id for hit in hits if hit.kind == 'question'])
+        .values_list('question_id', 'quiz_id')
+    }
+    quiz_ids = {hit.object_id for hit in hits if hit.kind == 'quiz'} | set(question_quizzes.values())
+    quizzes = {str(pk): quiz for pk, quiz in Quiz.objects.select_related('created_by').in_bulk(quiz_ids).items()}
+    blog_ids = [int(hit.object_id) for hit in hits if hit.kind == 'blog']
+    blogs = {str(pk): blog for pk, blog in Blog.objects.select_related('author').in_bulk(blog_ids).items()}
+
+    results, seen = [], set()
+    for hit in hits:
+        if hit.kind == 'blog':
+            key, obj = ('blog', hit.object_id), blogs.get(hit.object_id)
+        else:
+            quiz_id = hit.object_id if hit.kind == 'quiz' else question_quizzes.get(hit.object_id)
+            key, obj = ('quiz', quiz_id), quizzes.get(quiz_id)
+        if obj is None or key in seen:
+            continue
+        seen.add(key)
+        results.append({'kind': key[0], 'object': obj, 'question_match': hit.kind == 'question'})
+        if len(results) == limit:
+            break
+    return results
+
+
+@login_required
+def search(request):
+    """
+    Searches quiz titles and descriptions, question texts and blog posts.
+
+    Every word of the query must occur in a result; results are ranked by BM25
+    relevance, with matches in titles weighing more.
+
+    Args:
+        request (HttpRequest): The HTTP request object, with the query in ``q`` and
+            optionally ``in`` (``quizzes`` or ``blogs``) to search only one kind.
+
+    Returns:
+        HttpResponse: The search form and the results.
+    """
+    query = request.GET.get('q', '').strip()
+    scope = request.GET.get('in', '')
+    results = []
+    if query:
+        # Questions of one quiz may fill several hits, so ask for more than a page
+        hits = get_backend().search(query, kinds=SCOPES.get(scope), limit=RESULTS_PER_PAGE * 2)
+        results = load_results(hits)
+    return render(request, 'search/results.html', {
+        'query': query,
+        'scope': scope,
+        'results': results,
+    })
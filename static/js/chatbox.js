@@ -0,0 +1,66 @@
+// Live chat: new messages arrive over Server-Sent Events, with polling as a fallback
+let messagesContainer = document.getElementById("messages");
+let chatForm = document.getElementById("chatForm");
+let lastId = parseInt(messagesContainer.dataset.lastId, 10) || 0;
+let shownIds = new Set();
+
+function appendMessage(message) {
+    if (shownIds.has(message.id)) {
+        return;
+    }
+    shownIds.add(message.id);
+    lastId = Math.max(lastId, message.id);
+
+    let element = document.createElement("div");
+    element.className = "message";
+    let author = document.createElement("strong");
+    author.textContent = message.user;
+    let timestamp = document.createElement("small");
+    timestamp.className = "timestamp";
+    timestamp.textContent = new Date(message.timestamp).toLocaleString();
+    element.append(author, ": " + message.content + " ", timestamp);
+    messagesContainer.appendChild(element);
+    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+}
+
+function startPolling() {
+    setInterval(function () {
+        fetch(chatMessagesUrl + "?after=" + lastId, { credentials: "same-origin" })
+            .then(function (response) { return response.json(); })
+            .then(function (data) { data.messages.forEach(appendMessage); });
+    }, 3000);
+}
+
+// Fall back to polling when the stream cannot be opened (e.g. under a WSGI server)
+if (window.EventSource) {
+    let source = new EventSource(chatStreamUrl + "?after=" + lastId);
+    let opened = false;
+    source.addEventListener("open", function () { opened = true; });
+    source.addEventListener("message", function (event) { appendMessage(JSON.parse(event.data)); });
+    setTimeout(function () {
+        if (!opened) {
+            source.close();
+            startPolling();
+        }
+    }, 5000);
+} else {
+    startPolling();
+}
+
+// Send messages without reloading the page
+chatForm.addEventListener("submit", function (event) {
+    event.preventDefault();
+    fetch(chatForm.action || window.location.href, {
+        method: "POST",
+        body: new FormData(chatForm),
+        headers: { "Accept": "application/json" },
+        credentials: "same-origin",
+    })
+        .then(function (response) { return response.ok ? response.json() : null; })
+        .then(function (message) {
+            if (message) {
+                appendMessage(message);
+                chatForm.reset();
+            }
+        });
+});
@@ -1,39 +1,45 @@
 // participate.js
 
-let duration = window.quizDuration; // Use the global variable set by Django for the quiz duration in seconds
+let deadline = Date.now() + window.quizSecondsLeft * 1000; // The server's deadline, on the browser's clock
 let countdownElement = document.getElementById("countdown");
 let timerContainer = document.getElementById("timerContainer"); // Timer container element
 let confirmationModal = document.getElementById("confirmationModal");
 let startQuizButton = document.getElementById("startQuizButton");
 let cancelButton = document.getElementById("cancelButton");
 let quizForm = document.getElementById("quizForm");
+let timerInterval;
 
 function updateTimer() {
+    // Count down from the deadline rather than by ticks, which background tabs throttle
+    let duration = Math.max(0, Math.round((deadline - Date.now()) / 1000));
     let minutes = Math.floor(duration / 60);
     let seconds = duration % 60;
     countdownElement.innerText = `${minutes < 10 ? '0' : ''}${minutes}:${seconds < 10 ? '0' : ''}${seconds}`;
-    
+
     if (duration <= 0) {
-        // Stop timer and submit the quiz when time runs out
+        // Stop timer, freeze the answers and submit the quiz when time runs out
         clearInterval(timerInterval);
-        alert("Time's up! Submitting your answers.");
-        quizForm.submit(); // Automatically submit the form
-    } else {
-        duration--;
+        quizForm.inert = true;
+        countdownElement.innerText = "Time's up! Submitting your answers...";
+        // Everyone who started together runs out together: spread the submissions over the jitter window
+        setTimeout(function () {
+            quizForm.submit(); // Automatically submit the form
+        }, Math.random() * window.submitJitter * 1000);
     }
 }
 
-// Show the confirmation modal before starting the quiz
+// Show the confirmation modal before showing the questions; the server's clock is already running
 window.onload = function () {
     confirmationModal.style.display = "block"; // Show confirmation modal
+    updateTimer();
+    timerInterval = setInterval(updateTimer, 1000); // Start the timer
 }
 
-// Start quiz when user confirms
+// Show the quiz when user confirms
 startQuizButton.addEventListener('click', function() {
     confirmationModal.style.display = "none"; // Hide confirmation modal
     quizForm.style.display = "block"; // Show the quiz form (questions)
     timerContainer.style.display = "block"; // Show the timer container
-    timerInterval = setInterval(updateTimer, 1000); // Start the timer
 });
 
 // Cancel the quiz start
@@ -42,7 +48,7 @@ cancelButton.addEventListener('click', function() {
 });
 
 // submit button clicked
-document.getElementById("quizForm").addEventListener("submit", function () {
+quizForm.addEventListener("submit", function () {
     // Stop the timer when submitting
-    clearInterval(window.timerInterval);
+    clearInterval(timerInterval);
 });
@@ -0,0 +1,50 @@
+// Tag suggestions for inputs with a data-tag-separator, filled into their datalist as you type
+const tagSuggestionDelay = 150;  // milliseconds without typing before suggestions are fetched
+
+document.querySelectorAll("input[data-tag-separator]").forEach(function (input) {
+    let separator = input.dataset.tagSeparator;
+    let datalist = document.getElementById(input.getAttribute("list"));
+    let timer = null;
+    let controller = null;
+
+    function suggest() {
+        // Only the last term is completed; the rest of the value is kept as typed
+        let value = input.value;
+        let start = value.lastIndexOf(separator) + 1;
+        if (separator === " ") {
+            start = Math.max(start, value.lastIndexOf("(") + 1);
+        }
+        let head = value.slice(0, start);
+        let term = value.slice(start).trim();
+        if (separator === "," && head) {
+            head += " ";
+        }
+
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        fetch(tagAutocompleteUrl + "?q=" + encodeURIComponent(term), {
+            credentials: "same-origin",
+            signal: controller.signal,
+        })
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                datalist.replaceChildren();
+                data.tags.forEach(function (tag) {
+                    let name = separator === " " && tag.name.includes(" ") ? '"' + tag.name + '"' : tag.name;
+                    let option = document.createElement("option");
+                    option.value = head + name;
+                    option.label = tag.name + " (" + tag.quiz_count + ")";
+                    datalist.appendChild(option);
+                });
+            })
+            .catch(function () {});
+    }
+
+    input.addEventListener("input", function () {
+        clearTimeout(timer);
+        timer = setTimeout(suggest, tagSuggestionDelay);
+    });
+    input.addEventListener("focus", suggest);
+});